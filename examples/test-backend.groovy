@@ -274,6 +274,10 @@ pipeline {
 
                             echo "使用 Docker Compose 命令: ${DOCKER_COMPOSE_CMD}"
 
+                            # 数据库配置档（db_profiles.py，默认 fast）：与 pytest 运行时生成的启动参数一致，避免容器被重新创建
+                            export TEST_DB_SERVER_ARGS="$(python db_profiles.py)"
+                            echo "数据库启动参数: ${TEST_DB_SERVER_ARGS}"
+
                             # 启动测试数据库
                             ${DOCKER_COMPOSE_CMD} -f docker-compose.test.yml up -d
 
@@ -330,7 +334,7 @@ pipeline {
 
                             echo "=== 启动后端 API 服务 ==="
 
-                            # 检查并清理端口 5085
+                            # 检查并清理端口 5085（兜底：构建被强制中止、post 清理未执行时可能残留进程）
                             echo "检查端口 5085..."
                             if lsof -i :5085 > /dev/null 2>&1; then
                                 echo "警告: 端口 5085 已被占用，停止现有进程..."
@@ -352,52 +356,66 @@ pipeline {
                                 echo "端口 5085 空闲"
                             fi
 
-                            # 后台启动 API 服务
-                            cd ../todoapp-backend-api-main
+                            # 按后端源码哈希发布一次（缓存命中时跳过），直接启动编译好的 dll，
+                            # 避免 dotnet run 每次启动都执行 restore/build
+                            echo "=== 准备预编译后端 ==="
+                            BACKEND_DLL=$(python -c "import sys; from backend_build import publish_backend; print(publish_backend(sys.argv[1], log=lambda m: print(m, file=sys.stderr)))" ../todoapp-backend-api-main)
+                            echo "后端程序集: $BACKEND_DLL"
+
+                            # 后台启动 API 服务（工作目录为发布目录，appsettings.json 从这里读取）
+                            cd "$(dirname "$BACKEND_DLL")"
 
                             # 使用环境变量启动 API（直接在 nohup 命令中设置）
                             # 使用容器名和内部端口（PostgreSQL 容器在同一个 Docker 网络中）
-                            nohup env \
+                            # setsid 让 API 在独立的会话中运行（进程组 ID = API_PID），清理时整组终止，不留下孤儿进程
+                            # 直接启动 dll 不读取 launchSettings.json，Swagger 只在 Development 环境下映射，
+                            # 下面的就绪检查依赖 /swagger/index.html，因此与测试框架一样使用 Development
+                            setsid nohup env \
                                 ConnectionStrings__DefaultConnection="Host=todoapp-postgres-test;Port=5432;Database=todoapp_test;Username=postgres;Password=postgres" \
-                                ASPNETCORE_ENVIRONMENT=Test \
-                                dotnet run --urls http://localhost:5085 > ../api.log 2>&1 &
+                                ASPNETCORE_ENVIRONMENT=Development \
+                                dotnet "$BACKEND_DLL" --urls http://localhost:5085 > "${WORKSPACE}/api.log" 2>&1 &
                             API_PID=$!
-                            echo $API_PID > ../api.pid
+                            echo $API_PID > "${WORKSPACE}/api.pid"
                             echo "API 进程 PID: $API_PID"
 
                             # 等待 API 启动
                             echo "等待 API 服务启动..."
                             API_STARTED=false
-                            MAX_RETRIES=60
+                            MAX_RETRIES=30
                             RETRY_COUNT=0
 
                             while [ $RETRY_COUNT -lt $MAX_RETRIES ]; do
-                                # 检查端口是否在监听（不检查 PID，因为 dotnet run 会在编译后替换进程）
                                 if curl -s -f http://localhost:5085/swagger/index.html > /dev/null 2>&1; then
                                     echo "✅ API 服务已启动并就绪"
                                     API_STARTED=true
                                     break
                                 fi
 
+                                # 直接启动 dll 时进程不会被替换，进程退出即启动失败
+                                if ! kill -0 $API_PID 2>/dev/null; then
+                                    echo "错误: API 进程已退出"
+                                    break
+                                fi
+
                                 RETRY_COUNT=$((RETRY_COUNT + 1))
                                 echo "等待 API 启动... ($RETRY_COUNT/$MAX_RETRIES)"
 
                                 if [ $((RETRY_COUNT % 5)) -eq 0 ]; then
                                     echo "当前 API 日志（最后 20 行）:"
-                                    tail -20 ../api.log 2>/dev/null || echo "日志文件为空或不存在"
+                                    tail -20 "${WORKSPACE}/api.log" 2>/dev/null || echo "日志文件为空或不存在"
                                 fi
 
-                                sleep 2
+                                sleep 1
                             done
 
                             if [ "$API_STARTED" = false ]; then
-                                echo "错误: API 服务启动超时"
-                                cat ../api.log || true
+                                echo "错误: API 服务启动失败"
+                                cat "${WORKSPACE}/api.log" || true
                                 exit 1
                             fi
 
                             echo "=== 运行 E2E 测试 ==="
-                            cd ../todoapp-backend-api-e2etest
+                            cd "${WORKSPACE}/todoapp-backend-api-e2etest"
                             . venv/bin/activate
                             pytest --alluredir=test-results/allure-results -v
                         '''
@@ -412,13 +430,16 @@ pipeline {
                         sh '''
                             if [ -f api.pid ]; then
                                 PID=$(cat api.pid)
-                                if ps -p $PID > /dev/null 2>&1; then
-                                    echo "停止 API 服务 (PID: $PID)"
-                                    kill $PID || true
-                                    sleep 2
-                                    if ps -p $PID > /dev/null 2>&1; then
-                                        kill -9 $PID || true
-                                    fi
+                                # API 以 setsid 启动，进程组 ID 等于 PID：向整个进程组发送信号
+                                if kill -0 -- -$PID 2>/dev/null; then
+                                    echo "停止 API 服务 (进程组: $PID)"
+                                    kill -TERM -- -$PID 2>/dev/null || true
+                                    # 最多等待 3 秒，进程组退出后立即继续
+                                    for i in $(seq 1 30); do
+                                        kill -0 -- -$PID 2>/dev/null || break
+                                        sleep 0.1
+                                    done
+                                    kill -KILL -- -$PID 2>/dev/null || true
                                 fi
                                 rm -f api.pid
                             fi
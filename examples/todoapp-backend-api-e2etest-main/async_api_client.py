@@ -0,0 +1,112 @@
+"""
+异步 API 客户端
+基于 asyncio + httpx.AsyncClient，与同步的 APIClient 并存，用于并发场景：
+同一时刻发出 N 个请求（重复用户名注册竞争、并行创建待办事项等），并统计吞吐量。
+请求耗时与 APIClient 使用相同的 RequestTiming 记录，可以汇入会话级耗时汇总。
+"""
+import asyncio
+import os
+import time
+import httpx
+from api_client import API_CONNECT_TIMEOUT, API_READ_TIMEOUT, RequestTiming, percentile
+
+# 并发请求时的最大连接数（同时也是默认的最大并发数）
+ASYNC_API_MAX_CONNECTIONS = int(os.getenv("ASYNC_API_MAX_CONNECTIONS", "50"))
+
+
+class ConcurrentResult:
+    """一组并发请求的结果：responses 与请求顺序一致，请求异常时对应位置为异常对象"""
+
+    def __init__(self, responses, timings, elapsed):
+        self.responses = responses
+        self.timings = timings
+        self.elapsed = elapsed
+
+    @property
+    def status_codes(self):
+        return [getattr(response, "status_code", None) for response in self.responses]
+
+    @property
+    def errors(self):
+        return [response for response in self.responses if isinstance(response, Exception)]
+
+    @property
+    def throughput(self):
+        """每秒完成的请求数"""
+        return len(self.responses) / self.elapsed if self.elapsed > 0 else 0.0
+
+    def count_status(self, *status_codes):
+        return sum(1 for status_code in self.status_codes if status_code in status_codes)
+
+    def summary(self):
+        latencies = sorted(timing.elapsed * 1000 for timing in self.timings)
+        return (
+            f"{len(self.responses)} 个请求，耗时 {self.elapsed:.3f} s，吞吐量 {self.throughput:.1f} 请求/秒，"
+            f"P50 {percentile(latencies, 0.5) or 0:.1f} ms，P95 {percentile(latencies, 0.95) or 0:.1f} ms，"
+            f"异常 {len(self.errors)} 个"
+        )
+
+
+class AsyncAPIClient:
+    """异步 API 客户端，需要在事件循环中通过 async with 使用"""
+
+    def __init__(self, base_url, token=None, timeout=(API_CONNECT_TIMEOUT, API_READ_TIMEOUT),
+                 max_connections=ASYNC_API_MAX_CONNECTIONS):
+        connect_timeout, read_timeout = timeout
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        self.client = httpx.AsyncClient(
+            base_url=base_url,
+            headers=headers,
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
+        self.max_connections = max_connections
+        self.timings = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.client.aclose()
+
+    async def request(self, method, endpoint, **kwargs):
+        """发送请求并记录耗时"""
+        start = time.perf_counter()
+        status_code = None
+        try:
+            response = await self.client.request(method, endpoint, **kwargs)
+            status_code = response.status_code
+            return response
+        finally:
+            self.timings.append(RequestTiming(method, endpoint, status_code, time.perf_counter() - start))
+
+    async def gather(self, requests, concurrency=None):
+        """并发发送一组请求 [(方法, 路径, 参数字典), ...]，同时进行中的请求不超过 concurrency 个"""
+        semaphore = asyncio.Semaphore(concurrency or self.max_connections)
+
+        async def send(method, endpoint, kwargs):
+            async with semaphore:
+                return await self.request(method, endpoint, **kwargs)
+
+        start = time.perf_counter()
+        first_timing = len(self.timings)
+        responses = await asyncio.gather(
+            *(send(method, endpoint, kwargs) for method, endpoint, kwargs in requests),
+            return_exceptions=True
+        )
+        return ConcurrentResult(list(responses), self.timings[first_timing:], time.perf_counter() - start)
+
+
+def run_concurrently(base_url, requests, token=None, concurrency=None, timings=None):
+    """在新的事件循环中并发发送一组请求并返回 ConcurrentResult（供同步的步骤定义调用）
+
+    timings 为列表时（例如 APIClient.timings），请求耗时会追加到其中，计入会话级耗时汇总。
+    """
+    async def main():
+        async with AsyncAPIClient(base_url, token=token) as client:
+            return await client.gather(requests, concurrency=concurrency)
+
+    result = asyncio.run(main())
+    if timings is not None:
+        timings.extend(result.timings)
+    return result
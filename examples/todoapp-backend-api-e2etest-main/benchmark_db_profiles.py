@@ -0,0 +1,143 @@
+"""
+数据库配置档基准测试
+依次用每个配置档（见 db_profiles.py）重新创建测试数据库容器，比较容器启动、各重置策略和批量初始化数据的耗时。
+每个配置档在独立的子进程中运行（conftest 中的连接池、模板库等状态按进程缓存），与测试使用同一套启动和重置函数。
+
+用法：
+    python benchmark_db_profiles.py                                  # 比较 default 与 fast
+    python benchmark_db_profiles.py --iterations 50 --workers 4 --strategies truncate template
+
+结果输出到控制台，并写入 test-results/db-profile-benchmark.json。
+注意：每个配置档都会删除并重新创建测试数据库容器（TEST_DB_CONTAINER），不要在测试运行期间执行。
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from api_client import percentile
+
+SUITE_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(SUITE_DIR, "test-results")
+
+
+def measure(action, iterations, prepare=None):
+    """执行 iterations 次 action，返回耗时统计（毫秒）；prepare 在每次执行前调用，不计入耗时"""
+    durations = []
+    for _ in range(iterations):
+        if prepare is not None:
+            prepare()
+        start = time.perf_counter()
+        action()
+        durations.append((time.perf_counter() - start) * 1000)
+    durations.sort()
+    return {
+        "iterations": iterations,
+        "mean_ms": round(statistics.mean(durations), 2),
+        "p50_ms": round(percentile(durations, 0.50), 2),
+        "p95_ms": round(percentile(durations, 0.95), 2),
+        "max_ms": round(durations[-1], 2),
+    }
+
+
+def run_profile(profile, workers, iterations, strategies, dataset_size):
+    """子进程：用指定配置档重新创建数据库容器并测量，返回结果"""
+    import conftest as env
+    from seeding import generate_dataset, seed_dataset
+
+    server_args = env.apply_profile(workers, profile)
+    print(f"\n=== 配置档 {profile}: postgres {server_args} ===", flush=True)
+    # 删除旧容器，每个配置档都从全新的容器开始
+    env.stop_docker_compose()
+    start = time.perf_counter()
+    env.start_docker_compose()
+    env.wait_for_database()
+    startup_ms = round((time.perf_counter() - start) * 1000, 2)
+
+    results = {}
+    for strategy in strategies:
+        reset = env.DB_RESET_STRATEGIES[strategy]
+        reset()  # 预热：首次调用会建表、构建模板库
+        results[f"reset:{strategy}"] = measure(reset, iterations)
+
+    users, projects_per_user, todos_per_project = dataset_size
+    dataset = generate_dataset(users, projects_per_user, todos_per_project)
+
+    def seed():
+        with env.get_db_pool().connection(autocommit=False) as conn:
+            seed_dataset(conn, dataset)
+
+    env.truncate_database()
+    seed()  # 预热：填充密码哈希缓存
+    results["seed"] = measure(seed, iterations, prepare=env.truncate_database)
+    env.close_db_pool()
+    return {"profile": profile, "server_args": server_args, "startup_ms": startup_ms, "timings": results}
+
+
+def run_in_subprocess(profile, args):
+    """在子进程中运行一个配置档，返回结果（子进程失败时返回 None）"""
+    output_path = os.path.join(RESULTS_DIR, f"db-profile-{profile}.json")
+    command = [
+        sys.executable, os.path.abspath(__file__), "--run", profile, "--output", output_path,
+        "--workers", str(args.workers), "--iterations", str(args.iterations),
+        "--dataset", *map(str, args.dataset), "--strategies", *args.strategies,
+    ]
+    env = dict(os.environ, TEST_DB_PROFILE=profile)
+    # 配置档参数由子进程生成，不使用外部设置的启动参数
+    env.pop("TEST_DB_SERVER_ARGS", None)
+    returncode = subprocess.run(command, cwd=SUITE_DIR, env=env).returncode
+    if returncode != 0 or not os.path.exists(output_path):
+        print(f"配置档 {profile} 运行失败（退出码 {returncode}）")
+        return None
+    with open(output_path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def print_summary(results):
+    print("\n=== 数据库配置档对比（平均耗时，毫秒）===")
+    baseline = results[0]
+    print(f"{'项目':<20}" + "".join(f"{result['profile']:>12}" for result in results) + f"{'加速比':>10}")
+    rows = [("容器启动", [result["startup_ms"] for result in results])]
+    for name in baseline["timings"]:
+        rows.append((name, [result["timings"][name]["mean_ms"] for result in results]))
+    for name, values in rows:
+        speedup = f"{values[0] / values[-1]:.2f}x" if values[-1] else "-"
+        print(f"{name:<20}" + "".join(f"{value:>12.2f}" for value in values) + f"{speedup:>10}")
+    print(f"\n加速比 = {baseline['profile']} / {results[-1]['profile']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="比较不同数据库配置档的重置和数据初始化耗时")
+    parser.add_argument("--profiles", nargs="+", default=["default", "fast"], help="要比较的配置档（第一个作为基准）")
+    parser.add_argument("--workers", type=int, default=1, help="生成配置档时假设的并行 worker 数")
+    parser.add_argument("--iterations", type=int, default=20, help="每项测量的次数")
+    parser.add_argument("--strategies", nargs="+", default=["truncate", "template", "recreate"], help="要测量的重置策略")
+    parser.add_argument("--dataset", nargs=3, type=int, default=[10, 10, 10], metavar=("USERS", "PROJECTS", "TODOS"),
+                        help="初始化数据集规模：用户数、每个用户的项目数、每个项目的待办事项数")
+    parser.add_argument("--run", help=argparse.SUPPRESS)
+    parser.add_argument("--output", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    if args.run:
+        result = run_profile(args.run, args.workers, args.iterations, args.strategies, args.dataset)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        return 0
+
+    results = [run_in_subprocess(profile, args) for profile in args.profiles]
+    if None in results:
+        return 1
+    print_summary(results)
+
+    output_path = os.path.join(RESULTS_DIR, "db-profile-benchmark.json")
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"\n详细结果: {output_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
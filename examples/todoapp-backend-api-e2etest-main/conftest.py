@@ -2,16 +2,34 @@
 pytest 配置文件
 负责测试环境的启动、关闭和数据库重置
 """
+import itertools
 import os
 import pathlib
 import subprocess
+import threading
+from contextlib import contextmanager
 import time
+from urllib.parse import urlparse
 import psycopg2
 from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+from psycopg2.pool import ThreadedConnectionPool
 import pytest
 import requests
 from dotenv import load_dotenv
 from pytest_bdd import scenarios
+from api_client import APIClient
+from async_api_client import run_concurrently
+from readiness import wait_until
+from seeding import seed_dataset
+from backend_build import get_prebuilt_launch
+import step_timing
+from process_output import get_output_collector, format_service_tails
+from process_supervisor import get_supervisor
+from ports import PORT_ALLOCATION, find_free_port, replace_port, get_published_port
+from db_profiles import TEST_DB_PROFILE, apply_profile, read_active_settings
+from docker_engine import (
+    DOCKER_ENGINE, DOCKER_API_ERRORS, get_docker_compose_cmd, get_docker_engine, get_container_health, postgres_test_spec
+)
 
 # 加载环境变量
 load_dotenv()
@@ -19,33 +37,302 @@ load_dotenv()
 
 # 移除 pytest_configure，让 pytest-bdd 自动发现 feature 文件
 
+# 并行测试配置（pytest-xdist）
+# xdist 在 worker 进程加载 conftest 之前设置 PYTEST_XDIST_WORKER（如 "gw0"），串行运行时为空
+XDIST_WORKER = os.getenv("PYTEST_XDIST_WORKER")
+
+
+def get_worker_index():
+    """返回当前 xdist worker 的序号，串行运行时返回 None"""
+    if not XDIST_WORKER:
+        return None
+    return int(XDIST_WORKER.lstrip("gw"))
+
+
+def build_worker_url(base_url):
+    """为当前 worker 生成独立端口的 URL（基础端口 + 1 + worker 序号），串行运行时原样返回"""
+    index = get_worker_index()
+    if index is None:
+        return base_url
+    return replace_port(base_url, (urlparse(base_url).port or 80) + 1 + index)
+
+
+# 动态分配端口（见 ports.py）
+DYNAMIC_PORTS = PORT_ALLOCATION == "dynamic"
+
+
+def resolve_api_base_url():
+    """API 地址：显式配置优先；串行运行时后端由外部启动，使用固定地址；
+    并行模式下每个 worker 自己启动后端，动态模式下申请空闲端口（否则按 worker 序号偏移端口）
+    """
+    if os.getenv("API_BASE_URL") or not (DYNAMIC_PORTS and XDIST_WORKER):
+        return build_worker_url(os.getenv("API_BASE_URL", "http://localhost:5085"))
+    return replace_port("http://localhost:5085", find_free_port())
+
+
+def allocate_db_port():
+    """并行模式的控制进程在启动 Docker Compose 前为测试数据库选择宿主机端口
+
+    只在 TEST_DB_PORT 未显式配置且所有后端都由 worker 启动（并行模式）时动态分配：串行运行时后端由外部启动，
+    数据库保持固定端口。优先复用已运行容器映射的端口，否则申请空闲端口；结果写回环境变量，
+    docker compose（TEST_DB_PUBLISHED_PORT 端口映射）和随后启动的 worker 都继承同一个端口。
+    """
+    global TEST_DB_PORT
+    if os.getenv("TEST_DB_PORT") or not DYNAMIC_PORTS:
+        return
+    TEST_DB_PORT = str(get_published_port(TEST_DB_CONTAINER, 5432) or find_free_port())
+    os.environ["TEST_DB_PORT"] = TEST_DB_PORT
+    os.environ["TEST_DB_PUBLISHED_PORT"] = TEST_DB_PORT
+
+
 # 测试配置
 TEST_DB_HOST = os.getenv("TEST_DB_HOST", "localhost")
+TEST_DB_CONTAINER = os.getenv("TEST_DB_CONTAINER", "todoapp-postgres-test")
+# DOCKER_ENGINE=api 时数据库容器加入的网络（与 docker-compose.test.yml 一致）
+TEST_DB_NETWORKS = ("jenkinsdeploy_default",)
 TEST_DB_PORT = os.getenv("TEST_DB_PORT", "5433")
-TEST_DB_NAME = os.getenv("TEST_DB_NAME", "todoapp_test")
+# 数据库在本机时，docker-compose.test.yml 把容器映射到 TEST_DB_PORT
+if TEST_DB_HOST in ("localhost", "127.0.0.1"):
+    os.environ.setdefault("TEST_DB_PUBLISHED_PORT", TEST_DB_PORT)
+TEST_DB_BASE_NAME = os.getenv("TEST_DB_NAME", "todoapp_test")
+# 并行模式下每个 worker 使用独立数据库，例如 todoapp_test_gw0
+TEST_DB_NAME = f"{TEST_DB_BASE_NAME}_{XDIST_WORKER}" if XDIST_WORKER else TEST_DB_BASE_NAME
+# 模板数据库（template 重置策略）与执行 DROP/CREATE DATABASE 时使用的维护库
+TEST_DB_TEMPLATE_NAME = f"{TEST_DB_NAME}_template"
+TEST_DB_MAINTENANCE_NAME = os.getenv("TEST_DB_MAINTENANCE_NAME", "postgres")
 TEST_DB_USER = os.getenv("TEST_DB_USER", "postgres")
 TEST_DB_PASSWORD = os.getenv("TEST_DB_PASSWORD", "postgres")
-API_BASE_URL = os.getenv("API_BASE_URL", "http://localhost:5085")
+# 每个测试前的数据库重置策略：truncate（默认）/ template / recreate
+DB_RESET_STRATEGY = os.getenv("DB_RESET_STRATEGY", "truncate")
+# 测试用户初始化方式：direct（默认，使用缓存的 bcrypt 哈希直接写库）/ api（调用注册接口，由后端计算哈希）
+USER_SEED_MODE = os.getenv("USER_SEED_MODE", "direct")
+# 测试数据库连接池配置（连接空闲超过 DB_POOL_IDLE_TIMEOUT 秒后在下次借出时重建）
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "5"))
+DB_POOL_IDLE_TIMEOUT = float(os.getenv("DB_POOL_IDLE_TIMEOUT", "60"))
+# 测试隔离模式：reset（默认，每个测试前重置）/ rollback（测试结束后整体回滚，也可用 @rollback 标签按场景启用）
+DB_ISOLATION = os.getenv("DB_ISOLATION", "reset")
+# 串行运行时后端由外部启动，测试框架无法为它关闭连接池；确认外部后端的连接字符串已带 Pooling=false 后设置为 true
+# 才允许 template 重置策略和 rollback 隔离
+EXTERNAL_BACKEND_UNPOOLED = os.getenv("EXTERNAL_BACKEND_UNPOOLED", "false").lower() == "true"
+API_BASE_URL = resolve_api_base_url()
+DB_STARTUP_TIMEOUT = int(os.getenv("DB_STARTUP_TIMEOUT", "30"))
 API_STARTUP_TIMEOUT = int(os.getenv("API_STARTUP_TIMEOUT", "30"))
+# 后端 (ASP.NET Core) 开始监听端口时输出的日志
+API_READY_MARKER = "Now listening on"
+BACKEND_DIR = os.path.abspath(os.getenv(
+    "BACKEND_DIR",
+    os.path.join(os.path.dirname(__file__), "..", "todoapp-backend-api-main")
+))
+# 后端启动方式：prebuilt（默认，按源码哈希 dotnet publish 一次并直接启动 dll）/ run（dotnet run）
+BACKEND_LAUNCH_MODE = os.getenv("BACKEND_LAUNCH_MODE", "prebuilt")
+# 测试失败时附加到报告中的每个服务最近输出行数
+PROCESS_OUTPUT_FAILURE_LINES = int(os.getenv("PROCESS_OUTPUT_FAILURE_LINES", "50"))
+
+
+def is_xdist_controller(config):
+    """判断当前进程是否为 xdist 的控制进程（使用了 -n 且不是 worker）"""
+    return not hasattr(config, "workerinput") and bool(getattr(config.option, "numprocesses", None))
+
+
+def get_worker_count(config):
+    """xdist worker 数（串行运行时为 1）"""
+    numprocesses = getattr(config.option, "numprocesses", None)
+    return numprocesses if isinstance(numprocesses, int) and numprocesses > 0 else 1
+
+
+# 本次会话收集到的测试中是否有带 @rollback 标签的场景（由 pytest_collection_modifyitems 设置）
+_rollback_marker_collected = False
+
+
+def pytest_collection_modifyitems(config, items):
+    """记录是否有场景使用 rollback 隔离：xdist worker 在收集完成后才启动后端，据此决定是否关闭后端连接池"""
+    global _rollback_marker_collected
+    _rollback_marker_collected = any(item.get_closest_marker("rollback") is not None for item in items)
+
+
+def rollback_isolation_enabled():
+    """本次会话是否会使用 rollback 隔离（DB_ISOLATION=rollback 或收集到带 @rollback 标签的场景）"""
+    return DB_ISOLATION == "rollback" or _rollback_marker_collected
+
+
+def pytest_configure(config):
+    """注册耗时统计插件；并行模式下由控制进程统一启动一次 Docker Compose，worker 只负责各自的数据库和 API"""
+    # 步骤和 fixture 耗时统计（见 step_timing.py）
+    step_timing.register(config)
+    # 按 worker 数生成数据库配置档（worker 继承控制进程的环境变量）
+    if not XDIST_WORKER:
+        apply_profile(get_worker_count(config))
+    if is_xdist_controller(config):
+        allocate_db_port()
+        print(f"\n=== 并行模式：控制进程启动共享测试数据库（端口 {TEST_DB_PORT}）===")
+        start_docker_compose()
+        wait_for_database()
+
+
+def get_db_connect_params(database=None):
+    """获取数据库连接参数（默认连接当前 worker 的测试数据库）"""
+    return {
+        "host": TEST_DB_HOST,
+        "port": TEST_DB_PORT,
+        "database": database or TEST_DB_NAME,
+        "user": TEST_DB_USER,
+        "password": TEST_DB_PASSWORD,
+    }
 
 
-def get_db_connection():
-    """获取数据库连接"""
-    return psycopg2.connect(
-        host=TEST_DB_HOST,
-        port=TEST_DB_PORT,
-        database=TEST_DB_NAME,
-        user=TEST_DB_USER,
-        password=TEST_DB_PASSWORD
+def get_db_connection(database=None):
+    """获取一个独立的数据库连接（不经过连接池，用于维护库、模板库等）"""
+    return psycopg2.connect(**get_db_connect_params(database))
+
+
+class DatabasePool:
+    """测试数据库连接池，复用连接以省去每次 TCP/认证握手
+
+    基于 ThreadedConnectionPool，额外记录每个连接的归还时间，
+    借出时丢弃空闲超过 idle_timeout 秒或已断开的连接并重新建立。
+    """
+    
+    def __init__(self, minconn=None, maxconn=None, idle_timeout=None):
+        self.minconn = DB_POOL_MIN_SIZE if minconn is None else minconn
+        self.maxconn = DB_POOL_MAX_SIZE if maxconn is None else maxconn
+        self.idle_timeout = DB_POOL_IDLE_TIMEOUT if idle_timeout is None else idle_timeout
+        self._last_used = {}
+        self._pool = ThreadedConnectionPool(self.minconn, self.maxconn, **get_db_connect_params())
+    
+    def getconn(self):
+        """借出一个可用连接"""
+        while True:
+            conn = self._pool.getconn()
+            last_used = self._last_used.pop(id(conn), None)
+            idle_expired = last_used is not None and time.monotonic() - last_used > self.idle_timeout
+            if conn.closed or idle_expired:
+                self._pool.putconn(conn, close=True)
+                continue
+            return conn
+    
+    def putconn(self, conn, close=False):
+        """归还连接，close=True 时直接关闭"""
+        if not close and not conn.closed:
+            self._last_used[id(conn)] = time.monotonic()
+        self._pool.putconn(conn, close=close or bool(conn.closed))
+    
+    @contextmanager
+    def connection(self, autocommit=True):
+        """借出连接的上下文管理器：非 autocommit 模式下正常退出提交、异常时回滚"""
+        conn = self.getconn()
+        broken = False
+        try:
+            conn.autocommit = autocommit
+            yield conn
+            if not autocommit:
+                conn.commit()
+        except Exception:
+            if not conn.closed and not autocommit:
+                conn.rollback()
+            broken = bool(conn.closed)
+            raise
+        finally:
+            self.putconn(conn, close=broken)
+    
+    def clear(self):
+        """关闭所有空闲连接（数据库被删除或重命名前调用），之后按需重新建立"""
+        self._pool.closeall()
+        self._last_used.clear()
+        self._pool = ThreadedConnectionPool(0, self.maxconn, **get_db_connect_params())
+    
+    def close(self):
+        """关闭连接池"""
+        self._pool.closeall()
+        self._last_used.clear()
+
+
+# 当前进程的连接池（首次使用时创建）
+_db_pool = None
+
+
+def get_db_pool():
+    """获取当前进程的测试数据库连接池，不存在时创建"""
+    global _db_pool
+    if _db_pool is None:
+        _db_pool = DatabasePool()
+    return _db_pool
+
+
+def clear_db_pool():
+    """清空连接池中的连接（数据库将被删除或替换时调用）"""
+    if _db_pool is not None:
+        _db_pool.clear()
+
+
+def close_db_pool():
+    """关闭当前进程的连接池"""
+    global _db_pool
+    if _db_pool is not None:
+        _db_pool.close()
+        _db_pool = None
+
+
+# 表结构 DDL（基于 EF Core 模型）
+SCHEMA_DDL = [
+    # Users 表
+    """
+    CREATE TABLE IF NOT EXISTS "Users" (
+        "Id" SERIAL PRIMARY KEY,
+        "Username" VARCHAR(50) NOT NULL UNIQUE,
+        "Email" VARCHAR(100) NOT NULL UNIQUE,
+        "PasswordHash" TEXT NOT NULL,
+        "CreatedAt" TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    # Projects 表
+    """
+    CREATE TABLE IF NOT EXISTS "Projects" (
+        "Id" SERIAL PRIMARY KEY,
+        "Name" VARCHAR(200) NOT NULL,
+        "Description" TEXT,
+        "UserId" INTEGER NOT NULL,
+        "CreatedAt" TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        "UpdatedAt" TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        CONSTRAINT "FK_Projects_Users_UserId" FOREIGN KEY ("UserId") 
+            REFERENCES "Users" ("Id") ON DELETE CASCADE
     )
+    """,
+    # Todos 表
+    """
+    CREATE TABLE IF NOT EXISTS "Todos" (
+        "Id" SERIAL PRIMARY KEY,
+        "Title" VARCHAR(200) NOT NULL,
+        "Description" TEXT,
+        "IsCompleted" BOOLEAN NOT NULL DEFAULT FALSE,
+        "ProjectId" INTEGER NOT NULL,
+        "CreatedAt" TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        "UpdatedAt" TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        CONSTRAINT "FK_Todos_Projects_ProjectId" FOREIGN KEY ("ProjectId") 
+            REFERENCES "Projects" ("Id") ON DELETE CASCADE
+    )
+    """,
+    # 索引
+    'CREATE INDEX IF NOT EXISTS "IX_Users_Username" ON "Users" ("Username")',
+    'CREATE INDEX IF NOT EXISTS "IX_Users_Email" ON "Users" ("Email")',
+    'CREATE INDEX IF NOT EXISTS "IX_Projects_UserId" ON "Projects" ("UserId")',
+    'CREATE INDEX IF NOT EXISTS "IX_Todos_ProjectId" ON "Todos" ("ProjectId")',
+]
 
+# 当前进程中 truncate / template 策略的一次性准备状态
+_truncate_sql = None
+_template_ready = False
 
-def reset_database():
-    """重置数据库：删除所有表并重新创建"""
-    conn = None
-    try:
-        conn = get_db_connection()
-        conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+
+def create_schema(cursor):
+    """在当前连接的数据库中创建表结构和索引"""
+    for ddl in SCHEMA_DDL:
+        cursor.execute(ddl)
+
+
+def recreate_database_schema():
+    """删除所有表和序列并重新创建表结构（recreate 策略）"""
+    with get_db_pool().connection() as conn:
         cursor = conn.cursor()
         
         # 删除所有表（按依赖顺序）
@@ -70,144 +357,251 @@ def reset_database():
             END $$;
         """)
         
-        # 创建表结构（基于 EF Core 模型）
-        # Users 表
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS "Users" (
-                "Id" SERIAL PRIMARY KEY,
-                "Username" VARCHAR(50) NOT NULL UNIQUE,
-                "Email" VARCHAR(100) NOT NULL UNIQUE,
-                "PasswordHash" TEXT NOT NULL,
-                "CreatedAt" TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        # Projects 表
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS "Projects" (
-                "Id" SERIAL PRIMARY KEY,
-                "Name" VARCHAR(200) NOT NULL,
-                "Description" TEXT,
-                "UserId" INTEGER NOT NULL,
-                "CreatedAt" TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
-                "UpdatedAt" TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
-                CONSTRAINT "FK_Projects_Users_UserId" FOREIGN KEY ("UserId") 
-                    REFERENCES "Users" ("Id") ON DELETE CASCADE
-            )
-        """)
-        
-        # Todos 表
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS "Todos" (
-                "Id" SERIAL PRIMARY KEY,
-                "Title" VARCHAR(200) NOT NULL,
-                "Description" TEXT,
-                "IsCompleted" BOOLEAN NOT NULL DEFAULT FALSE,
-                "ProjectId" INTEGER NOT NULL,
-                "CreatedAt" TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
-                "UpdatedAt" TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
-                CONSTRAINT "FK_Todos_Projects_ProjectId" FOREIGN KEY ("ProjectId") 
-                    REFERENCES "Projects" ("Id") ON DELETE CASCADE
-            )
-        """)
-        
-        # 创建索引
-        cursor.execute('CREATE INDEX IF NOT EXISTS "IX_Users_Username" ON "Users" ("Username")')
-        cursor.execute('CREATE INDEX IF NOT EXISTS "IX_Users_Email" ON "Users" ("Email")')
-        cursor.execute('CREATE INDEX IF NOT EXISTS "IX_Projects_UserId" ON "Projects" ("UserId")')
-        cursor.execute('CREATE INDEX IF NOT EXISTS "IX_Todos_ProjectId" ON "Todos" ("ProjectId")')
-        
+        create_schema(cursor)
+        cursor.close()
+
+
+def truncate_database():
+    """清空所有表数据并重置自增序列（truncate 策略）
+
+    首次调用时按 recreate 策略建好表结构并缓存 TRUNCATE 语句，
+    之后每次重置只需一条 TRUNCATE ... RESTART IDENTITY CASCADE。
+    """
+    global _truncate_sql
+    if _truncate_sql is None:
+        recreate_database_schema()
+    
+    with get_db_pool().connection() as conn:
+        cursor = conn.cursor()
+        if _truncate_sql is None:
+            cursor.execute("SELECT tablename FROM pg_tables WHERE schemaname = 'public' ORDER BY tablename")
+            tables = ", ".join(f'"{row[0]}"' for row in cursor.fetchall())
+            _truncate_sql = f"TRUNCATE {tables} RESTART IDENTITY CASCADE"
+        cursor.execute(_truncate_sql)
+        cursor.close()
+
+
+def build_template_database():
+    """创建只包含表结构的模板数据库（每个进程只构建一次）"""
+    global _template_ready
+    conn = None
+    try:
+        conn = get_db_connection(TEST_DB_MAINTENANCE_NAME)
+        conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+        cursor = conn.cursor()
+        cursor.execute(f'DROP DATABASE IF EXISTS "{TEST_DB_TEMPLATE_NAME}" WITH (FORCE)')
+        cursor.execute(f'CREATE DATABASE "{TEST_DB_TEMPLATE_NAME}"')
         cursor.close()
-        print("数据库已重置并创建表结构")
-    except Exception as e:
-        print(f"重置数据库时出错: {e}")
-        raise
     finally:
         if conn:
             conn.close()
+    
+    conn = None
+    try:
+        conn = get_db_connection(TEST_DB_TEMPLATE_NAME)
+        conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+        cursor = conn.cursor()
+        create_schema(cursor)
+        cursor.close()
+    finally:
+        if conn:
+            conn.close()
+    _template_ready = True
+    print(f"模板数据库已创建: {TEST_DB_TEMPLATE_NAME}")
 
 
-def wait_for_database(max_retries=30, retry_interval=1):
-    """等待数据库就绪"""
-    for i in range(max_retries):
-        try:
-            conn = get_db_connection()
+def restore_database_from_template():
+    """从模板数据库重新克隆测试数据库（template 策略）
+
+    DROP ... WITH (FORCE) 会断开后端已有的连接，因此该策略下后端连接字符串会关闭连接池。
+    """
+    if not _template_ready:
+        build_template_database()
+    
+    conn = None
+    try:
+        conn = get_db_connection(TEST_DB_MAINTENANCE_NAME)
+        conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+        cursor = conn.cursor()
+        clear_db_pool()
+        cursor.execute(f'DROP DATABASE IF EXISTS "{TEST_DB_NAME}" WITH (FORCE)')
+        cursor.execute(f'CREATE DATABASE "{TEST_DB_NAME}" TEMPLATE "{TEST_DB_TEMPLATE_NAME}"')
+        cursor.close()
+    finally:
+        if conn:
             conn.close()
-            print("数据库已就绪")
-            return True
-        except Exception as e:
-            if i < max_retries - 1:
-                print(f"等待数据库就绪... ({i+1}/{max_retries})")
-                time.sleep(retry_interval)
-            else:
-                print(f"数据库连接失败: {e}")
-                raise
-    return False
-
-
-def wait_for_api(max_retries=30, retry_interval=1):
-    """等待 API 服务就绪"""
-    for i in range(max_retries):
-        try:
-            response = requests.get(f"{API_BASE_URL}/swagger/index.html", timeout=2)
-            if response.status_code in [200, 404]:  # 404 也可以，说明服务已启动
-                print("API 服务已就绪")
-                return True
-        except requests.exceptions.RequestException:
-            pass
-        
-        if i < max_retries - 1:
-            print(f"等待 API 服务就绪... ({i+1}/{max_retries})")
-            time.sleep(retry_interval)
-        else:
-            print("API 服务启动超时")
-            raise TimeoutError("API 服务启动超时")
-    return False
 
 
-def get_docker_compose_cmd():
-    """根据操作系统检测 Docker Compose 命令"""
-    import platform
-    system = platform.system()
+DB_RESET_STRATEGIES = {
+    "truncate": truncate_database,
+    "template": restore_database_from_template,
+    "recreate": recreate_database_schema,
+}
+
+
+def reset_database(strategy=None):
+    """重置数据库（策略由 DB_RESET_STRATEGY 配置：truncate / template / recreate）"""
+    strategy = strategy or DB_RESET_STRATEGY
+    if strategy not in DB_RESET_STRATEGIES:
+        raise ValueError(f"未知的数据库重置策略: {strategy}，可选: {', '.join(DB_RESET_STRATEGIES)}")
+    if strategy == "template":
+        check_backend_pooling("template 重置策略")
+    try:
+        DB_RESET_STRATEGIES[strategy]()
+        print(f"数据库已重置（{strategy}）")
+    except Exception as e:
+        print(f"重置数据库时出错: {e}")
+        raise
+
+
+class DatabaseSwapper:
+    """rollback 隔离模式：测试结束后把测试数据库整体"回滚"到模板状态
+
+    后端通过自己的连接写入数据，无法加入测试代码的事务，因此这里在后台从模板库预先克隆好
+    下一个干净的数据库，测试结束时只需终止连接并执行两次 ALTER DATABASE ... RENAME，
+    无论场景写入了多少数据，回滚耗时都是常数；旧库的删除和下一个库的克隆在后台完成。
+    后端连接字符串需要关闭连接池（Pooling=false），使每次请求都连接到当前名为 TEST_DB_NAME 的库。
+    """
     
-    if system == "Darwin":  # macOS
-        # macOS: 使用 docker compose (V2, 无连字符)
-        try:
-            subprocess.run(
-                ["docker", "compose", "version"],
-                check=True,
-                capture_output=True,
-                text=True
-            )
-            return ["docker", "compose"]
-        except (subprocess.CalledProcessError, FileNotFoundError):
-            raise RuntimeError("未找到 docker compose 命令（macOS 需要 Docker Desktop）")
-    else:
-        # Linux/Windows: 优先使用 docker-compose (V1, 有连字符)
-        try:
-            subprocess.run(
-                ["docker-compose", "--version"],
-                check=True,
-                capture_output=True,
-                text=True
-            )
-            return ["docker-compose"]
-        except (subprocess.CalledProcessError, FileNotFoundError):
-            # 如果 docker-compose 不存在，尝试 docker compose (V2)
+    def __init__(self):
+        self._counter = itertools.count()
+        self._next_name = None
+        self._worker = None
+        if not _template_ready:
+            build_template_database()
+        self._prepare_next()
+    
+    def _prepare_next(self, trash_name=None):
+        """在后台线程中删除旧库并克隆下一个干净的数据库"""
+        self._next_name = f"{TEST_DB_NAME}_next_{next(self._counter)}"
+        next_name = self._next_name
+        
+        def work():
+            conn = get_db_connection(TEST_DB_MAINTENANCE_NAME)
             try:
-                subprocess.run(
-                    ["docker", "compose", "version"],
-                    check=True,
-                    capture_output=True,
-                    text=True
+                conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+                cursor = conn.cursor()
+                if trash_name:
+                    cursor.execute(f'DROP DATABASE IF EXISTS "{trash_name}" WITH (FORCE)')
+                cursor.execute(f'DROP DATABASE IF EXISTS "{next_name}"')
+                cursor.execute(f'CREATE DATABASE "{next_name}" TEMPLATE "{TEST_DB_TEMPLATE_NAME}"')
+                cursor.close()
+            finally:
+                conn.close()
+        
+        self._worker = threading.Thread(target=work, daemon=True)
+        self._worker.start()
+    
+    def swap(self, max_retries=5):
+        """用预先克隆好的干净数据库替换当前测试数据库"""
+        self._worker.join()
+        trash_name = f"{TEST_DB_NAME}_trash_{next(self._counter)}"
+        conn = get_db_connection(TEST_DB_MAINTENANCE_NAME)
+        try:
+            conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+            cursor = conn.cursor()
+            clear_db_pool()
+            for i in range(max_retries):
+                # 等待被终止的连接真正退出（最多 5 秒）；终止与重命名之间仍可能有新连接进入，失败时退避后重试
+                cursor.execute(
+                    "SELECT pg_terminate_backend(pid, 5000) FROM pg_stat_activity "
+                    "WHERE datname = %s AND pid <> pg_backend_pid()",
+                    (TEST_DB_NAME,)
                 )
-                return ["docker", "compose"]
-            except (subprocess.CalledProcessError, FileNotFoundError):
-                raise RuntimeError("未找到 docker-compose 或 docker compose 命令")
+                try:
+                    cursor.execute(f'ALTER DATABASE "{TEST_DB_NAME}" RENAME TO "{trash_name}"')
+                    break
+                except psycopg2.errors.InvalidCatalogName:
+                    trash_name = None
+                    break
+                except psycopg2.errors.ObjectInUse:
+                    if i == max_retries - 1:
+                        raise
+                    time.sleep(0.05 * 2 ** i)
+            cursor.execute(f'ALTER DATABASE "{self._next_name}" RENAME TO "{TEST_DB_NAME}"')
+            cursor.close()
+        finally:
+            conn.close()
+        self._prepare_next(trash_name)
+
+
+def create_worker_database():
+    """为当前 xdist worker 创建独立的空数据库（已存在则先删除）"""
+    conn = None
+    try:
+        conn = get_db_connection(TEST_DB_BASE_NAME)
+        conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+        cursor = conn.cursor()
+        clear_db_pool()
+        cursor.execute(f'DROP DATABASE IF EXISTS "{TEST_DB_NAME}" WITH (FORCE)')
+        cursor.execute(f'CREATE DATABASE "{TEST_DB_NAME}"')
+        cursor.close()
+        print(f"worker {XDIST_WORKER} 的数据库已创建: {TEST_DB_NAME}")
+    finally:
+        if conn:
+            conn.close()
+
+
+def check_database_container():
+    """数据库容器已退出或健康检查失败时提前报错，避免等满超时时间"""
+    health = get_container_health(TEST_DB_CONTAINER)
+    if health is not None and health.status in ("unhealthy", "exited", "dead"):
+        raise RuntimeError(f"数据库容器 {TEST_DB_CONTAINER} 状态异常: {health.describe()}")
+
+
+def wait_for_database(timeout=DB_STARTUP_TIMEOUT):
+    """等待数据库就绪（快速探测 + 指数退避，同时参考容器的 Docker 健康检查状态）"""
+    def probe():
+        # 直接以建立连接池作为就绪探测，探测成功的连接保留在池中供后续复用
+        get_db_pool()
+        return True
+    
+    try:
+        wait_until(probe, timeout, "等待数据库就绪", abort_check=check_database_container)
+    except (TimeoutError, RuntimeError) as e:
+        print(f"数据库连接失败: {e}")
+        raise
+    with get_db_pool().connection() as conn:
+        settings = ", ".join(f"{name}={value}" for name, value in read_active_settings(conn).items())
+    print(f"数据库已就绪（配置档 {TEST_DB_PROFILE}: {settings}）")
+    return True
+
+
+def is_api_ready():
+    """API 服务是否已可以响应请求（404 也可以，说明服务已启动）"""
+    response = requests.get(f"{API_BASE_URL}/swagger/index.html", timeout=2)
+    return response.status_code in [200, 404]
+
+
+def wait_for_api(timeout=API_STARTUP_TIMEOUT, ready_event=None, process=None):
+    """等待 API 服务就绪
+
+    ready_event 由输出读取线程在看到 "Now listening on" 时设置，设置后立即重新探测；
+    传入 process 时，进程提前退出会立即报错。
+    """
+    def check_process():
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"后端进程已退出，退出码: {process.returncode}")
+    
+    try:
+        wait_until(
+            is_api_ready, timeout, "等待 API 服务就绪",
+            ready_event=ready_event, abort_check=check_process, abort_interval=0
+        )
+    except TimeoutError:
+        print("API 服务启动超时")
+        raise
+    print("API 服务已就绪")
+    return True
 
 
 def start_docker_compose():
-    """启动 Docker Compose 服务"""
+    """启动测试数据库（DOCKER_ENGINE=api 时直接调用 Docker Engine API，否则使用 Docker Compose）"""
+    # 未经 pytest_configure 直接调用时（例如基准测试脚本）按串行运行生成数据库配置档
+    apply_profile()
+    if DOCKER_ENGINE == "api":
+        start_database_container()
+        return
     compose_file = os.path.join(os.path.dirname(__file__), "docker-compose.test.yml")
     try:
         docker_compose_cmd = get_docker_compose_cmd()
@@ -227,7 +621,10 @@ def start_docker_compose():
 
 
 def stop_docker_compose():
-    """停止 Docker Compose 服务"""
+    """停止测试数据库（DOCKER_ENGINE=api 时直接删除容器，否则使用 Docker Compose）"""
+    if DOCKER_ENGINE == "api":
+        stop_database_container()
+        return
     compose_file = os.path.join(os.path.dirname(__file__), "docker-compose.test.yml")
     try:
         docker_compose_cmd = get_docker_compose_cmd()
@@ -244,16 +641,125 @@ def stop_docker_compose():
         print(f"检测 Docker Compose 命令失败: {e}")
 
 
+def start_database_container():
+    """通过 Docker Engine API 创建并启动测试数据库容器（配置与 docker-compose.test.yml 一致）"""
+    spec = postgres_test_spec(
+        os.getenv("TEST_DB_PUBLISHED_PORT", "5433"), networks=TEST_DB_NETWORKS, server_args=os.getenv("TEST_DB_SERVER_ARGS", "")
+    )
+    try:
+        previous = get_docker_engine().ensure_running(TEST_DB_CONTAINER, spec)
+    except DOCKER_API_ERRORS as e:
+        print(f"通过 Docker API 启动数据库容器失败: {e}")
+        raise
+    print(f"数据库容器 {TEST_DB_CONTAINER} 已启动（Docker API，启动前状态: {previous}）")
+
+
+def stop_database_container():
+    """通过 Docker Engine API 删除测试数据库容器"""
+    try:
+        get_docker_engine().remove(TEST_DB_CONTAINER)
+        print(f"数据库容器 {TEST_DB_CONTAINER} 已删除")
+    except DOCKER_API_ERRORS as e:
+        print(f"通过 Docker API 删除数据库容器失败: {e}")
+
+
+def start_backend_api():
+    """启动连接当前 worker 数据库的后端 API 服务（并行模式使用）"""
+    if not os.path.exists(BACKEND_DIR):
+        raise FileNotFoundError(f"后端项目目录不存在: {BACKEND_DIR}")
+    
+    env = os.environ.copy()
+    env["ConnectionStrings__DefaultConnection"] = (
+        f"Host={TEST_DB_HOST};Port={TEST_DB_PORT};Database={TEST_DB_NAME};"
+        f"Username={TEST_DB_USER};Password={TEST_DB_PASSWORD}"
+    )
+    # template 策略和 rollback 隔离会替换数据库并断开连接，关闭连接池避免复用失效连接
+    if DB_RESET_STRATEGY == "template" or rollback_isolation_enabled():
+        env["ConnectionStrings__DefaultConnection"] += ";Pooling=false"
+    # 直接启动 dll 时不会读取 launchSettings.json，与 dotnet run 保持相同的运行环境
+    env.setdefault("ASPNETCORE_ENVIRONMENT", "Development")
+    try:
+        # 多个 worker 同时调用时只有一个执行 dotnet publish，其余等待后直接命中缓存
+        if BACKEND_LAUNCH_MODE == "prebuilt":
+            command, cwd = get_prebuilt_launch(BACKEND_DIR)
+        else:
+            command, cwd = ["dotnet", "run"], BACKEND_DIR
+    except FileNotFoundError as e:
+        raise RuntimeError(f"未找到 dotnet 命令，请确保已安装 .NET SDK: {e}") from e
+    print(f"启动后端 API 服务: {API_BASE_URL} (数据库: {TEST_DB_NAME})")
+    try:
+        # 在独立的进程组中启动，停止时连同 dotnet run 派生的子进程一起终止
+        process = get_supervisor().spawn(
+            f"worker {XDIST_WORKER} 的后端 API 服务",
+            command + ["--urls", API_BASE_URL],
+            ports=[urlparse(API_BASE_URL).port],
+            cwd=cwd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            env=env,
+            bufsize=1
+        )
+    except FileNotFoundError as e:
+        raise RuntimeError(f"未找到 dotnet 命令，请确保已安装 .NET SDK: {e}") from e
+    # 输出交给统一的采集线程（滚动日志文件 + 最近输出缓冲），看到 "Now listening on" 时立即唤醒就绪等待
+    ready_event = threading.Event()
+    backend_output = get_output_collector(echo=print).attach(
+        f"backend-{XDIST_WORKER}", process.stdout, ready_marker=API_READY_MARKER, ready_event=ready_event
+    )
+    print(f"后端输出日志: {backend_output.path}")
+    
+    try:
+        wait_for_api(ready_event=ready_event, process=process)
+    except (TimeoutError, RuntimeError):
+        get_supervisor().stop([process], grace_period=0)
+        print("后端最后输出:\n" + "\n".join(backend_output.tail(50)))
+        raise
+    return process
+
+
+def stop_process(process):
+    """停止由测试环境启动的服务（整个进程树），并等待其端口释放"""
+    get_supervisor().stop([process])
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_makereport(item, call):
+    """测试失败时把由测试启动的服务最近的输出附加到报告中"""
+    outcome = yield
+    report = outcome.get_result()
+    if report.failed:
+        for title, content in format_service_tails(PROCESS_OUTPUT_FAILURE_LINES):
+            report.sections.append((title, content))
+
+
+@pytest.fixture(scope="session", autouse=True)
+def xdist_worker_environment():
+    """并行模式下每个 worker 的独立环境：独立数据库 + 独立端口的后端 API（串行运行时不做任何事）"""
+    api_process = None
+    if XDIST_WORKER:
+        print(f"\n=== worker {XDIST_WORKER}: 数据库 {TEST_DB_NAME}，API {API_BASE_URL} ===")
+        create_worker_database()
+        api_process = start_backend_api()
+    
+    yield
+    
+    if api_process:
+        stop_process(api_process)
+
+
 @pytest.fixture(scope="session")
 def test_environment():
     """测试环境启动和关闭（会话级别）"""
     print("\n=== 启动测试环境 ===")
     
-    # 启动 Docker Compose
-    start_docker_compose()
-    
-    # 等待数据库就绪
-    wait_for_database()
+    # 并行模式下共享的 Docker Compose 已由控制进程启动
+    if not XDIST_WORKER:
+        # 启动 Docker Compose
+        start_docker_compose()
+        
+        # 等待数据库就绪
+        wait_for_database()
     
     # 注意：API 服务需要手动启动，这里只检查是否就绪
     # 在实际使用中，需要在运行测试前手动启动 API 服务
@@ -271,60 +777,103 @@ def test_environment():
     # stop_docker_compose()  # 取消注释以在测试后停止服务
 
 
+@pytest.fixture(scope="session")
+def db_pool():
+    """测试数据库连接池（会话级别），供步骤定义和辅助函数复用连接"""
+    pool = get_db_pool()
+    yield pool
+    close_db_pool()
+
+
+@pytest.fixture(scope="session")
+def database_swapper(test_environment):
+    """rollback 隔离模式使用的数据库切换器（会话级别），会话开始时先切换到一个干净的库"""
+    check_backend_pooling("rollback 隔离")
+    swapper = DatabaseSwapper()
+    swapper.swap()
+    return swapper
+
+
+def check_backend_pooling(feature):
+    """template 重置策略和 rollback 隔离会强制断开后端的连接，后端必须关闭连接池，否则之后的第一个请求会使用失效的连接
+
+    只有并行模式下由测试启动的后端会自动关闭连接池；串行运行时后端由外部启动，除非显式确认，否则直接报错。
+    """
+    if XDIST_WORKER or EXTERNAL_BACKEND_UNPOOLED:
+        return
+    raise RuntimeError(
+        f"{feature}要求后端关闭连接池（Pooling=false），但串行运行时后端由外部启动，测试框架无法修改它的连接字符串。"
+        "请使用 pytest -n 运行（由测试启动后端），或在外部后端的连接字符串中添加 Pooling=false 后设置 "
+        "EXTERNAL_BACKEND_UNPOOLED=true"
+    )
+
+
+def use_rollback_isolation(request):
+    """当前测试是否使用 rollback 隔离（DB_ISOLATION=rollback 或场景带 @rollback 标签）"""
+    return DB_ISOLATION == "rollback" or request.node.get_closest_marker("rollback") is not None
+
+
 @pytest.fixture(scope="function")
-def reset_db(test_environment):
-    """每个测试前重置数据库（函数级别）"""
-    reset_database()
+def reset_db(request, test_environment):
+    """每个测试的数据库隔离（函数级别）
+
+    默认在测试前调用 reset_database()；rollback 模式下测试前无需任何操作，
+    测试结束后由 DatabaseSwapper 在常数时间内把数据库回滚到干净状态。
+    """
+    if not use_rollback_isolation(request):
+        reset_database()
+        yield
+        return
+    
+    swapper = request.getfixturevalue("database_swapper")
     yield
-    # 测试后可以选择清理或保留数据
+    swapper.swap()
 
 
 @pytest.fixture(scope="function")
-def api_client():
-    """提供 API 客户端"""
-    class APIClient:
-        def __init__(self, base_url):
-            self.base_url = base_url
-            self.session = requests.Session()
-            self.token = None
-        
-        def set_token(self, token):
-            """设置认证 token"""
-            self.token = token
-            self.session.headers.update({
-                "Authorization": f"Bearer {token}"
-            })
-        
-        def clear_token(self):
-            """清除认证 token"""
-            self.token = None
-            if "Authorization" in self.session.headers:
-                del self.session.headers["Authorization"]
-        
-        def post(self, endpoint, json=None, **kwargs):
-            """POST 请求"""
-            url = f"{self.base_url}{endpoint}"
-            return self.session.post(url, json=json, **kwargs)
-        
-        def get(self, endpoint, **kwargs):
-            """GET 请求"""
-            url = f"{self.base_url}{endpoint}"
-            return self.session.get(url, **kwargs)
-        
-        def put(self, endpoint, json=None, **kwargs):
-            """PUT 请求"""
-            url = f"{self.base_url}{endpoint}"
-            return self.session.put(url, json=json, **kwargs)
-        
-        def delete(self, endpoint, **kwargs):
-            """DELETE 请求"""
-            url = f"{self.base_url}{endpoint}"
-            return self.session.delete(url, **kwargs)
-        
-        def patch(self, endpoint, json=None, **kwargs):
-            """PATCH 请求"""
-            url = f"{self.base_url}{endpoint}"
-            return self.session.patch(url, json=json, **kwargs)
-    
-    return APIClient(API_BASE_URL)
+def seed_data(db_pool):
+    """批量写入声明式数据集（用户 -> 项目 -> 待办事项），返回 seeding.seed_dataset 的结果"""
+    def seed(dataset):
+        with db_pool.connection(autocommit=False) as conn:
+            return seed_dataset(conn, dataset)
+    return seed
+
 
+@pytest.fixture(scope="function")
+def db_transaction(test_environment, db_pool):
+    """在事务中执行的数据库连接，测试结束后回滚（只覆盖测试代码通过该连接写入的数据）"""
+    with db_pool.connection(autocommit=False) as conn:
+        try:
+            yield conn
+        finally:
+            conn.rollback()
+
+
+@pytest.fixture(scope="session")
+def api_session():
+    """会话级 API 客户端：复用 keep-alive 连接，结束时输出请求耗时汇总"""
+    client = APIClient(API_BASE_URL)
+    yield client
+    client.print_latency_summary(log=print)
+    client.close()
+
+
+@pytest.fixture(scope="function")
+def api_client(api_session):
+    """提供 API 客户端（共享会话级连接池；测试结束后清除 token 和测试中设置的请求头）"""
+    yield api_session
+    api_session.reset()
+
+
+@pytest.fixture(scope="function")
+def concurrent_requests(api_client):
+    """并发发送一组请求（asyncio + httpx）：沿用 api_client 当前的 token，请求耗时计入会话级汇总
+
+    用法：concurrent_requests([("POST", "/api/todos", {"json": {...}}), ...], concurrency=10)
+    """
+    def send(requests_to_send, concurrency=None):
+        return run_concurrently(
+            API_BASE_URL, requests_to_send, token=api_client.token,
+            concurrency=concurrency, timings=api_client.timings
+        )
+    return send
@@ -0,0 +1,90 @@
+"""
+测试数据库配置档
+测试数据库的数据目录在 tmpfs 上，容器删除后数据即丢失，崩溃恢复和持久化保证对测试没有意义：
+default：PostgreSQL 默认配置
+fast（默认）：关闭 fsync、synchronous_commit、full_page_writes，并按 worker 数调整 shared_buffers 和 max_connections
+
+通过 TEST_DB_PROFILE 选择。配置档在容器启动时以 postgres -c 参数生效：测试框架把生成的参数写入 TEST_DB_SERVER_ARGS，
+docker-compose.test.yml 的 command 读取它（DOCKER_ENGINE=api 时写入容器的启动命令），显式设置 TEST_DB_SERVER_ARGS 时不覆盖。
+shared_buffers 和 max_connections 只能在启动时设置，参数变化时 docker compose 会重新创建容器。
+
+用法（输出 postgres 启动参数，例如在流水线中启动数据库前导出）：
+    python db_profiles.py --workers 4
+"""
+import argparse
+import os
+
+TEST_DB_PROFILE = os.getenv("TEST_DB_PROFILE", "fast")
+# 每个 worker 占用的数据库连接：测试代码的连接池、维护连接（模板库、克隆库）和后端 API 的连接池
+TEST_DB_CONNECTIONS_PER_WORKER = int(os.getenv("TEST_DB_CONNECTIONS_PER_WORKER", "30"))
+
+# PostgreSQL 默认值：max_connections=100、shared_buffers=128MB
+DEFAULT_MAX_CONNECTIONS = 100
+SHARED_BUFFERS_BASE_MB = 128
+SHARED_BUFFERS_PER_WORKER_MB = 32
+SHARED_BUFFERS_MAX_MB = 1024
+
+# 启动时输出实际生效值的参数
+PROFILE_SETTINGS = ["fsync", "synchronous_commit", "full_page_writes", "shared_buffers", "max_connections"]
+
+
+def default_profile(workers):
+    return {}
+
+
+def fast_profile(workers):
+    return {
+        "fsync": "off",
+        "synchronous_commit": "off",
+        "full_page_writes": "off",
+        "shared_buffers": f"{min(SHARED_BUFFERS_BASE_MB + SHARED_BUFFERS_PER_WORKER_MB * workers, SHARED_BUFFERS_MAX_MB)}MB",
+        # 预留 10 个连接给 psql 等手动排查
+        "max_connections": str(max(DEFAULT_MAX_CONNECTIONS, TEST_DB_CONNECTIONS_PER_WORKER * workers + 10)),
+    }
+
+
+DB_PROFILES = {
+    "default": default_profile,
+    "fast": fast_profile,
+}
+
+
+def build_settings(profile=TEST_DB_PROFILE, workers=1):
+    """生成配置档的参数 {名称: 值}"""
+    if profile not in DB_PROFILES:
+        raise ValueError(f"未知的数据库配置档: {profile}，可选: {', '.join(DB_PROFILES)}")
+    return DB_PROFILES[profile](max(1, workers))
+
+
+def server_args(settings):
+    """把参数转换为 postgres 命令行参数（-c 名称=值）"""
+    return " ".join(f"-c {name}={value}" for name, value in settings.items())
+
+
+def apply_profile(workers=1, profile=TEST_DB_PROFILE):
+    """在启动数据库前生成配置档并写入 TEST_DB_SERVER_ARGS（已设置时保持不变），返回启动参数"""
+    if "TEST_DB_SERVER_ARGS" not in os.environ:
+        os.environ["TEST_DB_SERVER_ARGS"] = server_args(build_settings(profile, workers))
+    return os.environ["TEST_DB_SERVER_ARGS"]
+
+
+def read_active_settings(conn):
+    """读取数据库中实际生效的配置档参数"""
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT name, current_setting(name) FROM pg_settings WHERE name = ANY(%s)", (PROFILE_SETTINGS,)
+        )
+        values = dict(cursor.fetchall())
+    return {name: values.get(name) for name in PROFILE_SETTINGS}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="输出测试数据库配置档对应的 postgres 启动参数")
+    parser.add_argument("--profile", default=TEST_DB_PROFILE, choices=list(DB_PROFILES))
+    parser.add_argument("--workers", type=int, default=1, help="并行 worker 数")
+    args = parser.parse_args(argv)
+    print(server_args(build_settings(args.profile, args.workers)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+# language: zh-CN
+Feature: 并发请求
+  As a system user
+  I want the API to behave correctly under concurrent requests
+  So that races do not corrupt data
+
+  Scenario: 并发注册同一用户名时只创建一个用户
+    Given 数据库已重置
+    When 我并发发送 10 个用户名为 "raceuser" 的注册请求
+    Then 应该只有 1 个并发请求成功
+    And 其余并发请求都应该失败
+    And 数据库中用户名为 "raceuser" 的用户应该只有 1 个
+
+  Scenario: 同一用户并发登录
+    Given 数据库已重置
+    And 数据库中已存在用户 "concurrent"，密码为 "password123"
+    When 我并发发送 20 个用户名 "concurrent" 和密码 "password123" 的登录请求
+    Then 所有并发请求的状态码都应该是 200
+
+  Scenario: 并行创建同一项目下的待办事项
+    Given 数据库已重置
+    And 用户 "concurrent" 已登录并拥有项目 "并发项目"
+    When 我并发创建 50 个待办事项到项目 "并发项目"
+    Then 所有并发请求的状态码都应该是 201
+    And 项目 "并发项目" 中应该有 50 个待办事项
@@ -0,0 +1,12 @@
+# language: zh-CN
+Feature: 项目列表
+  As a system user
+  I want to browse my projects page by page
+  So that large project lists stay usable
+
+  Scenario: 大量项目时分页查询项目列表
+    Given 数据库中已批量创建 1 个用户，每个用户 1000 个项目，每个项目 5 个待办事项
+    When 我使用用户名 "loaduser1" 和密码 "password123" 登录
+    And 我请求第 1 页项目列表，每页 20 条
+    Then 项目列表响应状态码应该是 200
+    And 项目列表应该包含 20 个项目，总数为 1000
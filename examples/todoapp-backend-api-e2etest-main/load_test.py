@@ -0,0 +1,191 @@
+"""
+后端负载测试模式
+复用 BDD 步骤函数（create_user_in_database、send_login_request）驱动多个虚拟用户，
+按到达速率逐个启动虚拟用户，每个虚拟用户循环执行：登录 -> 查询项目列表 -> 创建待办事项，
+最后按接口输出 P50/P95/P99 延迟和错误率，作为部署前 BCrypt / EF Core 密集接口的回归信号。
+
+步骤定义模块依赖 pytest 配置（scenarios() 需要读取 bdd_features_base_dir），所以负载测试本身作为一个
+pytest 测试运行，沿用 conftest 中的测试环境、数据库重置和连接池：
+
+    python load_test.py --users 50 --arrival-rate 10 --iterations 20
+    LOAD_TEST_USERS=50 python -m pytest load_test.py -m load      # 等价的 pytest 写法
+
+结果输出到控制台，并写入 test-results/load-test-report.json；设置了阈值时超出阈值测试失败。
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from api_client import APIClient, percentile
+
+SUITE_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(SUITE_DIR, "test-results")
+
+LOAD_TEST_USERS = int(os.getenv("LOAD_TEST_USERS", "10"))
+# 每秒启动的虚拟用户数
+LOAD_TEST_ARRIVAL_RATE = float(os.getenv("LOAD_TEST_ARRIVAL_RATE", "2"))
+LOAD_TEST_ITERATIONS = int(os.getenv("LOAD_TEST_ITERATIONS", "10"))
+# 每次迭代之间的等待时间（秒）
+LOAD_TEST_THINK_TIME = float(os.getenv("LOAD_TEST_THINK_TIME", "0"))
+LOAD_TEST_PASSWORD = os.getenv("LOAD_TEST_PASSWORD", "password123")
+# 阈值（为空表示不检查）：任一接口的 P95 延迟（毫秒）或错误率超过阈值时测试失败
+LOAD_TEST_MAX_P95_MS = os.getenv("LOAD_TEST_MAX_P95_MS")
+LOAD_TEST_MAX_ERROR_RATE = os.getenv("LOAD_TEST_MAX_ERROR_RATE")
+
+
+def virtual_user(base_url, login, index, start_at, iterations, think_time, password):
+    """单个虚拟用户：到达时间之后创建一个项目，然后循环 登录 -> 查询项目列表 -> 创建待办事项
+
+    login 为登录步骤函数 send_login_request；每个虚拟用户使用独立的 APIClient（独立连接，不重试，
+    错误如实计入），返回它记录的请求耗时。
+    """
+    delay = start_at - time.monotonic()
+    if delay > 0:
+        time.sleep(delay)
+    username = f"vuser{index}"
+    client = APIClient(base_url, retries=0, pool_size=1)
+    context = {}
+    project_id = None
+    try:
+        for iteration in range(iterations):
+            response = login(client, context, username, password)
+            if response.status_code != 200:
+                continue
+            client.set_token(response.json()["token"])
+            if project_id is None:
+                response = client.post("/api/projects", json={"name": f"{username} 的项目"})
+                if response.status_code not in (200, 201):
+                    continue
+                project_id = response.json()["id"]
+            client.get("/api/projects", params={"pageNumber": 1, "pageSize": 20})
+            client.post("/api/todos", json={"title": f"{username} 的待办 {iteration}", "projectId": project_id})
+            if think_time:
+                time.sleep(think_time)
+    except Exception as e:
+        # 连接被拒绝、超时等异常已由 APIClient 记录为 status_code=None，虚拟用户提前结束
+        print(f"[虚拟用户 {username}] 异常结束: {e}")
+    finally:
+        client.close()
+    return client.timings
+
+
+def summarize(timings, wall_time):
+    """按 方法 + 路径 汇总请求数、错误率和 P50/P95/P99 延迟（毫秒）"""
+    groups = {}
+    for timing in timings:
+        key = f"{timing.method} {timing.endpoint.split('?', 1)[0]}"
+        groups.setdefault(key, []).append(timing)
+    endpoints = {}
+    for key, items in sorted(groups.items()):
+        latencies = sorted(item.elapsed * 1000 for item in items)
+        errors = sum(1 for item in items if item.status_code is None or item.status_code >= 400)
+        endpoints[key] = {
+            "count": len(items),
+            "errors": errors,
+            "error_rate": round(errors / len(items), 4),
+            "rps": round(len(items) / wall_time, 2) if wall_time > 0 else None,
+            "p50_ms": round(percentile(latencies, 0.50), 1),
+            "p95_ms": round(percentile(latencies, 0.95), 1),
+            "p99_ms": round(percentile(latencies, 0.99), 1),
+            "max_ms": round(latencies[-1], 1),
+        }
+    return endpoints
+
+
+def print_report(report):
+    print(f"\n=== 负载测试结果（{report['users']} 个虚拟用户，到达速率 {report['arrival_rate']}/s，"
+          f"每个用户 {report['iterations']} 次迭代，总耗时 {report['wall_time']} s）===")
+    print(f"{'接口':<28}{'请求数':>8}{'错误率':>10}{'RPS':>10}{'P50(ms)':>10}{'P95(ms)':>10}{'P99(ms)':>10}{'最大(ms)':>10}")
+    for key, stats in report["endpoints"].items():
+        print(
+            f"{key:<28}{stats['count']:>8}{stats['error_rate']:>10.2%}{str(stats['rps']):>10}"
+            f"{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}{stats['max_ms']:>10}"
+        )
+
+
+def check_thresholds(endpoints):
+    """返回超出阈值的描述列表"""
+    violations = []
+    for key, stats in endpoints.items():
+        if LOAD_TEST_MAX_P95_MS and stats["p95_ms"] > float(LOAD_TEST_MAX_P95_MS):
+            violations.append(f"{key} P95 {stats['p95_ms']} ms 超过阈值 {LOAD_TEST_MAX_P95_MS} ms")
+        if LOAD_TEST_MAX_ERROR_RATE and stats["error_rate"] > float(LOAD_TEST_MAX_ERROR_RATE):
+            violations.append(f"{key} 错误率 {stats['error_rate']:.2%} 超过阈值 {float(LOAD_TEST_MAX_ERROR_RATE):.2%}")
+    return violations
+
+
+@pytest.mark.load
+def test_backend_load(reset_db, api_client, db_pool):
+    """负载测试入口（只在显式指定 load_test.py 时运行，不在 testpaths 中）"""
+    # 步骤定义模块只能在 pytest 中导入，放在测试函数中，作为脚本运行时不导入
+    from conftest import API_BASE_URL
+    from step_definitions.login_steps import create_user_in_database, send_login_request
+
+    print(f"\n=== 准备 {LOAD_TEST_USERS} 个虚拟用户 ===")
+    # 建用户在压测开始前串行完成，不计入结果（连接池大小有限，不在虚拟用户线程中访问数据库）
+    for index in range(1, LOAD_TEST_USERS + 1):
+        create_user_in_database(f"vuser{index}", LOAD_TEST_PASSWORD, api_client, db_pool)
+
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=LOAD_TEST_USERS, thread_name_prefix="vuser") as executor:
+        futures = [
+            executor.submit(
+                virtual_user, API_BASE_URL, send_login_request, index, start + (index - 1) / LOAD_TEST_ARRIVAL_RATE,
+                LOAD_TEST_ITERATIONS, LOAD_TEST_THINK_TIME, LOAD_TEST_PASSWORD
+            )
+            for index in range(1, LOAD_TEST_USERS + 1)
+        ]
+        timings = [timing for future in futures for timing in future.result()]
+    wall_time = time.monotonic() - start
+
+    report = {
+        "base_url": API_BASE_URL,
+        "users": LOAD_TEST_USERS,
+        "arrival_rate": LOAD_TEST_ARRIVAL_RATE,
+        "iterations": LOAD_TEST_ITERATIONS,
+        "think_time": LOAD_TEST_THINK_TIME,
+        "wall_time": round(wall_time, 2),
+        "requests": len(timings),
+        "endpoints": summarize(timings, wall_time),
+    }
+    print_report(report)
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    output_path = os.path.join(RESULTS_DIR, "load-test-report.json")
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n详细结果: {output_path}")
+
+    violations = check_thresholds(report["endpoints"])
+    assert not violations, "负载测试超出阈值:\n" + "\n".join(violations)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="后端负载测试（复用 BDD 步骤函数）")
+    parser.add_argument("--users", type=int, default=LOAD_TEST_USERS, help="虚拟用户数")
+    parser.add_argument("--arrival-rate", type=float, default=LOAD_TEST_ARRIVAL_RATE, help="每秒启动的虚拟用户数")
+    parser.add_argument("--iterations", type=int, default=LOAD_TEST_ITERATIONS, help="每个虚拟用户的迭代次数")
+    parser.add_argument("--think-time", type=float, default=LOAD_TEST_THINK_TIME, help="迭代之间的等待秒数")
+    parser.add_argument("--max-p95-ms", default=LOAD_TEST_MAX_P95_MS, help="P95 延迟阈值（毫秒）")
+    parser.add_argument("--max-error-rate", default=LOAD_TEST_MAX_ERROR_RATE, help="错误率阈值（0-1）")
+    parser.add_argument("pytest_args", nargs="*", help="传给 pytest 的其他参数（写在 -- 之后）")
+    args = parser.parse_args(argv)
+
+    # 配置通过环境变量传给 pytest 中运行的测试
+    os.environ["LOAD_TEST_USERS"] = str(args.users)
+    os.environ["LOAD_TEST_ARRIVAL_RATE"] = str(args.arrival_rate)
+    os.environ["LOAD_TEST_ITERATIONS"] = str(args.iterations)
+    os.environ["LOAD_TEST_THINK_TIME"] = str(args.think_time)
+    for name, value in (("LOAD_TEST_MAX_P95_MS", args.max_p95_ms), ("LOAD_TEST_MAX_ERROR_RATE", args.max_error_rate)):
+        if value:
+            os.environ[name] = str(value)
+    return pytest.main([
+        os.path.join(SUITE_DIR, "load_test.py"), "-m", "load", "-s",
+        f"--html={os.path.join(RESULTS_DIR, 'load-test-report.html')}", *args.pytest_args
+    ])
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+"""
+bcrypt 密码哈希缓存
+以 SHA-256(成本因子:密码) 为键缓存 bcrypt 哈希，重复初始化同一个测试用户时直接复用已有哈希，
+省去每次约 50~100 ms 的 bcrypt 计算：
+- password_hash_cache.json：随仓库提交的预置哈希，运行时只读
+- test-results/password-hash-cache.json：运行时新计算的哈希写入这里，不修改仓库中的文件
+"""
+import hashlib
+import json
+import os
+import threading
+import bcrypt
+
+
+# bcrypt 成本因子：后端 BCrypt.Net-Next 的 HashPassword 使用默认值 11，但 Verify 从哈希本身读取成本因子，
+# 测试用户使用 10 即可登录，首次计算耗时减半（修改后预置文件中的哈希全部失效，需要重新生成）
+BCRYPT_ROUNDS = 10
+SUITE_DIR = os.path.dirname(os.path.abspath(__file__))
+PASSWORD_HASH_SEED_FILE = os.path.join(SUITE_DIR, "password_hash_cache.json")
+PASSWORD_HASH_CACHE_FILE = os.getenv(
+    "PASSWORD_HASH_CACHE_FILE",
+    os.path.join(SUITE_DIR, "test-results", "password-hash-cache.json")
+)
+
+_hashes = None
+_lock = threading.Lock()
+
+
+def _cache_key(password, rounds):
+    """缓存键：只保存摘要，不在文件中出现明文密码"""
+    return hashlib.sha256(f"{rounds}:{password}".encode('utf-8')).hexdigest()
+
+
+def _read_hashes(path):
+    """读取缓存文件中的哈希（文件不存在或损坏时视为空缓存）"""
+    try:
+        with open(path, encoding='utf-8') as f:
+            return dict(json.load(f).get("hashes", {}))
+    except (OSError, ValueError):
+        return {}
+
+
+def _load_hashes():
+    """加载预置哈希和运行时缓存的哈希"""
+    hashes = _read_hashes(PASSWORD_HASH_SEED_FILE)
+    hashes.update(_read_hashes(PASSWORD_HASH_CACHE_FILE))
+    return hashes
+
+
+def _save_hashes(hashes):
+    """原子地写入运行时缓存文件（先写临时文件再替换，避免并行 worker 读到半个文件）"""
+    tmp_file = f"{PASSWORD_HASH_CACHE_FILE}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(PASSWORD_HASH_CACHE_FILE), exist_ok=True)
+        with open(tmp_file, "w", encoding='utf-8') as f:
+            json.dump({"version": 1, "hashes": dict(sorted(hashes.items()))}, f, indent=2)
+            f.write("\n")
+        os.replace(tmp_file, PASSWORD_HASH_CACHE_FILE)
+    except OSError as e:
+        print(f"写入密码哈希缓存失败: {e}")
+
+
+def get_password_hash(password, rounds=BCRYPT_ROUNDS):
+    """获取密码的 bcrypt 哈希，命中缓存时不做任何 bcrypt 计算"""
+    global _hashes
+    key = _cache_key(password, rounds)
+    with _lock:
+        if _hashes is None:
+            _hashes = _load_hashes()
+        password_hash = _hashes.get(key)
+        if password_hash is None:
+            password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=rounds)).decode('utf-8')
+            _hashes[key] = password_hash
+            _save_hashes(_hashes)
+    return password_hash
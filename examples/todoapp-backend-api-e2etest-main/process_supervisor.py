@@ -0,0 +1,234 @@
+"""
+服务进程监管
+dotnet run、npm run serve 会再启动子进程（实际的服务进程），只终止父进程时子进程会成为孤儿并继续占用端口。
+这里每个服务都在独立的会话 / 进程组中启动，停止时：
+1. 记录整棵进程树（进程组 + 通过父子关系找到的所有子孙进程，包括自行脱离进程组的）
+2. 所有服务同时发送 SIGTERM，在共同的宽限期（SUPERVISOR_GRACE_PERIOD 秒）内等待退出
+3. 宽限期后仍存活的进程一律 SIGKILL
+4. 等待服务端口释放后返回，下一次运行可以立即使用这些端口
+进程内的服务（例如前端静态服务器）只调用它的 terminate()，不发送信号。
+进程异常退出（例如 pytest 被中断）时由 atexit 兜底强制清理仍在运行的服务。
+Windows 没有进程组信号：服务在新的进程组中启动，停止时用 taskkill /T /F 结束整棵进程树
+（控制台程序无法优雅退出，只终止父进程会留下孤儿子进程），仍存活时再调用 kill()。
+"""
+import atexit
+import os
+import signal
+import socket
+import subprocess
+import threading
+import time
+
+SUPERVISOR_GRACE_PERIOD = float(os.getenv("SUPERVISOR_GRACE_PERIOD", "3"))
+PORT_RELEASE_TIMEOUT = float(os.getenv("PORT_RELEASE_TIMEOUT", "5"))
+POLL_INTERVAL = 0.05
+IS_WINDOWS = os.name == "nt"
+
+
+def _list_processes():
+    """返回 {pid: ppid}；Linux 读取 /proc，其他系统使用 ps"""
+    processes = {}
+    if os.path.isdir("/proc"):
+        for entry in os.listdir("/proc"):
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f"/proc/{entry}/stat") as f:
+                    stat = f.read()
+            except OSError:
+                continue
+            processes[int(entry)] = int(stat[stat.rindex(")") + 2:].split()[1])
+        return processes
+    output = subprocess.run(["ps", "-A", "-o", "pid=,ppid="], capture_output=True, text=True).stdout
+    for line in output.splitlines():
+        pid, ppid = line.split()
+        processes[int(pid)] = int(ppid)
+    return processes
+
+
+def list_descendants(pid):
+    """返回 pid 的所有子孙进程（Windows 上由 taskkill /T 处理进程树，返回空列表）"""
+    if IS_WINDOWS:
+        return []
+    children = {}
+    for child, parent in _list_processes().items():
+        children.setdefault(parent, []).append(child)
+    descendants = []
+    stack = list(children.get(pid, []))
+    while stack:
+        child = stack.pop()
+        descendants.append(child)
+        stack.extend(children.get(child, []))
+    return descendants
+
+
+def is_alive(pid):
+    """进程是否仍在运行（僵尸进程视为已退出）"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            stat = f.read()
+        return stat[stat.rindex(")") + 2] != "Z"
+    except OSError:
+        return True
+
+
+def is_port_free(port, host="127.0.0.1"):
+    """端口是否可以重新监听"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            sock.bind((host, port))
+        except OSError:
+            return False
+    return True
+
+
+def wait_for_ports_free(ports, timeout=PORT_RELEASE_TIMEOUT):
+    """等待端口释放，返回超时后仍被占用的端口"""
+    deadline = time.monotonic() + timeout
+    busy = [port for port in ports if port and not is_port_free(port)]
+    while busy and time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        busy = [port for port in busy if not is_port_free(port)]
+    return busy
+
+
+def _signal_tree(process, pids, sig):
+    """向服务的进程组和记录的子孙进程发送信号"""
+    try:
+        os.killpg(process.pid, sig)
+    except (ProcessLookupError, PermissionError):
+        pass
+    for pid in pids:
+        try:
+            os.kill(pid, sig)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+
+def _terminate_tree(process, pids, force=False):
+    """结束服务的进程树：POSIX 上发送 SIGTERM（force 时 SIGKILL），Windows 上 taskkill /T /F，force 时再 kill()"""
+    if not IS_WINDOWS:
+        _signal_tree(process, pids, signal.SIGKILL if force else signal.SIGTERM)
+        return
+    if force:
+        try:
+            process.kill()
+        except OSError:
+            pass
+        return
+    try:
+        subprocess.run(["taskkill", "/T", "/F", "/PID", str(process.pid)], capture_output=True, timeout=10)
+    except (OSError, subprocess.TimeoutExpired):
+        pass
+
+
+class ProcessSupervisor:
+    """登记由测试环境启动的服务，并行停止整棵进程树"""
+
+    def __init__(self, grace_period=SUPERVISOR_GRACE_PERIOD, log=print):
+        self.grace_period = grace_period
+        self.log = log
+        self.services = {}
+        self._lock = threading.Lock()
+
+    def spawn(self, name, command, ports=(), **popen_kwargs):
+        """在新的会话（独立进程组，组 ID 等于进程 PID）中启动服务并登记"""
+        if IS_WINDOWS:
+            popen_kwargs.setdefault("creationflags", subprocess.CREATE_NEW_PROCESS_GROUP)
+        else:
+            popen_kwargs.setdefault("start_new_session", True)
+        process = subprocess.Popen(command, **popen_kwargs)
+        self.adopt(name, process, ports)
+        return process
+
+    def adopt(self, name, process, ports=()):
+        """登记一个已启动的服务（Popen 或提供 terminate/wait 的进程内服务）"""
+        with self._lock:
+            self.services[id(process)] = (name, process, tuple(ports))
+        return process
+
+    def stop(self, processes, grace_period=None):
+        """并行停止多个服务（None 会被忽略），等待它们的端口释放"""
+        grace_period = self.grace_period if grace_period is None else grace_period
+        with self._lock:
+            targets = []
+            for process in processes:
+                if process is None:
+                    continue
+                name, _, ports = self.services.pop(id(process), ("服务", process, ()))
+                targets.append((name, process, ports))
+        if not targets:
+            return
+
+        # 先记录进程树再发送 SIGTERM：父进程退出后子进程会被重新挂到 init 下，之后就找不到了
+        trees = {}
+        in_process = []
+        for name, process, _ in targets:
+            if isinstance(process, subprocess.Popen):
+                trees[id(process)] = list_descendants(process.pid)
+                _terminate_tree(process, trees[id(process)])
+            else:
+                thread = threading.Thread(target=process.terminate, daemon=True)
+                thread.start()
+                in_process.append(thread)
+
+        deadline = time.monotonic() + grace_period
+        pending = {id(process): process for _, process, _ in targets if isinstance(process, subprocess.Popen)}
+        while pending and time.monotonic() < deadline:
+            time.sleep(POLL_INTERVAL)
+            pending = {key: process for key, process in pending.items() if self._tree_alive(process, trees[key])}
+
+        for name, process, _ in targets:
+            if not isinstance(process, subprocess.Popen):
+                continue
+            if id(process) in pending:
+                _terminate_tree(process, trees[id(process)], force=True)
+                self.log(f"⚠ {name}未在 {grace_period} 秒内退出，已强制终止整个进程树")
+            else:
+                self.log(f"✓ {name}已停止")
+            try:
+                process.wait(timeout=1)
+            except subprocess.TimeoutExpired:
+                pass
+        for thread in in_process:
+            thread.join(timeout=grace_period)
+        for name, process, _ in targets:
+            if not isinstance(process, subprocess.Popen):
+                self.log(f"✓ {name}已停止")
+
+        busy = wait_for_ports_free([port for _, _, ports in targets for port in ports])
+        if busy:
+            self.log(f"⚠ 端口仍被占用: {', '.join(map(str, busy))}")
+
+    def stop_all(self, grace_period=None):
+        with self._lock:
+            processes = [process for _, process, _ in self.services.values()]
+        self.stop(processes, grace_period)
+
+    @staticmethod
+    def _tree_alive(process, descendants):
+        if process.poll() is None:
+            return True
+        return any(is_alive(pid) for pid in descendants)
+
+
+# 当前进程的服务监管器（首次使用时创建）
+_supervisor = None
+_supervisor_lock = threading.Lock()
+
+
+def get_supervisor(log=print):
+    """获取当前进程的服务监管器，不存在时创建（并注册退出时的兜底清理）"""
+    global _supervisor
+    with _supervisor_lock:
+        if _supervisor is None:
+            _supervisor = ProcessSupervisor(log=log)
+            atexit.register(_supervisor.stop_all, 0)
+        return _supervisor
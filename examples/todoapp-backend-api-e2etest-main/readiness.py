@@ -0,0 +1,60 @@
+"""
+服务就绪等待
+快速的首次探测 + 有上限的指数退避，可被事件（例如进程输出中的就绪日志）提前唤醒，
+避免固定 1 秒轮询在服务实际就绪后仍白白等待
+"""
+import time
+
+
+def backoff_intervals(initial=0.05, maximum=1.0, factor=2.0):
+    """生成指数增长、不超过 maximum 的等待间隔（秒）"""
+    interval = initial
+    while True:
+        yield interval
+        interval = min(interval * factor, maximum)
+
+
+def wait_until(probe, timeout, description, ready_event=None, abort_check=None, abort_interval=1.0,
+               initial_interval=0.05, max_interval=1.0, log=print):
+    """反复调用 probe() 直到返回真值，返回探测次数
+
+    - probe 抛出的异常视为"尚未就绪"，超时时会附带最后一次异常信息
+    - ready_event（threading.Event）被设置时立即结束当前等待并重新探测
+    - abort_check 最多每 abort_interval 秒调用一次，通过抛出异常提前结束等待
+    - 超过 timeout 秒仍未就绪时抛出 TimeoutError
+    """
+    start = time.monotonic()
+    deadline = start + timeout
+    intervals = backoff_intervals(initial_interval, max_interval)
+    event_seen = False
+    last_error = None
+    last_abort_check = None
+    last_log = start
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            if probe():
+                return attempt
+        except Exception as e:
+            last_error = e
+        
+        now = time.monotonic()
+        if abort_check is not None and (last_abort_check is None or now - last_abort_check >= abort_interval):
+            last_abort_check = now
+            abort_check()
+        
+        remaining = deadline - now
+        if remaining <= 0:
+            detail = f"，最后一次错误: {last_error}" if last_error else ""
+            raise TimeoutError(f"{description}超时（{timeout} 秒）{detail}")
+        if now - last_log >= 5:
+            last_log = now
+            log(f"{description}... (已等待 {now - start:.1f} 秒，第 {attempt} 次探测)")
+        
+        interval = min(next(intervals), remaining)
+        if ready_event is not None and not event_seen:
+            event_seen = ready_event.wait(interval)
+        else:
+            time.sleep(interval)
+
@@ -0,0 +1,102 @@
+"""
+批量测试数据初始化
+把声明式的数据集（用户 -> 项目 -> 待办事项）通过 COPY FROM STDIN 一次性写入数据库
+"""
+import csv
+import io
+from password_cache import get_password_hash
+
+
+def generate_dataset(users=1, projects_per_user=10, todos_per_project=10, password="password123"):
+    """生成用于压测类场景的数据集
+
+    用户名为 loaduser1、loaduser2...，每个用户拥有相同数量的项目，每个项目拥有相同数量的待办事项。
+    """
+    return [
+        {
+            "username": f"loaduser{u}",
+            "password": password,
+            "projects": [
+                {
+                    "name": f"项目 {u}-{p}",
+                    "description": f"loaduser{u} 的第 {p} 个项目",
+                    "todos": [
+                        {"title": f"待办 {u}-{p}-{t}", "is_completed": t % 2 == 0}
+                        for t in range(1, todos_per_project + 1)
+                    ],
+                }
+                for p in range(1, projects_per_user + 1)
+            ],
+        }
+        for u in range(1, users + 1)
+    ]
+
+
+def _reserve_ids(cursor, table, count):
+    """一次性从表的自增序列中预留 count 个 Id"""
+    if count == 0:
+        return []
+    cursor.execute(
+        f"""SELECT nextval(pg_get_serial_sequence('"{table}"', 'Id')) FROM generate_series(1, %s)""",
+        (count,)
+    )
+    return [row[0] for row in cursor.fetchall()]
+
+
+def _copy_rows(cursor, table, columns, rows):
+    """使用 COPY FROM STDIN（CSV 格式）批量写入一张表"""
+    if not rows:
+        return
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    column_list = ", ".join(f'"{column}"' for column in columns)
+    cursor.copy_expert(f'COPY "{table}" ({column_list}) FROM STDIN WITH (FORMAT csv)', buffer)
+
+
+def seed_dataset(conn, dataset, password_hasher=get_password_hash):
+    """把数据集批量写入数据库，返回 {"users": {用户名: Id}, "projects": [Id...], "todos": 数量}
+
+    数据集格式：
+        [
+            {
+                "username": "admin",
+                "password": "admin123",
+                "email": "admin@example.com",  # 可选，默认 <username>@example.com
+                "projects": [
+                    {"name": "项目A", "description": "...", "todos": [{"title": "待办1", "is_completed": False}]},
+                ],
+            },
+        ]
+
+    每张表只执行一次 Id 预留和一次 COPY，密码哈希来自 password_cache 的持久化缓存，整个过程在一个事务中完成。
+    """
+    password_hashes = {}
+    for user in dataset:
+        if user["password"] not in password_hashes:
+            password_hashes[user["password"]] = password_hasher(user["password"])
+
+    projects = [(user, project) for user in dataset for project in user.get("projects", [])]
+    todos = [(index, todo) for index, (_, project) in enumerate(projects) for todo in project.get("todos", [])]
+
+    with conn.cursor() as cursor:
+        user_ids = _reserve_ids(cursor, "Users", len(dataset))
+        project_ids = _reserve_ids(cursor, "Projects", len(projects))
+        todo_ids = _reserve_ids(cursor, "Todos", len(todos))
+
+        user_id_by_name = {user["username"]: user_id for user, user_id in zip(dataset, user_ids)}
+        _copy_rows(cursor, "Users", ["Id", "Username", "Email", "PasswordHash"], [
+            (user_id, user["username"], user.get("email", f"{user['username']}@example.com"),
+             password_hashes[user["password"]])
+            for user, user_id in zip(dataset, user_ids)
+        ])
+        _copy_rows(cursor, "Projects", ["Id", "Name", "Description", "UserId"], [
+            (project_id, project["name"], project.get("description"), user_id_by_name[user["username"]])
+            for (user, project), project_id in zip(projects, project_ids)
+        ])
+        _copy_rows(cursor, "Todos", ["Id", "Title", "Description", "IsCompleted", "ProjectId"], [
+            (todo_id, todo["title"], todo.get("description"), todo.get("is_completed", False), project_ids[index])
+            for (index, todo), todo_id in zip(todos, todo_ids)
+        ])
+
+    return {"users": user_id_by_name, "projects": project_ids, "todos": len(todo_ids)}
@@ -0,0 +1,130 @@
+"""
+并发请求功能的步骤定义
+请求通过 concurrent_requests fixture（asyncio + httpx）同时发出，结果保存在 test_context["concurrent_result"]
+"""
+from collections import Counter
+from pytest_bdd import given, when, then, parsers, scenarios
+import pytest
+from step_definitions import login_steps
+
+scenarios("concurrency.feature")
+
+
+@pytest.fixture(scope="function")
+def test_context():
+    """测试上下文，用于在步骤之间共享数据"""
+    return {}
+
+
+def get_concurrent_result(test_context):
+    """读取最近一次并发请求的结果"""
+    result = test_context.get("concurrent_result")
+    assert result is not None, "未找到并发请求结果，请先执行并发请求"
+    return result
+
+
+@given("数据库已重置")
+def database_is_reset(reset_db):
+    """由 reset_db fixture 在场景开始前重置数据库"""
+
+
+# 复用登录功能的建用户步骤（步骤定义只对所在模块的场景可见，这里为本模块重新注册同一个函数）
+given(parsers.parse('数据库中已存在用户 "{username}"，密码为 "{password}"'))(login_steps.create_user_in_database)
+
+
+@given(parsers.parse('用户 "{username}" 已登录并拥有项目 "{project}"'))
+def user_with_project(seed_data, api_client, test_context, username, project):
+    """批量写入用户和项目，登录并在客户端中设置 token"""
+    result = seed_data([{"username": username, "password": "password123", "projects": [{"name": project}]}])
+    test_context.setdefault("projects", {})[project] = result["projects"][0]
+    response = api_client.post("/api/auth/login", json={"username": username, "password": "password123"})
+    assert response.status_code == 200, f"登录失败，状态码: {response.status_code}"
+    api_client.set_token(response.json()["token"])
+
+
+@when(parsers.parse('我并发发送 {count:d} 个用户名为 "{username}" 的注册请求'))
+def send_concurrent_registers(concurrent_requests, test_context, count, username):
+    """同一用户名、不同邮箱的注册请求同时发出，竞争的只有用户名"""
+    requests_to_send = [
+        ("POST", "/api/auth/register",
+         {"json": {"username": username, "email": f"{username}{i}@example.com", "password": "password123"}})
+        for i in range(count)
+    ]
+    result = concurrent_requests(requests_to_send)
+    print(f"[并发注册] {result.summary()}，状态码分布: {dict(Counter(result.status_codes))}")
+    test_context["concurrent_result"] = result
+
+
+@when(parsers.parse('我并发发送 {count:d} 个用户名 "{username}" 和密码 "{password}" 的登录请求'))
+def send_concurrent_logins(concurrent_requests, test_context, count, username, password):
+    """同一用户的登录请求同时发出（每个请求都要在后端执行一次 bcrypt 校验）"""
+    requests_to_send = [
+        ("POST", "/api/auth/login", {"json": {"username": username, "password": password}})
+        for _ in range(count)
+    ]
+    result = concurrent_requests(requests_to_send)
+    print(f"[并发登录] {result.summary()}")
+    test_context["concurrent_result"] = result
+
+
+@when(parsers.parse('我并发创建 {count:d} 个待办事项到项目 "{project}"'))
+def create_todos_concurrently(concurrent_requests, test_context, count, project):
+    """向同一项目同时发出创建待办事项的请求"""
+    project_id = test_context["projects"][project]
+    requests_to_send = [
+        ("POST", "/api/todos", {"json": {"title": f"并发待办 {i}", "projectId": project_id}})
+        for i in range(1, count + 1)
+    ]
+    result = concurrent_requests(requests_to_send)
+    print(f"[并发创建待办] {result.summary()}")
+    test_context["concurrent_result"] = result
+
+
+@then(parsers.parse("应该只有 {expected:d} 个并发请求成功"))
+def check_success_count(test_context, expected):
+    """检查成功（200/201）的请求数量"""
+    result = get_concurrent_result(test_context)
+    assert not result.errors, f"并发请求中出现异常: {result.errors[:3]}"
+    succeeded = result.count_status(200, 201)
+    assert succeeded == expected, \
+        f"期望 {expected} 个请求成功，实际 {succeeded} 个，状态码: {result.status_codes}"
+
+
+@then("其余并发请求都应该失败")
+def check_others_failed(test_context):
+    """竞争失败的请求可能被检查拦截（400），也可能在写入时触发唯一约束（500），但都不能成功"""
+    result = get_concurrent_result(test_context)
+    others = [status_code for status_code in result.status_codes if status_code not in (200, 201)]
+    assert all(status_code >= 400 for status_code in others), \
+        f"竞争失败的请求应该返回错误状态码，实际: {others}"
+
+
+@then(parsers.parse('数据库中用户名为 "{username}" 的用户应该只有 {expected:d} 个'))
+def check_user_count(db_pool, username, expected):
+    """直接查询数据库，确认竞争没有写入重复用户"""
+    with db_pool.connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute('SELECT COUNT(*) FROM "Users" WHERE "Username" = %s', (username,))
+            count = cursor.fetchone()[0]
+    assert count == expected, f"期望 {expected} 个用户 {username}，实际 {count} 个"
+
+
+@then(parsers.parse("所有并发请求的状态码都应该是 {status_code:d}"))
+def check_all_status_codes(test_context, status_code):
+    """检查所有并发请求的状态码"""
+    result = get_concurrent_result(test_context)
+    assert not result.errors, f"并发请求中出现异常: {result.errors[:3]}"
+    unexpected = [code for code in result.status_codes if code != status_code]
+    assert not unexpected, \
+        f"期望所有请求的状态码都是 {status_code}，{len(unexpected)} 个不是: {dict(Counter(unexpected))}"
+
+
+@then(parsers.parse('项目 "{project}" 中应该有 {expected:d} 个待办事项'))
+def check_todo_count(db_pool, test_context, project, expected):
+    """直接查询数据库，确认并行创建的待办事项没有丢失"""
+    project_id = test_context["projects"][project]
+    with db_pool.connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute('SELECT COUNT(*) FROM "Todos" WHERE "ProjectId" = %s', (project_id,))
+            count = cursor.fetchone()[0]
+    assert count == expected, f"期望项目 {project} 中有 {expected} 个待办事项，实际 {count} 个"
@@ -3,12 +3,10 @@
 """
 import json
 import os
-import psycopg2
-from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
-import bcrypt
 from pytest_bdd import given, when, then, parsers, scenarios
 import pytest
-from conftest import get_db_connection, API_BASE_URL
+from conftest import API_BASE_URL, USER_SEED_MODE
+from password_cache import get_password_hash
 
 # 使用 scenarios() 加载 feature 文件
 # 注意：由于 pytest.ini 中配置了 bdd_features_base_dir = features
@@ -23,81 +21,77 @@ def test_context():
     return {}
 
 
+def upsert_user(cursor, username, email, password):
+    """使用缓存的 bcrypt 哈希直接写入用户（已存在则覆盖邮箱和密码哈希）"""
+    cursor.execute(
+        'INSERT INTO "Users" ("Username", "Email", "PasswordHash", "CreatedAt") VALUES (%s, %s, %s, CURRENT_TIMESTAMP) '
+        'ON CONFLICT ("Username") DO UPDATE SET "Email" = EXCLUDED."Email", "PasswordHash" = EXCLUDED."PasswordHash"',
+        (username, email, get_password_hash(password))
+    )
+
+
 @given(parsers.parse('数据库中已存在用户 "{username}"，密码为 "{password}"'))
-def create_user_in_database(username, password, api_client):
-    """在数据库中创建用户（使用 API 注册接口确保密码哈希格式正确）"""
-    import requests
-    
-    # 先检查用户是否已存在，如果存在则删除
-    conn = None
-    try:
-        conn = get_db_connection()
-        conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+def create_user_in_database(username, password, api_client, db_pool):
+    """在数据库中创建用户
+
+    默认（USER_SEED_MODE=direct）使用缓存的 bcrypt 哈希一条语句直接写库；
+    USER_SEED_MODE=api 时使用 API 注册接口，由后端计算密码哈希。
+    """
+    # 整个步骤只从连接池借出一个连接，清理和回退写入都复用它
+    with db_pool.connection() as conn:
         cursor = conn.cursor()
         
-        # 检查表是否存在，如果不存在则创建
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS "Users" (
-                "Id" SERIAL PRIMARY KEY,
-                "Username" VARCHAR(50) NOT NULL UNIQUE,
-                "Email" VARCHAR(100) NOT NULL UNIQUE,
-                "PasswordHash" TEXT NOT NULL,
-                "CreatedAt" TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
+        if USER_SEED_MODE == "direct":
+            upsert_user(cursor, username, f"{username}@example.com", password)
+            cursor.close()
+            return
         
-        # 检查用户是否已存在
-        cursor.execute('SELECT "Id" FROM "Users" WHERE "Username" = %s', (username,))
-        existing_user = cursor.fetchone()
+        # 先检查用户是否已存在，如果存在则删除
+        try:
+            # 检查表是否存在，如果不存在则创建
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS "Users" (
+                    "Id" SERIAL PRIMARY KEY,
+                    "Username" VARCHAR(50) NOT NULL UNIQUE,
+                    "Email" VARCHAR(100) NOT NULL UNIQUE,
+                    "PasswordHash" TEXT NOT NULL,
+                    "CreatedAt" TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            
+            # 检查用户是否已存在
+            cursor.execute('SELECT "Id" FROM "Users" WHERE "Username" = %s', (username,))
+            existing_user = cursor.fetchone()
+            
+            if existing_user:
+                # 删除现有用户
+                cursor.execute('DELETE FROM "Users" WHERE "Username" = %s', (username,))
+        except Exception as e:
+            print(f"清理用户失败: {e}")
         
-        if existing_user:
-            # 删除现有用户
-            cursor.execute('DELETE FROM "Users" WHERE "Username" = %s', (username,))
+        # 使用 API 注册接口创建用户（确保密码哈希格式与后端一致）
+        email = f"{username}@example.com"
+        register_data = {
+            "username": username,
+            "email": email,
+            "password": password
+        }
+        
+        try:
+            response = api_client.post("/api/auth/register", json=register_data)
+            # 如果用户已存在（409或其他错误），尝试直接更新密码
+            if response.status_code not in [200, 201]:
+                # 如果注册失败，尝试直接更新数据库中的密码哈希（使用缓存的 bcrypt 哈希）
+                cursor.execute(
+                    'UPDATE "Users" SET "PasswordHash" = %s WHERE "Username" = %s',
+                    (get_password_hash(password), username)
+                )
+        except Exception as e:
+            print(f"通过 API 创建用户失败，尝试直接插入: {e}")
+            # 如果 API 调用失败，回退到直接插入数据库
+            upsert_user(cursor, username, email, password)
         
         cursor.close()
-    except Exception as e:
-        print(f"清理用户失败: {e}")
-    finally:
-        if conn:
-            conn.close()
-    
-    # 使用 API 注册接口创建用户（确保密码哈希格式与后端一致）
-    email = f"{username}@example.com"
-    register_data = {
-        "username": username,
-        "email": email,
-        "password": password
-    }
-    
-    try:
-        response = api_client.post("/api/auth/register", json=register_data)
-        # 如果用户已存在（409或其他错误），尝试直接更新密码
-        if response.status_code not in [200, 201]:
-            # 如果注册失败，尝试直接更新数据库中的密码哈希
-            # 这种情况下，我们使用 Python bcrypt 生成哈希
-            conn = get_db_connection()
-            conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
-            cursor = conn.cursor()
-            password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=10)).decode('utf-8')
-            cursor.execute(
-                'UPDATE "Users" SET "PasswordHash" = %s WHERE "Username" = %s',
-                (password_hash, username)
-            )
-            cursor.close()
-            conn.close()
-    except Exception as e:
-        print(f"通过 API 创建用户失败，尝试直接插入: {e}")
-        # 如果 API 调用失败，回退到直接插入数据库
-        conn = get_db_connection()
-        conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
-        cursor = conn.cursor()
-        password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=10)).decode('utf-8')
-        cursor.execute(
-            'INSERT INTO "Users" ("Username", "Email", "PasswordHash", "CreatedAt") VALUES (%s, %s, %s, CURRENT_TIMESTAMP) ON CONFLICT ("Username") DO UPDATE SET "PasswordHash" = EXCLUDED."PasswordHash"',
-            (username, email, password_hash)
-        )
-        cursor.close()
-        conn.close()
 
 
 @when(parsers.parse('我使用用户名 "{username}" 和密码 "{password}" 发送登录请求'))
@@ -0,0 +1,53 @@
+"""
+项目列表功能的步骤定义
+"""
+from pytest_bdd import given, when, then, parsers, scenarios
+import pytest
+from seeding import generate_dataset
+
+scenarios("projects.feature")
+
+
+@pytest.fixture(scope="function")
+def test_context():
+    """测试上下文，用于在步骤之间共享数据"""
+    return {}
+
+
+@given(parsers.parse('数据库中已批量创建 {users:d} 个用户，每个用户 {projects:d} 个项目，每个项目 {todos:d} 个待办事项'))
+def seed_projects_in_bulk(reset_db, seed_data, test_context, users, projects, todos):
+    """通过 COPY 一次性批量写入用户、项目和待办事项"""
+    dataset = generate_dataset(users=users, projects_per_user=projects, todos_per_project=todos)
+    test_context["seed_result"] = seed_data(dataset)
+
+
+@when(parsers.parse('我使用用户名 "{username}" 和密码 "{password}" 登录'))
+def login(api_client, username, password):
+    """登录并在客户端中设置 token"""
+    response = api_client.post("/api/auth/login", json={"username": username, "password": password})
+    assert response.status_code == 200, f"登录失败，状态码: {response.status_code}"
+    api_client.set_token(response.json()["token"])
+
+
+@when(parsers.parse('我请求第 {page:d} 页项目列表，每页 {page_size:d} 条'))
+def request_project_page(api_client, test_context, page, page_size):
+    """分页请求项目列表"""
+    test_context["projects_response"] = api_client.get(
+        "/api/projects", params={"pageNumber": page, "pageSize": page_size}
+    )
+
+
+@then(parsers.parse('项目列表响应状态码应该是 {status_code:d}'))
+def check_projects_status_code(test_context, status_code):
+    """检查项目列表响应状态码"""
+    response = test_context["projects_response"]
+    assert response.status_code == status_code, \
+        f"期望状态码 {status_code}，实际得到 {response.status_code}"
+
+
+@then(parsers.parse('项目列表应该包含 {count:d} 个项目，总数为 {total:d}'))
+def check_project_page(test_context, count, total):
+    """检查分页结果中的项目数量和总数"""
+    data = test_context["projects_response"].json()
+    assert len(data["items"]) == count, f"期望 {count} 个项目，实际 {len(data['items'])} 个"
+    assert data["totalCount"] == total, f"期望总数 {total}，实际 {data['totalCount']}"
@@ -0,0 +1,132 @@
+"""
+API 客户端
+整个测试会话复用同一个 requests.Session：HTTPAdapter 连接池保持 keep-alive 连接，
+请求带默认超时，幂等请求（GET/PUT/DELETE 等）遇到连接错误或 502/503/504 时自动重试，
+并记录每个请求的耗时
+"""
+import math
+import os
+import time
+from collections import namedtuple
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+API_CONNECT_TIMEOUT = float(os.getenv("API_CONNECT_TIMEOUT", "3"))
+API_READ_TIMEOUT = float(os.getenv("API_READ_TIMEOUT", "10"))
+API_RETRIES = int(os.getenv("API_RETRIES", "2"))
+API_POOL_SIZE = int(os.getenv("API_POOL_SIZE", "10"))
+
+RequestTiming = namedtuple("RequestTiming", ["method", "endpoint", "status_code", "elapsed"])
+
+
+def percentile(values, fraction):
+    """返回已排序列表中的百分位数（最近秩法）"""
+    if not values:
+        return None
+    index = max(math.ceil(fraction * len(values)) - 1, 0)
+    return values[index]
+
+
+class APIClient:
+    """会话级 API 客户端；每个测试结束后由 api_client fixture 调用 reset() 恢复默认请求头"""
+
+    def __init__(self, base_url, timeout=(API_CONNECT_TIMEOUT, API_READ_TIMEOUT),
+                 retries=API_RETRIES, pool_size=API_POOL_SIZE):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.session = requests.Session()
+        # 只有幂等请求会在读取失败或返回 502/503/504 时重试；连接失败时请求尚未发出，所有方法都会重试
+        retry = Retry(
+            total=retries,
+            backoff_factor=0.1,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.default_headers = dict(self.session.headers)
+        self.token = None
+        self.timings = []
+
+    def set_token(self, token):
+        """设置认证 token"""
+        self.token = token
+        self.session.headers.update({
+            "Authorization": f"Bearer {token}"
+        })
+
+    def clear_token(self):
+        """清除认证 token"""
+        self.token = None
+        self.session.headers.pop("Authorization", None)
+
+    def reset(self):
+        """恢复默认请求头并清除 token（测试之间的隔离），保留连接池中的连接"""
+        self.token = None
+        self.session.headers.clear()
+        self.session.headers.update(self.default_headers)
+        self.session.cookies.clear()
+
+    def request(self, method, endpoint, **kwargs):
+        """发送请求并记录耗时；未指定 timeout 时使用默认的 (连接超时, 读取超时)"""
+        kwargs.setdefault("timeout", self.timeout)
+        url = f"{self.base_url}{endpoint}"
+        start = time.perf_counter()
+        status_code = None
+        try:
+            response = self.session.request(method, url, **kwargs)
+            status_code = response.status_code
+            return response
+        finally:
+            self.timings.append(RequestTiming(method, endpoint, status_code, time.perf_counter() - start))
+
+    def post(self, endpoint, json=None, **kwargs):
+        """POST 请求"""
+        return self.request("POST", endpoint, json=json, **kwargs)
+
+    def get(self, endpoint, **kwargs):
+        """GET 请求"""
+        return self.request("GET", endpoint, **kwargs)
+
+    def put(self, endpoint, json=None, **kwargs):
+        """PUT 请求"""
+        return self.request("PUT", endpoint, json=json, **kwargs)
+
+    def delete(self, endpoint, **kwargs):
+        """DELETE 请求"""
+        return self.request("DELETE", endpoint, **kwargs)
+
+    def patch(self, endpoint, json=None, **kwargs):
+        """PATCH 请求"""
+        return self.request("PATCH", endpoint, json=json, **kwargs)
+
+    def latency_summary(self):
+        """按 方法 + 路径（去掉查询参数）汇总请求耗时（毫秒）"""
+        groups = {}
+        for timing in self.timings:
+            key = f"{timing.method} {timing.endpoint.split('?', 1)[0]}"
+            groups.setdefault(key, []).append(timing.elapsed * 1000)
+        summary = {}
+        for key, values in sorted(groups.items()):
+            values.sort()
+            summary[key] = {
+                "count": len(values),
+                "mean_ms": round(sum(values) / len(values), 1),
+                "p95_ms": round(percentile(values, 0.95), 1),
+                "max_ms": round(values[-1], 1),
+            }
+        return summary
+
+    def print_latency_summary(self, log=print):
+        summary = self.latency_summary()
+        if not summary:
+            return
+        log(f"\n=== API 请求耗时（共 {len(self.timings)} 个请求）===")
+        for key, stats in summary.items():
+            log(f"{key}: {stats['count']} 次，平均 {stats['mean_ms']} ms，P95 {stats['p95_ms']} ms，最大 {stats['max_ms']} ms")
+
+    def close(self):
+        self.session.close()
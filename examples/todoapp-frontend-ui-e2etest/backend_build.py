@@ -0,0 +1,115 @@
+"""
+后端预编译缓存
+按后端源码哈希执行一次 dotnet publish，之后直接用 dotnet <dll> 启动，
+避免 dotnet run 每次启动都执行 restore/build
+"""
+import hashlib
+import os
+import shutil
+import subprocess
+import time
+
+BACKEND_PUBLISH_CACHE = os.path.abspath(os.path.expanduser(os.getenv(
+    "BACKEND_PUBLISH_CACHE", os.path.join("~", ".cache", "todoapp-e2etest", "backend")
+)))
+BACKEND_ASSEMBLY = os.getenv("BACKEND_ASSEMBLY", "TodoApp-backend.dll")
+# 缓存中保留的发布结果数量（按最近使用时间清理更早的）
+BACKEND_PUBLISH_CACHE_KEEP = int(os.getenv("BACKEND_PUBLISH_CACHE_KEEP", "3"))
+
+# 参与哈希计算的文件和跳过的目录（编译输出、单元测试项目）
+SOURCE_EXTENSIONS = {".cs", ".csproj", ".json", ".props", ".targets"}
+SKIP_DIRS = {"bin", "obj", ".git", ".vs", "TodoApp-backend.Tests"}
+COMPLETE_MARKER = ".publish-complete"
+
+
+def _lock_exclusive(lock_file):
+    """对锁文件加排他锁（文件关闭时释放）：Linux / macOS 使用 fcntl.flock，Windows 使用 msvcrt.locking"""
+    if os.name == "nt":
+        import msvcrt
+        lock_file.seek(0)
+        # LK_LOCK 重试 10 秒后仍未获得锁会抛出 OSError，继续等待
+        while True:
+            try:
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                continue
+    import fcntl
+    fcntl.flock(lock_file, fcntl.LOCK_EX)
+
+
+def compute_source_hash(backend_dir):
+    """计算后端源码哈希（相对路径 + 文件内容），源码不变时哈希不变"""
+    digest = hashlib.sha256()
+    for root, dirs, files in os.walk(backend_dir):
+        dirs[:] = sorted(d for d in dirs if d not in SKIP_DIRS)
+        for name in sorted(files):
+            if os.path.splitext(name)[1] not in SOURCE_EXTENSIONS:
+                continue
+            path = os.path.join(root, name)
+            digest.update(os.path.relpath(path, backend_dir).replace(os.sep, "/").encode("utf-8"))
+            with open(path, "rb") as f:
+                digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def _prune_cache(keep_dir, log):
+    """只保留最近使用的 BACKEND_PUBLISH_CACHE_KEEP 个发布结果"""
+    entries = [
+        os.path.join(BACKEND_PUBLISH_CACHE, name)
+        for name in os.listdir(BACKEND_PUBLISH_CACHE)
+        if os.path.exists(os.path.join(BACKEND_PUBLISH_CACHE, name, COMPLETE_MARKER))
+    ]
+    entries.sort(key=lambda path: os.path.getmtime(os.path.join(path, COMPLETE_MARKER)), reverse=True)
+    for path in entries[BACKEND_PUBLISH_CACHE_KEEP:]:
+        if path != keep_dir:
+            log(f"[后端预编译] 清理旧的发布结果: {path}")
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def publish_backend(backend_dir, log=print):
+    """返回后端发布目录中的 dll 路径；同一份源码只发布一次（多个进程同时调用时通过文件锁串行）"""
+    source_hash = compute_source_hash(backend_dir)
+    publish_dir = os.path.join(BACKEND_PUBLISH_CACHE, source_hash)
+    assembly_path = os.path.join(publish_dir, BACKEND_ASSEMBLY)
+    marker = os.path.join(publish_dir, COMPLETE_MARKER)
+    os.makedirs(BACKEND_PUBLISH_CACHE, exist_ok=True)
+
+    with open(os.path.join(BACKEND_PUBLISH_CACHE, f"{source_hash}.lock"), "w") as lock_file:
+        _lock_exclusive(lock_file)
+        if os.path.exists(marker) and os.path.exists(assembly_path):
+            os.utime(marker)
+            log(f"[后端预编译] 缓存命中: 源码哈希 {source_hash}，直接启动 {assembly_path}")
+            return assembly_path
+
+        log(f"[后端预编译] 缓存未命中: 源码哈希 {source_hash}，执行 dotnet publish...")
+        start = time.monotonic()
+        staging_dir = f"{publish_dir}.tmp-{os.getpid()}"
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        try:
+            subprocess.run(
+                ["dotnet", "publish", "--configuration", "Release", "--output", staging_dir, "--nologo"],
+                cwd=backend_dir,
+                check=True,
+                capture_output=True,
+                text=True
+            )
+        except subprocess.CalledProcessError as e:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            raise RuntimeError(f"dotnet publish 失败:\n{e.stdout}{e.stderr}") from e
+        if not os.path.exists(os.path.join(staging_dir, BACKEND_ASSEMBLY)):
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            raise RuntimeError(f"发布结果中未找到 {BACKEND_ASSEMBLY}，请通过 BACKEND_ASSEMBLY 指定程序集名称")
+        open(os.path.join(staging_dir, COMPLETE_MARKER), "w").close()
+        shutil.rmtree(publish_dir, ignore_errors=True)
+        os.replace(staging_dir, publish_dir)
+        log(f"[后端预编译] 发布完成（{time.monotonic() - start:.1f} 秒）: {publish_dir}")
+
+    _prune_cache(publish_dir, log)
+    return assembly_path
+
+
+def get_prebuilt_launch(backend_dir, log=print):
+    """返回直接启动预编译后端的 (命令, 工作目录)；工作目录为发布目录，appsettings.json 从这里读取"""
+    assembly_path = publish_backend(backend_dir, log=log)
+    return ["dotnet", assembly_path], os.path.dirname(assembly_path)
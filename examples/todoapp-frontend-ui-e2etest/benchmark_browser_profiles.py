@@ -0,0 +1,161 @@
+"""
+浏览器配置档基准测试
+依次用每个配置档运行同一组 UI 场景，比较场景耗时和浏览器进程（chrome / chromedriver）的内存占用（RSS）
+
+用法：
+    python benchmark_browser_profiles.py                          # 比较 default 与 ci，运行全部场景
+    python benchmark_browser_profiles.py --profiles ci default -- -k 登录   # -- 之后的参数原样传给 pytest
+
+结果输出到控制台，并写入 test-results/browser-profile-benchmark.json（仅支持 Linux，RSS 从 /proc 读取）
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import xml.etree.ElementTree as ET
+
+SUITE_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(SUITE_DIR, "test-results")
+BROWSER_PROCESS_NAMES = ("chrome", "chromedriver", "chromium")
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+
+def _read_processes():
+    """读取 /proc 中的进程：{pid: (ppid, 进程名, rss 字节数)}"""
+    processes = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # 进程名在括号中且可能包含空格，从最后一个右括号之后开始解析
+        name = stat[stat.index("(") + 1:stat.rindex(")")]
+        fields = stat[stat.rindex(")") + 2:].split()
+        processes[int(entry)] = (int(fields[1]), name, int(fields[21]) * PAGE_SIZE)
+    return processes
+
+
+def browser_rss(root_pid):
+    """统计 root_pid 的所有子孙进程中浏览器相关进程的 RSS 之和"""
+    processes = _read_processes()
+    children = {}
+    for pid, (ppid, _, _) in processes.items():
+        children.setdefault(ppid, []).append(pid)
+    total = 0
+    stack = list(children.get(root_pid, []))
+    while stack:
+        pid = stack.pop()
+        _, name, rss = processes[pid]
+        if name.lower().startswith(BROWSER_PROCESS_NAMES):
+            total += rss
+        stack.extend(children.get(pid, []))
+    return total
+
+
+class RssSampler:
+    """后台线程定期采样浏览器进程的 RSS，记录峰值和平均值"""
+
+    def __init__(self, root_pid, interval=0.5):
+        self.root_pid = root_pid
+        self.interval = interval
+        self.samples = []
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self.stop_event.wait(self.interval):
+            rss = browser_rss(self.root_pid)
+            if rss:
+                self.samples.append(rss)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop_event.set()
+        self.thread.join()
+
+
+def read_scenario_durations(junit_path):
+    """从 JUnit XML 中读取每个场景的耗时（秒）"""
+    if not os.path.exists(junit_path):
+        return {}
+    root = ET.parse(junit_path).getroot()
+    return {
+        f"{case.get('classname')}::{case.get('name')}": float(case.get("time", 0))
+        for case in root.iter("testcase")
+    }
+
+
+def run_profile(profile, pytest_args):
+    """用指定配置档运行一次 pytest，返回耗时和内存统计"""
+    junit_path = os.path.join(RESULTS_DIR, f"browser-profile-{profile}.xml")
+    command = [
+        sys.executable, "-m", "pytest", f"--browser-profile={profile}",
+        f"--junitxml={junit_path}", "-q", "-p", "no:cacheprovider", *pytest_args
+    ]
+    print(f"\n=== 配置档 {profile}: {' '.join(command)} ===", flush=True)
+    start = time.monotonic()
+    process = subprocess.Popen(command, cwd=SUITE_DIR)
+    with RssSampler(process.pid) as sampler:
+        returncode = process.wait()
+    wall_time = time.monotonic() - start
+
+    durations = read_scenario_durations(junit_path)
+    values = list(durations.values())
+    return {
+        "profile": profile,
+        "returncode": returncode,
+        "wall_time": round(wall_time, 2),
+        "scenarios": len(values),
+        "scenario_total": round(sum(values), 2),
+        "scenario_mean": round(statistics.mean(values), 3) if values else None,
+        "scenario_max": round(max(values), 3) if values else None,
+        "browser_rss_peak_mb": round(max(sampler.samples) / 1024 / 1024, 1) if sampler.samples else None,
+        "browser_rss_mean_mb": round(statistics.mean(sampler.samples) / 1024 / 1024, 1) if sampler.samples else None,
+        "durations": durations,
+    }
+
+
+def print_summary(results):
+    print("\n=== 浏览器配置档对比 ===")
+    header = f"{'配置档':<10}{'总耗时(s)':>12}{'场景数':>8}{'场景合计(s)':>14}{'场景平均(s)':>14}{'RSS峰值(MB)':>14}{'RSS平均(MB)':>14}"
+    print(header)
+    for result in results:
+        print(
+            f"{result['profile']:<10}{result['wall_time']:>12}{result['scenarios']:>8}"
+            f"{result['scenario_total']:>14}{str(result['scenario_mean']):>14}"
+            f"{str(result['browser_rss_peak_mb']):>14}{str(result['browser_rss_mean_mb']):>14}"
+        )
+    failed = [result["profile"] for result in results if result["returncode"] != 0]
+    if failed:
+        print(f"\n注意: 以下配置档的测试未全部通过，对比结果仅供参考: {', '.join(failed)}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="比较不同浏览器配置档的场景耗时和内存占用")
+    parser.add_argument("--profiles", nargs="+", default=["default", "ci"], help="要比较的配置档")
+    parser.add_argument("pytest_args", nargs="*", help="传给 pytest 的其他参数（写在 -- 之后）")
+    args = parser.parse_args(argv)
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    results = [run_profile(profile, args.pytest_args) for profile in args.profiles]
+    print_summary(results)
+
+    output_path = os.path.join(RESULTS_DIR, "browser-profile-benchmark.json")
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"\n详细结果: {output_path}")
+    return 0 if all(result["returncode"] == 0 for result in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+"""
+WebDriver 会话池
+在场景之间复用已启动的浏览器：归还时清空前端站点的 Cookie 和存储并回到 about:blank，
+使用达到上限或场景失败后的会话直接关闭，下次借出时重新启动，避免每个场景都付出 1~3 秒的浏览器启动时间
+"""
+import threading
+from urllib.parse import urlparse
+
+
+class PooledSession:
+    """池中的一个浏览器会话及其使用次数"""
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.uses = 0
+
+
+class BrowserPool:
+    """浏览器会话池
+
+    - factory() 创建新的 WebDriver
+    - origins 为需要在场景之间清空 Cookie 和 localStorage/sessionStorage 的站点（如前端地址）
+    - max_uses 为单个会话最多服务的场景数，达到后关闭并重建；max_uses <= 1 时等同于每个场景启动新浏览器
+    """
+
+    def __init__(self, factory, origins=(), max_uses=20, log=print):
+        self.factory = factory
+        self.origins = [f"{urlparse(origin).scheme}://{urlparse(origin).netloc}" for origin in origins]
+        self.max_uses = max_uses
+        self.log = log
+        self.idle = []
+        self.lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+
+    def acquire(self):
+        """借出一个会话：优先复用空闲且仍然存活的会话，否则启动新浏览器"""
+        while True:
+            with self.lock:
+                session = self.idle.pop() if self.idle else None
+            if session is None:
+                break
+            if self._is_alive(session):
+                session.uses += 1
+                self.reused += 1
+                return session
+            self._quit(session, "会话已失效")
+
+        session = PooledSession(self.factory())
+        session.uses = 1
+        self.created += 1
+        return session
+
+    def release(self, session, failed=False):
+        """归还会话：场景失败、达到使用上限或重置失败时关闭，否则重置后放回池中"""
+        if failed:
+            self._quit(session, "场景失败")
+            return
+        if session.uses >= self.max_uses:
+            self._quit(session, f"已使用 {session.uses} 次")
+            return
+        try:
+            self.reset(session.driver)
+        except Exception as e:
+            self._quit(session, f"重置失败: {e}")
+            return
+        with self.lock:
+            self.idle.append(session)
+
+    def reset(self, driver):
+        """清空各站点的 Cookie 和存储，关闭多余窗口并回到 about:blank"""
+        handles = driver.window_handles
+        for handle in handles[1:]:
+            driver.switch_to.window(handle)
+            driver.close()
+        driver.switch_to.window(handles[0])
+        driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+        for origin in self.origins:
+            driver.execute_cdp_cmd("Storage.clearDataForOrigin", {"origin": origin, "storageTypes": "all"})
+        driver.get("about:blank")
+
+    def close(self):
+        """关闭池中所有空闲会话（会话级清理时调用）"""
+        with self.lock:
+            sessions, self.idle = self.idle, []
+        for session in sessions:
+            self._quit(session, None)
+        self.log(f"[浏览器池] 共启动浏览器 {self.created} 次，复用 {self.reused} 次")
+
+    def _is_alive(self, session):
+        try:
+            session.driver.current_url
+            return True
+        except Exception:
+            return False
+
+    def _quit(self, session, reason):
+        if reason:
+            self.log(f"[浏览器池] 关闭浏览器会话（{reason}）")
+        try:
+            session.driver.quit()
+        except Exception:
+            pass
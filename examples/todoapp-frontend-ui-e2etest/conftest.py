@@ -2,6 +2,7 @@
 pytest 配置文件
 负责测试环境的启动、关闭和数据库重置
 """
+import json
 import os
 import pathlib
 import subprocess
@@ -9,15 +10,33 @@ import time
 import logging
 import sys
 import threading
+from contextlib import contextmanager
+from urllib.parse import urlparse
 import psycopg2
 from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+from psycopg2.pool import ThreadedConnectionPool
 import pytest
 import requests
 from dotenv import load_dotenv
+from pytest_bdd import given, parsers
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
+from api_client import APIClient
+from readiness import wait_until
+from startup import StartupStep, StartupError, run_startup_graph
+from backend_build import get_prebuilt_launch
+from frontend_build import serve_frontend
+from browser_pool import BrowserPool
+from driver_resolver import resolve_chromedriver
+from browser_profiles import BROWSER_PROFILES, build_chrome_options
+import step_timing
+from process_output import get_output_collector, format_service_tails
+from process_supervisor import get_supervisor
+from ports import PORT_ALLOCATION, find_free_port, replace_port, get_published_port
+from db_profiles import TEST_DB_PROFILE, apply_profile, read_active_settings
+from docker_engine import (
+    DOCKER_ENGINE, DOCKER_API_ERRORS, get_docker_compose_cmd, get_docker_engine, get_container_health, postgres_test_spec
+)
 
 # 配置日志 - 确保输出可见（即使 pytest 捕获了标准输出）
 logger = logging.getLogger(__name__)
@@ -31,48 +50,316 @@ def log_print(message, level=logging.INFO):
     logger.log(level, message)
 
 
-def read_output(pipe, prefix, log_func):
-    """在单独线程中读取进程输出"""
-    try:
-        for line in iter(pipe.readline, ''):
-            if line:
-                log_func(f"[{prefix}] {line.rstrip()}")
-        pipe.close()
-    except Exception as e:
-        log_func(f"[{prefix}] 读取输出时出错: {e}", logging.ERROR)
+def get_service_log_name(service):
+    """服务输出日志的名称（并行模式下每个 worker 独立，例如 backend-gw0）"""
+    return f"{service}-{XDIST_WORKER}" if XDIST_WORKER else service
 
 # 加载环境变量
 load_dotenv()
 
+# 并行测试配置（pytest-xdist）
+# xdist 在 worker 进程加载 conftest 之前设置 PYTEST_XDIST_WORKER（如 "gw0"），串行运行时为空
+XDIST_WORKER = os.getenv("PYTEST_XDIST_WORKER")
+
+
+def get_worker_index():
+    """返回当前 xdist worker 的序号，串行运行时返回 None"""
+    if not XDIST_WORKER:
+        return None
+    return int(XDIST_WORKER.lstrip("gw"))
+
+
+def build_worker_url(base_url):
+    """为当前 worker 生成独立端口的 URL（基础端口 + 1 + worker 序号），串行运行时原样返回"""
+    index = get_worker_index()
+    if index is None:
+        return base_url
+    return replace_port(base_url, (urlparse(base_url).port or 80) + 1 + index)
+
+
+# 动态分配端口（见 ports.py）；复用常驻守护进程时地址必须在多次运行之间保持不变，使用固定端口
+DYNAMIC_PORTS = PORT_ALLOCATION == "dynamic" and os.getenv("ENV_DAEMON", "false").lower() != "true"
+
+
+def resolve_service_url(env_name, default_url):
+    """服务地址：显式配置优先（并行模式下按 worker 序号偏移端口），动态模式下每个进程申请自己的空闲端口"""
+    if os.getenv(env_name) or not DYNAMIC_PORTS:
+        return build_worker_url(os.getenv(env_name, default_url))
+    return replace_port(default_url, find_free_port())
+
+
+def resolve_db_port():
+    """测试数据库端口：显式配置优先；动态模式下复用已运行容器映射的端口，否则申请空闲端口
+
+    结果写回环境变量（TEST_DB_PORT 与 docker-compose.test.yml 端口映射使用的 TEST_DB_PUBLISHED_PORT），
+    由控制进程确定后 docker compose、xdist worker 和守护进程都继承同一个端口。
+    """
+    port = os.getenv("TEST_DB_PORT")
+    if not port:
+        if DYNAMIC_PORTS:
+            port = str(get_published_port(TEST_DB_CONTAINER, 5432) or find_free_port())
+        else:
+            port = "5433"
+        os.environ["TEST_DB_PORT"] = port
+    if TEST_DB_HOST in ("localhost", "127.0.0.1"):
+        os.environ.setdefault("TEST_DB_PUBLISHED_PORT", port)
+    return port
+
+
 # 测试配置
 TEST_DB_HOST = os.getenv("TEST_DB_HOST", "localhost")
-TEST_DB_PORT = os.getenv("TEST_DB_PORT", "5433")
-TEST_DB_NAME = os.getenv("TEST_DB_NAME", "todoapp_test")
+TEST_DB_CONTAINER = os.getenv("TEST_DB_CONTAINER", "todoapp-postgres-test")
+TEST_DB_PORT = resolve_db_port()
+TEST_DB_BASE_NAME = os.getenv("TEST_DB_NAME", "todoapp_test")
+# 并行模式下每个 worker 使用独立数据库，例如 todoapp_test_gw0
+TEST_DB_NAME = f"{TEST_DB_BASE_NAME}_{XDIST_WORKER}" if XDIST_WORKER else TEST_DB_BASE_NAME
+# 模板数据库（template 重置策略）与执行 DROP/CREATE DATABASE 时使用的维护库
+TEST_DB_TEMPLATE_NAME = f"{TEST_DB_NAME}_template"
+TEST_DB_MAINTENANCE_NAME = os.getenv("TEST_DB_MAINTENANCE_NAME", "postgres")
 TEST_DB_USER = os.getenv("TEST_DB_USER", "postgres")
 TEST_DB_PASSWORD = os.getenv("TEST_DB_PASSWORD", "postgres")
-API_BASE_URL = os.getenv("API_BASE_URL", "http://localhost:5085")
-FRONTEND_BASE_URL = os.getenv("FRONTEND_BASE_URL", "http://localhost:8080")
+# 每个测试前的数据库重置策略：truncate（默认）/ template / recreate
+DB_RESET_STRATEGY = os.getenv("DB_RESET_STRATEGY", "truncate")
+# 测试用户初始化方式：direct（默认，使用缓存的 bcrypt 哈希直接写库）/ api（调用注册接口，由后端计算哈希）
+USER_SEED_MODE = os.getenv("USER_SEED_MODE", "direct")
+# 测试数据库连接池配置（连接空闲超过 DB_POOL_IDLE_TIMEOUT 秒后在下次借出时重建）
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "5"))
+DB_POOL_IDLE_TIMEOUT = float(os.getenv("DB_POOL_IDLE_TIMEOUT", "60"))
+API_BASE_URL = resolve_service_url("API_BASE_URL", "http://localhost:5085")
+FRONTEND_BASE_URL = resolve_service_url("FRONTEND_BASE_URL", "http://localhost:8080")
+DB_STARTUP_TIMEOUT = int(os.getenv("DB_STARTUP_TIMEOUT", "30"))
+BACKEND_DIR = os.path.abspath(os.getenv(
+    "BACKEND_DIR",
+    os.path.join(os.path.dirname(__file__), "..", "todoapp-backend-api")
+))
+FRONTEND_DIR = os.path.abspath(os.getenv(
+    "FRONTEND_DIR",
+    os.path.join(os.path.dirname(__file__), "..", "todoapp-frontend-vue2")
+))
 API_STARTUP_TIMEOUT = int(os.getenv("API_STARTUP_TIMEOUT", "60"))
+# 后端启动方式：prebuilt（默认，按源码哈希 dotnet publish 一次并直接启动 dll）/ run（dotnet build + dotnet run --no-build）
+BACKEND_LAUNCH_MODE = os.getenv("BACKEND_LAUNCH_MODE", "prebuilt")
+# 后端 (ASP.NET Core) 开始监听端口时输出的日志
+API_READY_MARKER = "Now listening on"
 FRONTEND_STARTUP_TIMEOUT = int(os.getenv("FRONTEND_STARTUP_TIMEOUT", "60"))
+# 前端提供方式：static（默认，按源码哈希构建一次生产包，由进程内静态服务器提供）/ dev（npm run serve 开发服务器）
+FRONTEND_SERVE_MODE = os.getenv("FRONTEND_SERVE_MODE", "static")
+# 单个浏览器会话最多服务的场景数，达到后关闭并重建（设为 1 时每个场景启动新浏览器）
+BROWSER_POOL_MAX_USES = int(os.getenv("BROWSER_POOL_MAX_USES", "20"))
+# 复用常驻测试环境守护进程（env_daemon.py），测试结束后不停止服务，仅串行运行时生效
+ENV_DAEMON = os.getenv("ENV_DAEMON", "false").lower() == "true"
+# 测试失败时附加到报告中的每个服务最近输出行数
+PROCESS_OUTPUT_FAILURE_LINES = int(os.getenv("PROCESS_OUTPUT_FAILURE_LINES", "50"))
+
+
+def is_xdist_controller(config):
+    """判断当前进程是否为 xdist 的控制进程（使用了 -n 且不是 worker）"""
+    return not hasattr(config, "workerinput") and bool(getattr(config.option, "numprocesses", None))
+
 
+def get_worker_count(config):
+    """xdist worker 数（串行运行时为 1）"""
+    numprocesses = getattr(config.option, "numprocesses", None)
+    return numprocesses if isinstance(numprocesses, int) and numprocesses > 0 else 1
 
-def get_db_connection():
-    """获取数据库连接"""
-    return psycopg2.connect(
-        host=TEST_DB_HOST,
-        port=TEST_DB_PORT,
-        database=TEST_DB_NAME,
-        user=TEST_DB_USER,
-        password=TEST_DB_PASSWORD
+
+def pytest_addoption(parser):
+    """浏览器配置档：命令行 --browser-profile 优先，其次 BROWSER_PROFILE 环境变量，最后 pytest.ini 中的 browser_profile"""
+    parser.addoption(
+        "--browser-profile",
+        choices=sorted(BROWSER_PROFILES),
+        default=None,
+        help="浏览器配置档（default / ci）"
     )
+    parser.addini("browser_profile", "浏览器配置档（default / ci）", default="default")
 
 
-def reset_database():
-    """重置数据库：删除所有表并重新创建"""
-    conn = None
-    try:
-        conn = get_db_connection()
-        conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+def get_browser_profile(config):
+    """按优先级返回当前使用的浏览器配置档"""
+    return (
+        config.getoption("--browser-profile")
+        or os.getenv("BROWSER_PROFILE")
+        or config.getini("browser_profile")
+    )
+
+
+def pytest_configure(config):
+    """注册耗时统计插件；并行模式下由控制进程统一启动一次 Docker Compose，worker 只负责各自的数据库、后端和前端"""
+    # 步骤和 fixture 耗时统计（见 step_timing.py）
+    step_timing.register(config)
+    # 按 worker 数生成数据库配置档（worker 继承控制进程的环境变量）
+    if not XDIST_WORKER:
+        apply_profile(get_worker_count(config))
+    if is_xdist_controller(config):
+        log_print("\n=== 并行模式：控制进程启动共享测试数据库 ===")
+        start_docker_compose()
+        wait_for_database()
+
+
+def get_db_connect_params(database=None):
+    """获取数据库连接参数（默认连接当前 worker 的测试数据库）"""
+    return {
+        "host": TEST_DB_HOST,
+        "port": TEST_DB_PORT,
+        "database": database or TEST_DB_NAME,
+        "user": TEST_DB_USER,
+        "password": TEST_DB_PASSWORD,
+    }
+
+
+def get_db_connection(database=None):
+    """获取一个独立的数据库连接（不经过连接池，用于维护库、模板库等）"""
+    return psycopg2.connect(**get_db_connect_params(database))
+
+
+class DatabasePool:
+    """测试数据库连接池，复用连接以省去每次 TCP/认证握手
+
+    基于 ThreadedConnectionPool，额外记录每个连接的归还时间，
+    借出时丢弃空闲超过 idle_timeout 秒或已断开的连接并重新建立。
+    """
+    
+    def __init__(self, minconn=None, maxconn=None, idle_timeout=None):
+        self.minconn = DB_POOL_MIN_SIZE if minconn is None else minconn
+        self.maxconn = DB_POOL_MAX_SIZE if maxconn is None else maxconn
+        self.idle_timeout = DB_POOL_IDLE_TIMEOUT if idle_timeout is None else idle_timeout
+        self._last_used = {}
+        self._pool = ThreadedConnectionPool(self.minconn, self.maxconn, **get_db_connect_params())
+    
+    def getconn(self):
+        """借出一个可用连接"""
+        while True:
+            conn = self._pool.getconn()
+            last_used = self._last_used.pop(id(conn), None)
+            idle_expired = last_used is not None and time.monotonic() - last_used > self.idle_timeout
+            if conn.closed or idle_expired:
+                self._pool.putconn(conn, close=True)
+                continue
+            return conn
+    
+    def putconn(self, conn, close=False):
+        """归还连接，close=True 时直接关闭"""
+        if not close and not conn.closed:
+            self._last_used[id(conn)] = time.monotonic()
+        self._pool.putconn(conn, close=close or bool(conn.closed))
+    
+    @contextmanager
+    def connection(self, autocommit=True):
+        """借出连接的上下文管理器：非 autocommit 模式下正常退出提交、异常时回滚"""
+        conn = self.getconn()
+        broken = False
+        try:
+            conn.autocommit = autocommit
+            yield conn
+            if not autocommit:
+                conn.commit()
+        except Exception:
+            if not conn.closed and not autocommit:
+                conn.rollback()
+            broken = bool(conn.closed)
+            raise
+        finally:
+            self.putconn(conn, close=broken)
+    
+    def clear(self):
+        """关闭所有空闲连接（数据库被删除或重命名前调用），之后按需重新建立"""
+        self._pool.closeall()
+        self._last_used.clear()
+        self._pool = ThreadedConnectionPool(0, self.maxconn, **get_db_connect_params())
+    
+    def close(self):
+        """关闭连接池"""
+        self._pool.closeall()
+        self._last_used.clear()
+
+
+# 当前进程的连接池（首次使用时创建）
+_db_pool = None
+
+
+def get_db_pool():
+    """获取当前进程的测试数据库连接池，不存在时创建"""
+    global _db_pool
+    if _db_pool is None:
+        _db_pool = DatabasePool()
+    return _db_pool
+
+
+def clear_db_pool():
+    """清空连接池中的连接（数据库将被删除或替换时调用）"""
+    if _db_pool is not None:
+        _db_pool.clear()
+
+
+def close_db_pool():
+    """关闭当前进程的连接池"""
+    global _db_pool
+    if _db_pool is not None:
+        _db_pool.close()
+        _db_pool = None
+
+
+# 表结构 DDL（基于 EF Core 模型）
+SCHEMA_DDL = [
+    # Users 表
+    """
+    CREATE TABLE IF NOT EXISTS "Users" (
+        "Id" SERIAL PRIMARY KEY,
+        "Username" VARCHAR(50) NOT NULL UNIQUE,
+        "Email" VARCHAR(100) NOT NULL UNIQUE,
+        "PasswordHash" TEXT NOT NULL,
+        "CreatedAt" TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    # Projects 表
+    """
+    CREATE TABLE IF NOT EXISTS "Projects" (
+        "Id" SERIAL PRIMARY KEY,
+        "Name" VARCHAR(200) NOT NULL,
+        "Description" TEXT,
+        "UserId" INTEGER NOT NULL,
+        "CreatedAt" TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        "UpdatedAt" TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        CONSTRAINT "FK_Projects_Users_UserId" FOREIGN KEY ("UserId") 
+            REFERENCES "Users" ("Id") ON DELETE CASCADE
+    )
+    """,
+    # Todos 表
+    """
+    CREATE TABLE IF NOT EXISTS "Todos" (
+        "Id" SERIAL PRIMARY KEY,
+        "Title" VARCHAR(200) NOT NULL,
+        "Description" TEXT,
+        "IsCompleted" BOOLEAN NOT NULL DEFAULT FALSE,
+        "ProjectId" INTEGER NOT NULL,
+        "CreatedAt" TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        "UpdatedAt" TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        CONSTRAINT "FK_Todos_Projects_ProjectId" FOREIGN KEY ("ProjectId") 
+            REFERENCES "Projects" ("Id") ON DELETE CASCADE
+    )
+    """,
+    # 索引
+    'CREATE INDEX IF NOT EXISTS "IX_Users_Username" ON "Users" ("Username")',
+    'CREATE INDEX IF NOT EXISTS "IX_Users_Email" ON "Users" ("Email")',
+    'CREATE INDEX IF NOT EXISTS "IX_Projects_UserId" ON "Projects" ("UserId")',
+    'CREATE INDEX IF NOT EXISTS "IX_Todos_ProjectId" ON "Todos" ("ProjectId")',
+]
+
+# 当前进程中 truncate / template 策略的一次性准备状态
+_truncate_sql = None
+_template_ready = False
+
+
+def create_schema(cursor):
+    """在当前连接的数据库中创建表结构和索引"""
+    for ddl in SCHEMA_DDL:
+        cursor.execute(ddl)
+
+
+def recreate_database_schema():
+    """删除所有表和序列并重新创建表结构（recreate 策略）"""
+    with get_db_pool().connection() as conn:
         cursor = conn.cursor()
         
         # 删除所有表（按依赖顺序）
@@ -97,161 +384,184 @@ def reset_database():
             END $$;
         """)
         
-        # 创建表结构（基于 EF Core 模型）
-        # Users 表
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS "Users" (
-                "Id" SERIAL PRIMARY KEY,
-                "Username" VARCHAR(50) NOT NULL UNIQUE,
-                "Email" VARCHAR(100) NOT NULL UNIQUE,
-                "PasswordHash" TEXT NOT NULL,
-                "CreatedAt" TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        # Projects 表
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS "Projects" (
-                "Id" SERIAL PRIMARY KEY,
-                "Name" VARCHAR(200) NOT NULL,
-                "Description" TEXT,
-                "UserId" INTEGER NOT NULL,
-                "CreatedAt" TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
-                "UpdatedAt" TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
-                CONSTRAINT "FK_Projects_Users_UserId" FOREIGN KEY ("UserId") 
-                    REFERENCES "Users" ("Id") ON DELETE CASCADE
-            )
-        """)
-        
-        # Todos 表
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS "Todos" (
-                "Id" SERIAL PRIMARY KEY,
-                "Title" VARCHAR(200) NOT NULL,
-                "Description" TEXT,
-                "IsCompleted" BOOLEAN NOT NULL DEFAULT FALSE,
-                "ProjectId" INTEGER NOT NULL,
-                "CreatedAt" TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
-                "UpdatedAt" TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
-                CONSTRAINT "FK_Todos_Projects_ProjectId" FOREIGN KEY ("ProjectId") 
-                    REFERENCES "Projects" ("Id") ON DELETE CASCADE
-            )
-        """)
-        
-        # 创建索引
-        cursor.execute('CREATE INDEX IF NOT EXISTS "IX_Users_Username" ON "Users" ("Username")')
-        cursor.execute('CREATE INDEX IF NOT EXISTS "IX_Users_Email" ON "Users" ("Email")')
-        cursor.execute('CREATE INDEX IF NOT EXISTS "IX_Projects_UserId" ON "Projects" ("UserId")')
-        cursor.execute('CREATE INDEX IF NOT EXISTS "IX_Todos_ProjectId" ON "Todos" ("ProjectId")')
-        
+        create_schema(cursor)
+        cursor.close()
+
+
+def truncate_database():
+    """清空所有表数据并重置自增序列（truncate 策略）
+
+    首次调用时按 recreate 策略建好表结构并缓存 TRUNCATE 语句，
+    之后每次重置只需一条 TRUNCATE ... RESTART IDENTITY CASCADE。
+    """
+    global _truncate_sql
+    if _truncate_sql is None:
+        recreate_database_schema()
+    
+    with get_db_pool().connection() as conn:
+        cursor = conn.cursor()
+        if _truncate_sql is None:
+            cursor.execute("SELECT tablename FROM pg_tables WHERE schemaname = 'public' ORDER BY tablename")
+            tables = ", ".join(f'"{row[0]}"' for row in cursor.fetchall())
+            _truncate_sql = f"TRUNCATE {tables} RESTART IDENTITY CASCADE"
+        cursor.execute(_truncate_sql)
         cursor.close()
-        log_print("数据库已重置并创建表结构")
+
+
+def build_template_database():
+    """创建只包含表结构的模板数据库（每个进程只构建一次）"""
+    global _template_ready
+    conn = None
+    try:
+        conn = get_db_connection(TEST_DB_MAINTENANCE_NAME)
+        conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+        cursor = conn.cursor()
+        cursor.execute(f'DROP DATABASE IF EXISTS "{TEST_DB_TEMPLATE_NAME}" WITH (FORCE)')
+        cursor.execute(f'CREATE DATABASE "{TEST_DB_TEMPLATE_NAME}"')
+        cursor.close()
+    finally:
+        if conn:
+            conn.close()
+    
+    conn = None
+    try:
+        conn = get_db_connection(TEST_DB_TEMPLATE_NAME)
+        conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+        cursor = conn.cursor()
+        create_schema(cursor)
+        cursor.close()
+    finally:
+        if conn:
+            conn.close()
+    _template_ready = True
+    log_print(f"模板数据库已创建: {TEST_DB_TEMPLATE_NAME}")
+
+
+def restore_database_from_template():
+    """从模板数据库重新克隆测试数据库（template 策略）
+
+    DROP ... WITH (FORCE) 会断开后端已有的连接，因此该策略下后端连接字符串会关闭连接池。
+    """
+    if not _template_ready:
+        build_template_database()
+    
+    conn = None
+    try:
+        conn = get_db_connection(TEST_DB_MAINTENANCE_NAME)
+        conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+        cursor = conn.cursor()
+        clear_db_pool()
+        cursor.execute(f'DROP DATABASE IF EXISTS "{TEST_DB_NAME}" WITH (FORCE)')
+        cursor.execute(f'CREATE DATABASE "{TEST_DB_NAME}" TEMPLATE "{TEST_DB_TEMPLATE_NAME}"')
+        cursor.close()
+    finally:
+        if conn:
+            conn.close()
+
+
+DB_RESET_STRATEGIES = {
+    "truncate": truncate_database,
+    "template": restore_database_from_template,
+    "recreate": recreate_database_schema,
+}
+
+
+def reset_database(strategy=None):
+    """重置数据库（策略由 DB_RESET_STRATEGY 配置：truncate / template / recreate）"""
+    strategy = strategy or DB_RESET_STRATEGY
+    if strategy not in DB_RESET_STRATEGIES:
+        raise ValueError(f"未知的数据库重置策略: {strategy}，可选: {', '.join(DB_RESET_STRATEGIES)}")
+    try:
+        DB_RESET_STRATEGIES[strategy]()
+        log_print(f"数据库已重置（{strategy}）")
     except Exception as e:
         log_print(f"重置数据库时出错: {e}", logging.ERROR)
         raise
+
+
+def create_worker_database():
+    """为当前 xdist worker 创建独立的空数据库（已存在则先删除）"""
+    conn = None
+    try:
+        conn = get_db_connection(TEST_DB_BASE_NAME)
+        conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+        cursor = conn.cursor()
+        clear_db_pool()
+        cursor.execute(f'DROP DATABASE IF EXISTS "{TEST_DB_NAME}" WITH (FORCE)')
+        cursor.execute(f'CREATE DATABASE "{TEST_DB_NAME}"')
+        cursor.close()
+        log_print(f"worker {XDIST_WORKER} 的数据库已创建: {TEST_DB_NAME}")
     finally:
         if conn:
             conn.close()
 
 
-def wait_for_database(max_retries=30, retry_interval=1):
-    """等待数据库就绪"""
-    for i in range(max_retries):
-        try:
-            conn = get_db_connection()
-            conn.close()
-            log_print("数据库已就绪")
-            return True
-        except Exception as e:
-            if i < max_retries - 1:
-                log_print(f"等待数据库就绪... ({i+1}/{max_retries})")
-                time.sleep(retry_interval)
-            else:
-                log_print(f"数据库连接失败: {e}", logging.ERROR)
-                raise
-    return False
-
-
-def wait_for_api(max_retries=60, retry_interval=1):
-    """等待 API 服务就绪"""
-    for i in range(max_retries):
-        try:
-            response = requests.get(f"{API_BASE_URL}/swagger/index.html", timeout=2)
-            if response.status_code in [200, 404]:
-                log_print("API 服务已就绪")
-                return True
-        except requests.exceptions.RequestException:
-            pass
-        
-        if i < max_retries - 1:
-            log_print(f"等待 API 服务就绪... ({i+1}/{max_retries})")
-            time.sleep(retry_interval)
-        else:
-            log_print("API 服务启动超时", logging.ERROR)
-            raise TimeoutError("API 服务启动超时")
-    return False
+def check_database_container():
+    """数据库容器已退出或健康检查失败时提前报错，避免等满超时时间"""
+    health = get_container_health(TEST_DB_CONTAINER)
+    if health is not None and health.status in ("unhealthy", "exited", "dead"):
+        raise RuntimeError(f"数据库容器 {TEST_DB_CONTAINER} 状态异常: {health.describe()}")
 
 
-def wait_for_frontend(max_retries=60, retry_interval=1):
-    """等待前端服务就绪"""
-    for i in range(max_retries):
-        try:
-            response = requests.get(f"{FRONTEND_BASE_URL}", timeout=2)
-            if response.status_code == 200:
-                log_print("前端服务已就绪")
-                return True
-        except requests.exceptions.RequestException:
-            pass
-        
-        if i < max_retries - 1:
-            log_print(f"等待前端服务就绪... ({i+1}/{max_retries})")
-            time.sleep(retry_interval)
-        else:
-            log_print("前端服务启动超时", logging.ERROR)
-            raise TimeoutError("前端服务启动超时")
-    return False
+def wait_for_database(timeout=DB_STARTUP_TIMEOUT):
+    """等待数据库就绪（快速探测 + 指数退避，同时参考容器的 Docker 健康检查状态）"""
+    def probe():
+        # 直接以建立连接池作为就绪探测，探测成功的连接保留在池中供后续复用
+        get_db_pool()
+        return True
+    
+    try:
+        wait_until(probe, timeout, "等待数据库就绪", abort_check=check_database_container, log=log_print)
+    except (TimeoutError, RuntimeError) as e:
+        log_print(f"数据库连接失败: {e}", logging.ERROR)
+        raise
+    with get_db_pool().connection() as conn:
+        settings = ", ".join(f"{name}={value}" for name, value in read_active_settings(conn).items())
+    log_print(f"数据库已就绪（配置档 {TEST_DB_PROFILE}: {settings}）")
+    return True
 
 
-def get_docker_compose_cmd():
-    """根据操作系统检测 Docker Compose 命令"""
-    import platform
-    system = platform.system()
-    
-    if system == "Darwin":  # macOS
-        try:
-            subprocess.run(
-                ["docker", "compose", "version"],
-                check=True,
-                capture_output=True,
-                text=True
-            )
-            return ["docker", "compose"]
-        except (subprocess.CalledProcessError, FileNotFoundError):
-            raise RuntimeError("未找到 docker compose 命令（macOS 需要 Docker Desktop）")
-    else:
-        try:
-            subprocess.run(
-                ["docker-compose", "--version"],
-                check=True,
-                capture_output=True,
-                text=True
-            )
-            return ["docker-compose"]
-        except (subprocess.CalledProcessError, FileNotFoundError):
-            try:
-                subprocess.run(
-                    ["docker", "compose", "version"],
-                    check=True,
-                    capture_output=True,
-                    text=True
-                )
-                return ["docker", "compose"]
-            except (subprocess.CalledProcessError, FileNotFoundError):
-                raise RuntimeError("未找到 docker-compose 或 docker compose 命令")
+def is_api_ready():
+    """API 服务是否已可以响应请求"""
+    response = requests.get(f"{API_BASE_URL}/swagger/index.html", timeout=2)
+    return response.status_code in [200, 404]
+
+
+def is_frontend_ready():
+    """前端服务是否已可以响应请求"""
+    response = requests.get(f"{FRONTEND_BASE_URL}", timeout=2)
+    return response.status_code == 200
+
+
+def wait_for_api(timeout=API_STARTUP_TIMEOUT):
+    """等待 API 服务就绪"""
+    try:
+        wait_until(is_api_ready, timeout, "等待 API 服务就绪", log=log_print)
+    except TimeoutError:
+        log_print("API 服务启动超时", logging.ERROR)
+        raise
+    log_print("API 服务已就绪")
+    return True
+
+
+def wait_for_frontend(timeout=FRONTEND_STARTUP_TIMEOUT):
+    """等待前端服务就绪"""
+    try:
+        wait_until(is_frontend_ready, timeout, "等待前端服务就绪", log=log_print)
+    except TimeoutError:
+        log_print("前端服务启动超时", logging.ERROR)
+        raise
+    log_print("前端服务已就绪")
+    return True
 
 
 def start_docker_compose():
-    """启动 Docker Compose 服务"""
+    """启动测试数据库（DOCKER_ENGINE=api 时直接调用 Docker Engine API，否则使用 Docker Compose）"""
+    # 未经 pytest_configure 直接调用时（例如常驻环境守护进程）按串行运行生成数据库配置档
+    apply_profile()
+    if DOCKER_ENGINE == "api":
+        start_database_container()
+        return
     compose_file = os.path.join(os.path.dirname(__file__), "docker-compose.test.yml")
     try:
         docker_compose_cmd = get_docker_compose_cmd()
@@ -271,7 +581,10 @@ def start_docker_compose():
 
 
 def stop_docker_compose():
-    """停止 Docker Compose 服务"""
+    """停止测试数据库（DOCKER_ENGINE=api 时直接删除容器，否则使用 Docker Compose）"""
+    if DOCKER_ENGINE == "api":
+        stop_database_container()
+        return
     compose_file = os.path.join(os.path.dirname(__file__), "docker-compose.test.yml")
     try:
         docker_compose_cmd = get_docker_compose_cmd()
@@ -288,11 +601,63 @@ def stop_docker_compose():
         log_print(f"检测 Docker Compose 命令失败: {e}", logging.ERROR)
 
 
-def start_backend_api():
-    """启动后端 API 服务"""
+def start_database_container():
+    """通过 Docker Engine API 创建并启动测试数据库容器（配置与 docker-compose.test.yml 一致）"""
+    spec = postgres_test_spec(os.getenv("TEST_DB_PUBLISHED_PORT", "5433"), server_args=os.getenv("TEST_DB_SERVER_ARGS", ""))
+    try:
+        previous = get_docker_engine().ensure_running(TEST_DB_CONTAINER, spec)
+    except DOCKER_API_ERRORS as e:
+        log_print(f"通过 Docker API 启动数据库容器失败: {e}", logging.ERROR)
+        raise
+    log_print(f"数据库容器 {TEST_DB_CONTAINER} 已启动（Docker API，启动前状态: {previous}）")
+
+
+def stop_database_container():
+    """通过 Docker Engine API 删除测试数据库容器"""
+    try:
+        get_docker_engine().remove(TEST_DB_CONTAINER)
+        log_print(f"数据库容器 {TEST_DB_CONTAINER} 已删除")
+    except DOCKER_API_ERRORS as e:
+        log_print(f"通过 Docker API 删除数据库容器失败: {e}", logging.ERROR)
+
+
+def build_backend_api():
+    """预先编译后端项目（不依赖数据库，可以与数据库启动并发执行），返回启动用的 (命令, 工作目录)"""
+    try:
+        if is_api_ready():
+            log_print("后端 API 服务已在运行，跳过编译")
+            return None
+    except requests.exceptions.RequestException:
+        pass
+    
+    try:
+        if BACKEND_LAUNCH_MODE == "prebuilt":
+            return get_prebuilt_launch(BACKEND_DIR, log=log_print)
+        log_print(f"编译后端项目: {BACKEND_DIR}")
+        subprocess.run(
+            ["dotnet", "build", "--nologo"],
+            cwd=BACKEND_DIR,
+            check=True,
+            capture_output=True,
+            text=True
+        )
+    except FileNotFoundError as e:
+        error_msg = f"未找到 dotnet 命令，请确保已安装 .NET SDK: {e}"
+        log_print(f"错误: {error_msg}", logging.ERROR)
+        raise RuntimeError(error_msg) from e
+    except subprocess.CalledProcessError as e:
+        log_print(f"编译后端项目失败: {e.stdout}{e.stderr}", logging.ERROR)
+        raise
+    return ["dotnet", "run", "--no-build"], BACKEND_DIR
+
+
+def start_backend_api(launch=None):
+    """启动后端 API 服务
+
+    launch 为 build_backend_api 返回的 (命令, 工作目录)，未提供时使用 dotnet run（启动时编译）。
+    """
     log_print("检查后端 API 服务状态...")
-    backend_dir = os.path.join(os.path.dirname(__file__), "..", "todoapp-backend-api")
-    backend_dir = os.path.abspath(backend_dir)
+    backend_dir = BACKEND_DIR
     
     if not os.path.exists(backend_dir):
         error_msg = f"后端项目目录不存在: {backend_dir}"
@@ -315,6 +680,9 @@ def start_backend_api():
     # 构建数据库连接字符串
     # .NET Core 使用 PostgreSQL 连接字符串格式
     connection_string = f"Host={TEST_DB_HOST};Port={TEST_DB_PORT};Database={TEST_DB_NAME};Username={TEST_DB_USER};Password={TEST_DB_PASSWORD}"
+    # template 策略每次重置都会删除数据库并断开连接，关闭连接池避免复用失效连接
+    if DB_RESET_STRATEGY == "template":
+        connection_string += ";Pooling=false"
     log_print(f"数据库连接字符串: Host={TEST_DB_HOST};Port={TEST_DB_PORT};Database={TEST_DB_NAME};Username={TEST_DB_USER};Password=***")
     
     # 设置后端环境变量
@@ -329,13 +697,21 @@ def start_backend_api():
     env["DB_NAME"] = TEST_DB_NAME
     env["DB_USER"] = TEST_DB_USER
     env["DB_PASSWORD"] = TEST_DB_PASSWORD
+    # 直接启动 dll 时不会读取 launchSettings.json，与 dotnet run 保持相同的运行环境
+    env.setdefault("ASPNETCORE_ENVIRONMENT", "Development")
+    
+    command, cwd = launch or (["dotnet", "run"], backend_dir)
+    command = command + ["--urls", API_BASE_URL]
     
     # 启动后端服务
-    log_print("启动后端 API 服务...")
+    log_print(f"启动后端 API 服务: {' '.join(command)}")
     try:
-        process = subprocess.Popen(
-            ["dotnet", "run", "--urls", API_BASE_URL],
-            cwd=backend_dir,
+        # 在独立的进程组中启动，停止时连同 dotnet run 派生的子进程一起终止
+        process = get_supervisor(log=log_print).spawn(
+            "后端 API 服务",
+            command,
+            ports=[urlparse(API_BASE_URL).port],
+            cwd=cwd,
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
             text=True,
@@ -344,19 +720,14 @@ def start_backend_api():
         )
         log_print(f"后端 API 服务进程已启动 (PID: {process.pid})")
         
-        # 启动线程实时读取输出
-        stdout_thread = threading.Thread(
-            target=read_output,
-            args=(process.stdout, "后端-STDOUT", log_print),
-            daemon=True
-        )
-        stderr_thread = threading.Thread(
-            target=read_output,
-            args=(process.stderr, "后端-STDERR", lambda msg, level=logging.ERROR: log_print(msg, level)),
-            daemon=True
+        # 输出交给统一的采集线程（滚动日志文件 + 最近输出缓冲），看到 "Now listening on" 时立即唤醒就绪等待
+        ready_event = threading.Event()
+        collector = get_output_collector(echo=log_print)
+        backend_output = collector.attach(
+            get_service_log_name("backend"), process.stdout, ready_marker=API_READY_MARKER, ready_event=ready_event
         )
-        stdout_thread.start()
-        stderr_thread.start()
+        collector.attach(get_service_log_name("backend"), process.stderr, stream="stderr")
+        log_print(f"后端输出日志: {backend_output.path}")
         
     except FileNotFoundError as e:
         error_msg = f"未找到 dotnet 命令，请确保已安装 .NET SDK: {e}"
@@ -370,58 +741,47 @@ def start_backend_api():
     # 等待服务就绪，同时检查进程状态
     log_print("等待后端 API 服务就绪...")
     try:
-        wait_for_api_with_process_check(process)
+        wait_for_api_with_process_check(process, ready_event)
         log_print("后端 API 服务已就绪")
     except Exception as e:
-        # 如果进程已退出，尝试读取最后的错误信息
+        # 如果进程已退出，输出退出码
         if process.poll() is not None:
             log_print(f"后端进程已退出，退出码: {process.returncode}", logging.ERROR)
-            # 尝试读取剩余的输出
-            try:
-                remaining_stdout = process.stdout.read()
-                remaining_stderr = process.stderr.read()
-                if remaining_stdout:
-                    log_print(f"后端最后输出 (STDOUT): {remaining_stdout}", logging.ERROR)
-                if remaining_stderr:
-                    log_print(f"后端最后输出 (STDERR): {remaining_stderr}", logging.ERROR)
-            except:
-                pass
+        # 输出最近的后端日志（完整内容见日志文件）
+        log_print("后端最后输出:\n" + "\n".join(backend_output.tail(50)), logging.ERROR)
+        get_supervisor(log=log_print).stop([process], grace_period=0)
         raise
     return process
 
 
-def wait_for_api_with_process_check(process, max_retries=60, retry_interval=1):
-    """等待 API 服务就绪，同时检查进程是否还在运行"""
-    for i in range(max_retries):
-        # 检查进程是否还在运行
+def wait_for_api_with_process_check(process, ready_event=None, timeout=API_STARTUP_TIMEOUT):
+    """等待 API 服务就绪，同时检查进程是否还在运行
+
+    ready_event 由输出读取线程在看到 "Now listening on" 时设置，设置后立即重新探测，
+    不必等到下一个退避间隔。
+    """
+    def check_process():
         if process.poll() is not None:
             error_msg = f"后端进程已退出，退出码: {process.returncode}"
             log_print(error_msg, logging.ERROR)
             raise RuntimeError(error_msg)
-        
-        # 检查 API 是否就绪
-        try:
-            response = requests.get(f"{API_BASE_URL}/swagger/index.html", timeout=2)
-            if response.status_code in [200, 404]:
-                log_print("API 服务已就绪")
-                return True
-        except requests.exceptions.RequestException:
-            pass
-        
-        if i < max_retries - 1:
-            log_print(f"等待 API 服务就绪... ({i+1}/{max_retries})")
-            time.sleep(retry_interval)
-        else:
-            log_print("API 服务启动超时", logging.ERROR)
-            raise TimeoutError("API 服务启动超时")
-    return False
+    
+    try:
+        wait_until(
+            is_api_ready, timeout, "等待 API 服务就绪",
+            ready_event=ready_event, abort_check=check_process, abort_interval=0, log=log_print
+        )
+    except TimeoutError:
+        log_print("API 服务启动超时", logging.ERROR)
+        raise
+    log_print("API 服务已就绪")
+    return True
 
 
 def start_frontend():
     """启动前端服务"""
     log_print("检查前端服务状态...")
-    frontend_dir = os.path.join(os.path.dirname(__file__), "..", "todoapp-frontend-vue2")
-    frontend_dir = os.path.abspath(frontend_dir)
+    frontend_dir = FRONTEND_DIR
     
     if not os.path.exists(frontend_dir):
         error_msg = f"前端项目目录不存在: {frontend_dir}"
@@ -441,24 +801,44 @@ def start_frontend():
     except requests.exceptions.RequestException as e:
         log_print(f"前端服务未运行或无法连接: {e}")
     
+    frontend_port = urlparse(FRONTEND_BASE_URL).port or 8080
+    if FRONTEND_SERVE_MODE == "static":
+        try:
+            server = serve_frontend(frontend_dir, frontend_port, API_BASE_URL, log=log_print)
+            get_supervisor(log=log_print).adopt("前端服务", server, ports=[frontend_port])
+        except FileNotFoundError as e:
+            error_msg = f"未找到 npm 命令，请确保已安装 Node.js: {e}"
+            log_print(f"错误: {error_msg}", logging.ERROR)
+            raise RuntimeError(error_msg) from e
+        wait_for_frontend()
+        log_print("前端服务已就绪")
+        return server
+    
     # 设置环境变量，确保使用真实 API
     env = os.environ.copy()
     env["VUE_APP_USE_MOCK"] = "false"
     env["VUE_APP_API_BASE_URL"] = API_BASE_URL
     log_print(f"设置前端环境变量: VUE_APP_USE_MOCK=false, VUE_APP_API_BASE_URL={API_BASE_URL}")
     
-    # 启动前端服务
+    # 启动前端服务（端口取自 FRONTEND_BASE_URL，并行模式下每个 worker 不同）
     log_print("启动前端服务...")
     try:
-        process = subprocess.Popen(
-            ["npm", "run", "serve"],
+        # npm 会再启动 vue-cli-service 子进程，在独立的进程组中启动以便整体停止
+        process = get_supervisor(log=log_print).spawn(
+            "前端服务",
+            ["npm", "run", "serve", "--", "--port", str(frontend_port)],
+            ports=[frontend_port],
             cwd=frontend_dir,
             stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
             text=True,
-            env=env
+            env=env,
+            bufsize=1
         )
         log_print(f"前端服务进程已启动 (PID: {process.pid})")
+        # 持续读取输出，避免长时间运行（例如常驻守护进程）时管道写满导致开发服务器阻塞
+        frontend_output = get_output_collector(echo=log_print).attach(get_service_log_name("frontend"), process.stdout)
+        log_print(f"前端输出日志: {frontend_output.path}")
     except FileNotFoundError as e:
         error_msg = f"未找到 npm 命令，请确保已安装 Node.js: {e}"
         log_print(f"错误: {error_msg}", logging.ERROR)
@@ -475,6 +855,56 @@ def start_frontend():
     return process
 
 
+def start_database():
+    """启动测试数据库；并行模式下共享的 Docker Compose 已由控制进程启动，worker 只创建自己的数据库"""
+    if XDIST_WORKER:
+        log_print(f"worker {XDIST_WORKER}: 创建独立数据库 {TEST_DB_NAME}...")
+        create_worker_database()
+    else:
+        start_docker_compose()
+        wait_for_database()
+    log_print("✓ 测试数据库已就绪")
+
+
+def stop_services(*processes):
+    """并行停止多个服务的整个进程树并等待端口释放（未由测试环境启动的为 None，会被忽略）"""
+    log_print("\n停止测试环境启动的服务...")
+    get_supervisor(log=log_print).stop(processes)
+
+
+def get_environment_config():
+    """决定测试环境能否被复用的配置（常驻守护进程与当前 pytest 的配置一致时才复用）"""
+    return {
+        "db": f"{TEST_DB_HOST}:{TEST_DB_PORT}/{TEST_DB_NAME}",
+        "db_reset_strategy": DB_RESET_STRATEGY,
+        "api_base_url": API_BASE_URL,
+        "frontend_base_url": FRONTEND_BASE_URL,
+        "backend_dir": BACKEND_DIR,
+        "frontend_dir": FRONTEND_DIR,
+        "frontend_serve_mode": FRONTEND_SERVE_MODE,
+    }
+
+
+def get_startup_steps():
+    """测试环境的启动步骤及依赖关系
+
+    - 数据库、后端编译、前端三者互不依赖，同时开始
+    - 后端运行需要数据库（启动时会执行 EnsureCreated）和编译结果
+    """
+    build = {}
+    
+    def build_backend():
+        build["launch"] = build_backend_api()
+        return build["launch"]
+    
+    return [
+        StartupStep("database", start_database),
+        StartupStep("backend_build", build_backend),
+        StartupStep("backend", lambda: start_backend_api(build["launch"]), depends_on=("database", "backend_build")),
+        StartupStep("frontend", start_frontend),
+    ]
+
+
 @pytest.fixture(scope="session", autouse=True)
 def test_environment():
     """测试环境启动和关闭（会话级别）- 自动运行以确保后端和前端服务启动"""
@@ -482,21 +912,25 @@ def test_environment():
     log_print("=== 启动测试环境 ===")
     log_print("="*60)
     
-    # 启动 Docker Compose（数据库）
-    log_print("\n[1/3] 启动测试数据库...")
-    start_docker_compose()
-    wait_for_database()
-    log_print("✓ 测试数据库已就绪\n")
-    
-    # 启动后端 API
-    log_print("[2/3] 启动后端 API 服务...")
-    api_process = start_backend_api()
-    log_print("✓ 后端 API 服务已就绪\n")
+    if ENV_DAEMON and not XDIST_WORKER:
+        # 环境由常驻守护进程持有：健康时直接复用，否则由守护进程启动，测试结束后保持运行
+        # 守护进程使用 Unix 套接字，只在这里导入，Windows 上不设置 ENV_DAEMON 时不受影响
+        import env_daemon
+        status = env_daemon.ensure_environment(get_environment_config(), log=log_print)
+        log_print(f"=== 使用常驻测试环境 (守护进程 PID: {status['pid']})，开始执行测试 ===")
+        yield
+        log_print("\n=== 常驻测试环境保持运行，停止命令: python env_daemon.py stop ===")
+        return
     
-    # 启动前端
-    log_print("[3/3] 启动前端服务...")
-    frontend_process = start_frontend()
-    log_print("✓ 前端服务已就绪\n")
+    # 按依赖关系并发启动数据库、后端和前端
+    try:
+        services = run_startup_graph(get_startup_steps(), log=log_print)
+    except StartupError as e:
+        log_print(str(e), logging.ERROR)
+        stop_services(e.results.get("frontend"), e.results.get("backend"))
+        raise
+    api_process = services["backend"]
+    frontend_process = services["frontend"]
     
     log_print("="*60)
     log_print("=== 测试环境启动完成，开始执行测试 ===")
@@ -508,31 +942,7 @@ def test_environment():
     log_print("=== 关闭测试环境 ===")
     log_print("="*60)
     
-    # 停止前端
-    if frontend_process:
-        log_print("\n停止前端服务...")
-        frontend_process.terminate()
-        try:
-            frontend_process.wait(timeout=10)
-            log_print("✓ 前端服务已停止")
-        except subprocess.TimeoutExpired:
-            frontend_process.kill()
-            log_print("⚠ 前端服务强制终止")
-    else:
-        log_print("\n前端服务未由测试环境启动，跳过停止")
-    
-    # 停止后端 API
-    if api_process:
-        log_print("\n停止后端 API 服务...")
-        api_process.terminate()
-        try:
-            api_process.wait(timeout=10)
-            log_print("✓ 后端 API 服务已停止")
-        except subprocess.TimeoutExpired:
-            api_process.kill()
-            log_print("⚠ 后端 API 服务强制终止")
-    else:
-        log_print("\n后端 API 服务未由测试环境启动，跳过停止")
+    stop_services(frontend_process, api_process)
     
     log_print("\n" + "="*60)
     log_print("=== 测试环境已关闭 ===")
@@ -542,6 +952,14 @@ def test_environment():
     # stop_docker_compose()
 
 
+@pytest.fixture(scope="session")
+def db_pool():
+    """测试数据库连接池（会话级别），供步骤定义和辅助函数复用连接"""
+    pool = get_db_pool()
+    yield pool
+    close_db_pool()
+
+
 @pytest.fixture(scope="function")
 def reset_db(test_environment):
     """每个测试前重置数据库（函数级别）"""
@@ -550,52 +968,121 @@ def reset_db(test_environment):
     # 测试后可以选择清理或保留数据
 
 
-@pytest.fixture(scope="function")
-def driver():
-    """提供 Selenium WebDriver 实例"""
-    chrome_options = Options()
-    
-    # 可选：无头模式（在 CI 环境中使用）
-    if os.getenv("HEADLESS", "false").lower() == "true":
-        chrome_options.add_argument("--headless")
+def create_driver(profile="default"):
+    """按浏览器配置档启动一个新的 Chrome 浏览器"""
+    chrome_options = build_chrome_options(profile)
     
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--window-size=1920,1080")
-    
-    # 使用 webdriver-manager 自动管理 ChromeDriver
-    service = Service(ChromeDriverManager().install())
-    driver = webdriver.Chrome(service=service, options=chrome_options)
+    # 离线解析 ChromeDriver（固定路径 / 缓存目录 / PATH），结果在整个会话中复用
+    service = Service(resolve_chromedriver(log=log_print))
+    return webdriver.Chrome(service=service, options=chrome_options)
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_makereport(item, call):
+    """把各阶段的测试结果记录到 item 上（rep_setup / rep_call），供 fixture 在清理时判断场景是否失败；
+
+    失败时把各服务最近的输出附加到报告中
+    """
+    outcome = yield
+    report = outcome.get_result()
+    setattr(item, f"rep_{report.when}", report)
+    if report.failed:
+        for title, content in format_service_tails(PROCESS_OUTPUT_FAILURE_LINES):
+            report.sections.append((title, content))
+
+
+@pytest.fixture(scope="session")
+def browser_pool(pytestconfig):
+    """浏览器会话池（会话级别），场景之间复用已启动的浏览器"""
+    profile = get_browser_profile(pytestconfig)
+    log_print(f"浏览器配置档: {profile}")
+    pool = BrowserPool(
+        lambda: create_driver(profile),
+        origins=[FRONTEND_BASE_URL],
+        max_uses=BROWSER_POOL_MAX_USES,
+        log=log_print
+    )
+    yield pool
+    pool.close()
+
+
+@pytest.fixture(scope="function")
+def driver(request, browser_pool):
+    """提供 Selenium WebDriver 实例（从会话池借出，场景结束后重置归还；场景失败时关闭该浏览器）"""
+    session = browser_pool.acquire()
     
-    yield driver
+    yield session.driver
     
-    # 清理
-    driver.quit()
+    reports = (getattr(request.node, "rep_setup", None), getattr(request.node, "rep_call", None))
+    failed = any(report is not None and report.failed for report in reports)
+    browser_pool.release(session, failed=failed)
+
+
+@pytest.fixture(scope="session")
+def api_session():
+    """会话级 API 客户端：复用 keep-alive 连接，结束时输出请求耗时汇总"""
+    client = APIClient(API_BASE_URL)
+    yield client
+    client.print_latency_summary(log=log_print)
+    client.close()
 
 
 @pytest.fixture(scope="function")
-def api_client():
-    """提供 API 客户端（用于准备测试数据）"""
-    class APIClient:
-        def __init__(self, base_url):
-            self.base_url = base_url
-            self.session = requests.Session()
-            self.token = None
-        
-        def set_token(self, token):
-            self.token = token
-            self.session.headers.update({
-                "Authorization": f"Bearer {token}"
-            })
-        
-        def post(self, endpoint, json=None, **kwargs):
-            url = f"{self.base_url}{endpoint}"
-            return self.session.post(url, json=json, **kwargs)
+def api_client(api_session):
+    """提供 API 客户端（共享会话级连接池；测试结束后清除 token 和测试中设置的请求头）"""
+    yield api_session
+    api_session.reset()
+
+
+@pytest.fixture(scope="session")
+def auth_cache():
+    """通过 API 登录得到的认证信息缓存（会话级别）：{(用户名, 密码): {"token": ..., "user": {...}}}"""
+    return {}
+
+
+def inject_auth_state(driver, auth):
+    """把 token/user 写入前端站点的 localStorage（与登录成功后前端写入的键相同）
+
+    localStorage 按站点隔离，需要先打开前端站点下的任意页面；这里打开一个不存在的静态资源，
+    不加载整个应用。
+    """
+    driver.get(f"{FRONTEND_BASE_URL}/favicon.ico")
+    driver.execute_script(
+        "localStorage.setItem('token', arguments[0]); localStorage.setItem('user', arguments[1]);",
+        auth["token"],
+        json.dumps(auth["user"])
+    )
+
+
+@pytest.fixture(scope="function")
+def login_via_api(driver, api_client, db_pool, auth_cache):
+    """通过 API 登录并把认证状态注入浏览器，代替在登录表单中输入和点击
+
+    每个用户的 token 在会话内缓存；数据库重置后用户 Id 可能变化，因此复用前会核对用户 Id，
+    不一致时重新登录。返回 login(username, password, path="/projects")。
+    """
+    def login(username, password, path="/projects"):
+        with db_pool.connection() as conn, conn.cursor() as cursor:
+            cursor.execute('SELECT "Id" FROM "Users" WHERE "Username" = %s', (username,))
+            row = cursor.fetchone()
+        auth = auth_cache.get((username, password))
+        if auth is None or row is None or auth["user"]["id"] != row[0]:
+            response = api_client.post("/api/auth/login", json={"username": username, "password": password})
+            assert response.status_code == 200, \
+                f"通过 API 登录失败: {response.status_code} {response.text}"
+            data = response.json()
+            auth = {"token": data["token"], "user": {"id": data["userId"], "username": data["username"]}}
+            auth_cache[(username, password)] = auth
         
-        def get(self, endpoint, **kwargs):
-            url = f"{self.base_url}{endpoint}"
-            return self.session.get(url, **kwargs)
+        inject_auth_state(driver, auth)
+        if path is not None:
+            driver.get(f"{FRONTEND_BASE_URL}{path}")
+        return auth
     
-    return APIClient(API_BASE_URL)
+    return login
+
 
+@given(parsers.parse('我已通过 API 以用户 "{username}" 和密码 "{password}" 登录'))
+def logged_in_via_api(login_via_api, username, password):
+    """通过 API 登录并直接进入项目列表页面（其他功能的场景可以用它代替登录表单）"""
+    login_via_api(username, password)
@@ -0,0 +1,302 @@
+"""
+Docker 访问
+- get_docker_compose_cmd()：检测 Docker Compose 命令（docker-compose / docker compose），每个进程只检测一次，
+  也可以通过 DOCKER_COMPOSE_CMD 直接指定，跳过检测
+- DOCKER_ENGINE=api 时不再启动 docker / docker compose CLI 进程，而是通过本机 Docker socket
+  直接调用 Docker Engine API 创建、启动、检查和删除测试数据库容器（一个保持连接的 HTTP 连接）
+- DOCKER_ENGINE=cli（默认）保持原来的 docker compose / docker inspect 行为
+两种方式都以 ContainerHealth 返回结构化的容器状态（运行状态、健康检查状态、连续失败次数、最后一次检查输出）。
+
+API 方式创建的容器按 postgres_test_spec() 配置，与 docker-compose.test.yml 中的 postgres-test 服务一致
+（镜像、环境变量、启动参数、端口映射、tmpfs、健康检查），修改其中之一时需要同步另一个。
+仅支持 Unix socket（Linux / macOS）。
+"""
+import http.client
+import json
+import os
+import platform
+import shlex
+import socket
+import subprocess
+import threading
+from collections import namedtuple
+from urllib.parse import quote, urlencode
+
+DOCKER_ENGINE = os.getenv("DOCKER_ENGINE", "cli")
+DOCKER_COMPOSE_CMD = os.getenv("DOCKER_COMPOSE_CMD", "")
+DOCKER_SOCKET = os.getenv("DOCKER_HOST", "unix:///var/run/docker.sock")
+DOCKER_API_TIMEOUT = float(os.getenv("DOCKER_API_TIMEOUT", "30"))
+
+POSTGRES_TEST_IMAGE = "postgres:16-alpine"
+NANOSECONDS = 1_000_000_000
+
+
+class DockerAPIError(RuntimeError):
+    """Docker Engine API 返回错误状态码"""
+
+    def __init__(self, status, message):
+        super().__init__(f"Docker API 错误 {status}: {message}")
+        self.status = status
+
+
+# 访问 Docker Engine API 可能出现的异常（socket 不存在、无权限、连接中断、错误状态码）
+DOCKER_API_ERRORS = (OSError, DockerAPIError, http.client.HTTPException)
+
+
+class ContainerHealth(namedtuple("ContainerHealth", ["state", "health", "failing_streak", "last_output", "exit_code"])):
+    """容器状态：state 为 running / exited 等，health 为 healthy / unhealthy / starting（未配置健康检查时为 None）"""
+
+    @classmethod
+    def from_state(cls, state):
+        """由 docker inspect 的 State 字段构造"""
+        health = state.get("Health") or {}
+        log = health.get("Log") or []
+        return cls(
+            state=state.get("Status"),
+            health=health.get("Status"),
+            failing_streak=health.get("FailingStreak", 0),
+            last_output=log[-1].get("Output", "").strip() if log else "",
+            exit_code=state.get("ExitCode"),
+        )
+
+    @property
+    def status(self):
+        """运行中且有健康检查时返回健康状态，否则返回运行状态"""
+        if self.state == "running" and self.health:
+            return self.health
+        return self.state
+
+    def describe(self):
+        if self.state != "running":
+            return f"{self.state}（退出码 {self.exit_code}）"
+        if self.health == "unhealthy":
+            return f"unhealthy（健康检查连续失败 {self.failing_streak} 次，最后输出: {self.last_output or '无'}）"
+        return self.status
+
+
+# Docker Compose 命令检测结果（每个进程只检测一次）
+_compose_cmd = None
+_compose_cmd_lock = threading.Lock()
+
+
+def _command_available(command):
+    try:
+        subprocess.run(command, check=True, capture_output=True, text=True)
+        return True
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return False
+
+
+def _detect_docker_compose_cmd():
+    if platform.system() == "Darwin":  # macOS
+        # macOS: 使用 docker compose (V2, 无连字符)
+        if _command_available(["docker", "compose", "version"]):
+            return ["docker", "compose"]
+        raise RuntimeError("未找到 docker compose 命令（macOS 需要 Docker Desktop）")
+    # Linux/Windows: 优先使用 docker-compose (V1, 有连字符)，不存在时尝试 docker compose (V2)
+    if _command_available(["docker-compose", "--version"]):
+        return ["docker-compose"]
+    if _command_available(["docker", "compose", "version"]):
+        return ["docker", "compose"]
+    raise RuntimeError("未找到 docker-compose 或 docker compose 命令")
+
+
+def get_docker_compose_cmd():
+    """返回 Docker Compose 命令（列表副本），首次调用时检测，检测失败时下次调用会重新检测"""
+    global _compose_cmd
+    with _compose_cmd_lock:
+        if _compose_cmd is None:
+            _compose_cmd = DOCKER_COMPOSE_CMD.split() if DOCKER_COMPOSE_CMD else _detect_docker_compose_cmd()
+        return list(_compose_cmd)
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """通过 Unix socket 连接 Docker 守护进程的 HTTP 连接"""
+
+    def __init__(self, socket_path, timeout=DOCKER_API_TIMEOUT):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        self.sock = sock
+
+
+class DockerEngineClient:
+    """Docker Engine API 的最小客户端：只包含测试数据库容器需要的操作"""
+
+    def __init__(self, socket_path=DOCKER_SOCKET, timeout=DOCKER_API_TIMEOUT):
+        if socket_path.startswith("unix://"):
+            socket_path = socket_path[len("unix://"):]
+        elif "://" in socket_path:
+            raise RuntimeError(f"DOCKER_ENGINE=api 只支持 Unix socket，当前 DOCKER_HOST: {socket_path}")
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._connection = None
+        self._lock = threading.Lock()
+
+    def _request(self, method, path, body=None, query=None):
+        """发送请求，返回 (状态码, 响应体)；连接断开时重连一次"""
+        if query:
+            path = f"{path}?{urlencode(query)}"
+        payload = json.dumps(body).encode() if body is not None else None
+        headers = {"Content-Type": "application/json"} if payload is not None else {}
+        with self._lock:
+            for attempt in range(2):
+                if self._connection is None:
+                    self._connection = UnixHTTPConnection(self.socket_path, self.timeout)
+                try:
+                    self._connection.request(method, path, body=payload, headers=headers)
+                    response = self._connection.getresponse()
+                    return response.status, response.read()
+                except (http.client.HTTPException, ConnectionError):
+                    # 守护进程关闭了保持的连接：重新建立连接后重试
+                    self._connection.close()
+                    self._connection = None
+                    if attempt == 1:
+                        raise
+
+    def _call(self, method, path, body=None, query=None, allowed=()):
+        """发送请求并解析 JSON 响应；状态码不是 2xx 且不在 allowed 中时抛出 DockerAPIError"""
+        status, data = self._request(method, path, body, query)
+        if status >= 400 and status not in allowed:
+            try:
+                message = json.loads(data).get("message", "")
+            except ValueError:
+                message = data.decode("utf-8", errors="replace")
+            raise DockerAPIError(status, message)
+        if not data or not data.lstrip().startswith((b"{", b"[")):
+            return status, None
+        return status, json.loads(data)
+
+    def inspect(self, name):
+        """容器详情，容器不存在时返回 None"""
+        status, data = self._call("GET", f"/containers/{quote(name)}/json", allowed=(404,))
+        return None if status == 404 else data
+
+    def health(self, name):
+        """容器状态（ContainerHealth），容器不存在时返回 None"""
+        data = self.inspect(name)
+        return ContainerHealth.from_state(data["State"]) if data else None
+
+    def published_port(self, name, container_port):
+        """容器端口映射到宿主机的端口，容器不存在或未映射时返回 None"""
+        data = self.inspect(name)
+        if not data or data["State"].get("Status") != "running":
+            return None
+        bindings = (data["NetworkSettings"].get("Ports") or {}).get(f"{container_port}/tcp") or []
+        return int(bindings[0]["HostPort"]) if bindings else None
+
+    def pull(self, image):
+        """拉取镜像（响应是逐行输出的进度，读取到结束为止）"""
+        repository, _, tag = image.partition(":")
+        _, data = self._request("POST", "/images/create", query={"fromImage": repository, "tag": tag or "latest"})
+        for line in data.splitlines():
+            if line.strip() and "error" in json.loads(line):
+                raise DockerAPIError(500, json.loads(line)["error"])
+
+    def create(self, name, spec):
+        """创建容器，本地没有镜像时先拉取"""
+        status, data = self._call("POST", "/containers/create", body=spec, query={"name": name}, allowed=(404,))
+        if status == 404:
+            # 404 也可能是网络不存在，只有镜像缺失时才拉取
+            if "image" not in (data or {}).get("message", "").lower():
+                raise DockerAPIError(status, (data or {}).get("message", ""))
+            self.pull(spec["Image"])
+            self._call("POST", "/containers/create", body=spec, query={"name": name})
+
+    def start(self, name):
+        # 304 表示容器已在运行
+        self._call("POST", f"/containers/{quote(name)}/start", allowed=(304,))
+
+    def remove(self, name):
+        """强制删除容器及其匿名卷，容器不存在时忽略"""
+        self._call("DELETE", f"/containers/{quote(name)}", query={"force": "true", "v": "true"}, allowed=(404,))
+
+    def ensure_running(self, name, spec):
+        """容器不存在时创建，未运行时启动；启动命令与 spec 不同时（例如数据库配置档变化）重新创建
+
+        返回操作前的状态（"created" 表示新建，"recreated" 表示重新创建）
+        """
+        data = self.inspect(name)
+        if data is not None and "Cmd" in spec and data["Config"].get("Cmd") != spec["Cmd"]:
+            self.remove(name)
+            self.create(name, spec)
+            self.start(name)
+            return "recreated"
+        if data is None:
+            self.create(name, spec)
+            self.start(name)
+            return "created"
+        if data["State"].get("Status") != "running":
+            self.start(name)
+        return data["State"].get("Status")
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+def postgres_test_spec(published_port, networks=(), server_args=""):
+    """测试数据库容器配置，与 docker-compose.test.yml 的 postgres-test 服务一致
+
+    server_args 为 postgres 启动参数（见 db_profiles.py）
+    """
+    spec = {
+        "Image": POSTGRES_TEST_IMAGE,
+        "Cmd": ["postgres", *shlex.split(server_args)],
+        "Env": ["POSTGRES_DB=todoapp_test", "POSTGRES_USER=postgres", "POSTGRES_PASSWORD=postgres"],
+        "ExposedPorts": {"5432/tcp": {}},
+        "Healthcheck": {
+            "Test": ["CMD-SHELL", "pg_isready -U postgres"],
+            "Interval": 5 * NANOSECONDS,
+            "Timeout": 3 * NANOSECONDS,
+            "Retries": 10,
+        },
+        "HostConfig": {
+            "PortBindings": {"5432/tcp": [{"HostPort": str(published_port)}]},
+            # 使用 tmpfs（内存文件系统），删除容器后数据即被清理
+            "Tmpfs": {"/var/lib/postgresql/data": ""},
+        },
+    }
+    if networks:
+        spec["HostConfig"]["NetworkMode"] = networks[0]
+        spec["NetworkingConfig"] = {"EndpointsConfig": {networks[0]: {}}}
+    return spec
+
+
+# 当前进程的 Docker Engine API 客户端（首次使用时创建）
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_docker_engine():
+    """获取当前进程的 Docker Engine API 客户端，不存在时创建"""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = DockerEngineClient()
+        return _engine
+
+
+def get_container_health(container_name):
+    """读取容器状态（ContainerHealth）；容器不存在或无法访问 Docker 时返回 None"""
+    if DOCKER_ENGINE == "api":
+        try:
+            return get_docker_engine().health(container_name)
+        except DOCKER_API_ERRORS:
+            return None
+    try:
+        result = subprocess.run(
+            ["docker", "inspect", "--format", "{{json .State}}", container_name],
+            check=True,
+            capture_output=True,
+            text=True
+        )
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return None
+    return ContainerHealth.from_state(json.loads(result.stdout))
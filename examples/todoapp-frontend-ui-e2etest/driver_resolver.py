@@ -0,0 +1,110 @@
+"""
+ChromeDriver 离线解析
+按顺序查找：固定路径（CHROMEDRIVER_PATH）-> 预置缓存目录（CHROMEDRIVER_CACHE_DIR）-> PATH，
+只有显式设置 CHROMEDRIVER_ALLOW_DOWNLOAD=true 时才通过 webdriver-manager 联网下载；
+解析结果在进程内缓存，整个测试会话只解析一次
+"""
+import os
+import re
+import shutil
+import subprocess
+import sys
+import threading
+
+CHROMEDRIVER_PATH = os.getenv("CHROMEDRIVER_PATH")
+# 预置的驱动缓存目录，多个目录用 os.pathsep 分隔；默认与 webdriver-manager 的缓存目录相同
+CHROMEDRIVER_CACHE_DIR = os.getenv("CHROMEDRIVER_CACHE_DIR", os.path.join("~", ".wdm"))
+CHROMEDRIVER_ALLOW_DOWNLOAD = os.getenv("CHROMEDRIVER_ALLOW_DOWNLOAD", "false").lower() == "true"
+
+DRIVER_NAME = "chromedriver.exe" if sys.platform == "win32" else "chromedriver"
+CHROME_BINARIES = ("google-chrome", "google-chrome-stable", "chromium", "chromium-browser")
+
+_resolved_path = None
+_resolve_lock = threading.Lock()
+
+
+def get_chrome_major_version():
+    """读取本机 Chrome 的主版本号，无法获取时返回 None"""
+    for binary in CHROME_BINARIES:
+        if not shutil.which(binary):
+            continue
+        try:
+            output = subprocess.run([binary, "--version"], capture_output=True, text=True, timeout=10).stdout
+        except (OSError, subprocess.TimeoutExpired):
+            continue
+        match = re.search(r"(\d+)\.\d+", output)
+        if match:
+            return int(match.group(1))
+    return None
+
+
+def _is_executable(path):
+    return os.path.isfile(path) and os.access(path, os.X_OK)
+
+
+def _driver_major_version(path):
+    """从缓存路径中解析驱动版本（例如 .../chromedriver/linux64/120.0.6099.109/...）"""
+    for part in reversed(path.split(os.sep)):
+        match = re.match(r"^(\d+)\.\d+\.\d+", part)
+        if match:
+            return int(match.group(1))
+    return None
+
+
+def find_cached_driver(cache_dirs, chrome_major=None):
+    """在缓存目录中查找驱动：优先与 Chrome 主版本一致的，其次最新的"""
+    candidates = []
+    for cache_dir in cache_dirs:
+        for root, _, files in os.walk(os.path.expanduser(cache_dir)):
+            if DRIVER_NAME in files and _is_executable(os.path.join(root, DRIVER_NAME)):
+                candidates.append(os.path.join(root, DRIVER_NAME))
+    if not candidates:
+        return None
+    if chrome_major is not None:
+        matching = [path for path in candidates if _driver_major_version(path) == chrome_major]
+        if matching:
+            candidates = matching
+    return max(candidates, key=os.path.getmtime)
+
+
+def resolve_chromedriver(log=print):
+    """返回 ChromeDriver 可执行文件路径（进程内只解析一次），找不到且不允许下载时抛出 RuntimeError"""
+    global _resolved_path
+    with _resolve_lock:
+        if _resolved_path is None:
+            _resolved_path = _resolve(log)
+        return _resolved_path
+
+
+def _resolve(log):
+    if CHROMEDRIVER_PATH:
+        path = os.path.expanduser(CHROMEDRIVER_PATH)
+        if not _is_executable(path):
+            raise RuntimeError(f"CHROMEDRIVER_PATH 指定的 ChromeDriver 不存在或不可执行: {path}")
+        log(f"[ChromeDriver] 使用固定路径: {path}")
+        return path
+
+    chrome_major = get_chrome_major_version()
+    path = find_cached_driver(CHROMEDRIVER_CACHE_DIR.split(os.pathsep), chrome_major)
+    if path:
+        driver_major = _driver_major_version(path)
+        if chrome_major is not None and driver_major is not None and driver_major != chrome_major:
+            log(f"[ChromeDriver] 警告: 缓存中没有与 Chrome {chrome_major} 匹配的驱动，使用 {path}")
+        log(f"[ChromeDriver] 使用缓存: {path}")
+        return path
+
+    path = shutil.which(DRIVER_NAME)
+    if path:
+        log(f"[ChromeDriver] 使用 PATH 中的驱动: {path}")
+        return path
+
+    if not CHROMEDRIVER_ALLOW_DOWNLOAD:
+        raise RuntimeError(
+            f"未找到 ChromeDriver（CHROMEDRIVER_PATH 未设置，缓存目录 {CHROMEDRIVER_CACHE_DIR} 和 PATH 中都没有）。"
+            "请设置 CHROMEDRIVER_PATH、把驱动放入缓存目录，或在可以联网的环境中设置 CHROMEDRIVER_ALLOW_DOWNLOAD=true 下载一次"
+        )
+    from webdriver_manager.chrome import ChromeDriverManager
+    log("[ChromeDriver] 本地未找到，通过 webdriver-manager 下载...")
+    path = ChromeDriverManager().install()
+    log(f"[ChromeDriver] 已下载: {path}")
+    return path
@@ -0,0 +1,300 @@
+"""
+常驻测试环境守护进程
+在多次 pytest 运行之间保持数据库、后端和前端运行：test_environment 通过本地控制套接字查询守护进程，
+环境健康时直接复用，否则由守护进程启动，重复运行测试时省去 30~60 秒的预热时间。
+
+用法：
+    python env_daemon.py start     # 后台启动守护进程并等待环境就绪（已在运行且健康时直接返回）
+    python env_daemon.py status    # 查看环境状态
+    python env_daemon.py stop      # 停止守护进程及其启动的服务
+    python env_daemon.py serve     # 前台运行守护进程（start 内部使用）
+
+控制通道是 Unix 套接字，仅支持 Linux / macOS；conftest 只在 ENV_DAEMON=true 时导入本模块。
+"""
+import json
+import os
+import signal
+import socket
+import socketserver
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from readiness import wait_until
+
+if not hasattr(socket, "AF_UNIX"):
+    raise ImportError("常驻测试环境守护进程使用 Unix 套接字，当前平台不支持，请不要设置 ENV_DAEMON=true")
+
+SUITE_DIR = os.path.dirname(os.path.abspath(__file__))
+ENV_DAEMON_SOCKET = os.getenv("ENV_DAEMON_SOCKET", "")
+ENV_DAEMON_LOG = os.path.abspath(os.getenv(
+    "ENV_DAEMON_LOG",
+    os.path.join(SUITE_DIR, "test-results", "env-daemon.log")
+))
+# 守护进程冷启动（数据库 + 后端编译 + 前端编译）的最长等待时间
+ENV_DAEMON_STARTUP_TIMEOUT = int(os.getenv("ENV_DAEMON_STARTUP_TIMEOUT", "300"))
+
+# 服务地址相关的环境变量：启动守护进程时只传递用户显式配置的值。
+# python env_daemon.py start 在导入 conftest 之前记录；pytest 进程中本模块在 conftest 之后导入，
+# 但 ENV_DAEMON=true 时 conftest 只会写回固定端口，与守护进程自己计算的结果相同
+ADDRESS_ENV_VARS = ("TEST_DB_PORT", "TEST_DB_PUBLISHED_PORT", "API_BASE_URL", "FRONTEND_BASE_URL")
+EXPLICIT_ADDRESSES = {name: os.environ[name] for name in ADDRESS_ENV_VARS if name in os.environ}
+
+
+def get_daemon_socket():
+    """守护进程控制套接字路径：ENV_DAEMON_SOCKET 优先，默认按用户区分"""
+    return ENV_DAEMON_SOCKET or os.path.join(tempfile.gettempdir(), f"todoapp-ui-e2etest-{os.getuid()}.sock")
+
+
+def send_command(command, timeout=5.0):
+    """向守护进程发送一条命令并返回响应（dict）；守护进程未运行时返回 None"""
+    socket_path = get_daemon_socket()
+    if not os.path.exists(socket_path):
+        return None
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(socket_path)
+            sock.sendall(json.dumps({"command": command}).encode("utf-8") + b"\n")
+            with sock.makefile("r", encoding="utf-8") as reader:
+                line = reader.readline()
+    except OSError:
+        return None
+    return json.loads(line) if line else None
+
+
+class Environment:
+    """守护进程持有的测试环境：启动步骤与 conftest 相同，服务进程的生命周期跟随守护进程"""
+
+    def __init__(self, env):
+        self.env = env
+        self.services = {}
+        self.state = "starting"
+        self.error = None
+        self.started_at = None
+        self.lock = threading.Lock()
+        self.start_thread = None
+
+    def start(self):
+        self.start_thread = threading.Thread(target=self._start, name="env-start", daemon=True)
+        self.start_thread.start()
+
+    def _start(self):
+        start = time.monotonic()
+        try:
+            services = self.env.run_startup_graph(self.env.get_startup_steps(), log=self.env.log_print)
+        except self.env.StartupError as e:
+            with self.lock:
+                self.services = e.results
+                self.state = "failed"
+                self.error = str(e)
+            return
+        with self.lock:
+            self.services = services
+            self.state = "running"
+            self.started_at = time.time()
+        self.env.log_print(f"常驻测试环境已就绪（{time.monotonic() - start:.1f} 秒）")
+
+    def check_health(self):
+        """逐项检查数据库、后端、前端以及守护进程启动的服务进程是否存活"""
+        checks = {}
+        try:
+            conn = self.env.get_db_connection()
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+            finally:
+                conn.close()
+            checks["database"] = True
+        except Exception:
+            checks["database"] = False
+        for name, probe in (("backend", self.env.is_api_ready), ("frontend", self.env.is_frontend_ready)):
+            try:
+                checks[name] = bool(probe())
+            except Exception:
+                checks[name] = False
+            process = self.services.get(name)
+            if process is not None and process.poll() is not None:
+                checks[name] = False
+        return checks
+
+    def status(self):
+        with self.lock:
+            state, error, started_at = self.state, self.error, self.started_at
+        checks = self.check_health() if state == "running" else {}
+        return {
+            "pid": os.getpid(),
+            "state": state,
+            "error": error,
+            "healthy": state == "running" and all(checks.values()),
+            "checks": checks,
+            "started_at": started_at,
+            "config": self.env.get_environment_config(),
+        }
+
+    def stop(self):
+        # 启动过程中收到 stop 时等待启动结束，避免留下无人管理的服务进程
+        if self.start_thread is not None:
+            self.start_thread.join(timeout=ENV_DAEMON_STARTUP_TIMEOUT)
+        with self.lock:
+            services, self.services = self.services, {}
+            self.state = "stopped"
+        self.env.stop_services(services.get("frontend"), services.get("backend"))
+
+
+class ControlServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path, environment):
+        super().__init__(path, ControlHandler)
+        self.environment = environment
+
+    def shutdown_async(self):
+        # shutdown() 会等待 serve_forever 退出，不能在处理请求的线程中直接调用
+        threading.Thread(target=self.shutdown, daemon=True).start()
+
+
+class ControlHandler(socketserver.StreamRequestHandler):
+    """控制协议：每个连接一行 JSON 请求 {"command": ...}，返回一行 JSON 响应"""
+
+    def handle(self):
+        try:
+            command = json.loads(self.rfile.readline()).get("command")
+        except ValueError:
+            command = None
+        if command == "status":
+            response = self.server.environment.status()
+        elif command == "stop":
+            response = {"pid": os.getpid(), "state": "stopping"}
+            self.server.shutdown_async()
+        else:
+            response = {"error": f"未知命令: {command}"}
+        self.wfile.write(json.dumps(response, ensure_ascii=False).encode("utf-8") + b"\n")
+
+
+def serve():
+    """前台运行守护进程：先开始监听控制套接字，再在后台启动环境，启动期间可以查询状态"""
+    socket_path = get_daemon_socket()
+    if send_command("status") is not None:
+        print(f"守护进程已在运行: {socket_path}")
+        return 1
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)  # 上次异常退出遗留的套接字文件
+
+    # 必须在导入 conftest 之前设置：守护进程模式下使用固定端口，与之后 ENV_DAEMON=true 的 pytest 配置一致
+    os.environ["ENV_DAEMON"] = "true"
+    import conftest as env
+    environment = Environment(env)
+    server = ControlServer(socket_path, environment)
+    signal.signal(signal.SIGTERM, lambda signum, frame: server.shutdown_async())
+    signal.signal(signal.SIGINT, lambda signum, frame: server.shutdown_async())
+    env.log_print(f"常驻测试环境守护进程已启动 (PID: {os.getpid()}，控制套接字: {socket_path})")
+    environment.start()
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        environment.stop()
+        # 服务全部停止后再删除套接字文件，stop_daemon 以此判断守护进程已退出
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        env.log_print("常驻测试环境守护进程已退出")
+    return 0
+
+
+def spawn_daemon():
+    """在后台启动守护进程（脱离当前会话，输出写入 ENV_DAEMON_LOG）"""
+    os.makedirs(os.path.dirname(ENV_DAEMON_LOG), exist_ok=True)
+    env = os.environ.copy()
+    env.pop("PYTEST_XDIST_WORKER", None)
+    # 守护进程与连接它的 pytest 使用相同的（固定）端口，配置才能一致：不传递当前进程分配的端口
+    env["ENV_DAEMON"] = "true"
+    for name in ADDRESS_ENV_VARS:
+        env.pop(name, None)
+    env.update(EXPLICIT_ADDRESSES)
+    with open(ENV_DAEMON_LOG, "a", encoding="utf-8") as log_file:
+        process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "serve"],
+            cwd=SUITE_DIR,
+            stdin=subprocess.DEVNULL,
+            stdout=log_file,
+            stderr=subprocess.STDOUT,
+            env=env,
+            start_new_session=True
+        )
+    return process
+
+
+def stop_daemon(timeout=30, log=print):
+    """停止守护进程并等待控制套接字关闭；守护进程未运行时返回 False"""
+    if send_command("stop") is None:
+        return False
+    log("等待常驻测试环境守护进程退出...")
+    socket_path = get_daemon_socket()
+    wait_until(lambda: not os.path.exists(socket_path), timeout, "等待守护进程退出", log=log)
+    return True
+
+
+def ensure_environment(config, timeout=ENV_DAEMON_STARTUP_TIMEOUT, log=print):
+    """连接常驻测试环境：健康且配置一致时直接复用，否则（重新）启动守护进程并等待环境就绪，返回环境状态"""
+    status = send_command("status")
+    if status is not None and status.get("config") != config:
+        log("常驻测试环境的配置与当前配置不一致，重新启动守护进程")
+        stop_daemon(log=log)
+        status = None
+    elif status is not None and status["state"] != "starting" and not status["healthy"]:
+        log(f"常驻测试环境不健康（{status.get('error') or status['checks']}），重新启动守护进程")
+        stop_daemon(log=log)
+        status = None
+
+    if status is not None and status["healthy"]:
+        log(f"复用常驻测试环境 (PID: {status['pid']})")
+        return status
+
+    if status is None:
+        process = spawn_daemon()
+        log(f"已在后台启动常驻测试环境守护进程 (PID: {process.pid})，日志: {ENV_DAEMON_LOG}")
+
+    current = {}
+
+    def probe():
+        current["status"] = send_command("status")
+        return current["status"] is not None and current["status"]["healthy"]
+
+    def check_failed():
+        status = current.get("status")
+        if status is not None and status["state"] == "failed":
+            stop_daemon(log=log)
+            raise RuntimeError(f"常驻测试环境启动失败: {status['error']}，详见 {ENV_DAEMON_LOG}")
+
+    wait_until(probe, timeout, "等待常驻测试环境就绪", abort_check=check_failed, abort_interval=0,
+               max_interval=2.0, log=log)
+    return current["status"]
+
+
+def main(argv):
+    command = argv[1] if len(argv) > 1 else "status"
+    if command == "serve":
+        return serve()
+    if command == "start":
+        # 与 serve 相同，按守护进程模式（固定端口）计算环境配置
+        os.environ["ENV_DAEMON"] = "true"
+        import conftest as env
+        ensure_environment(env.get_environment_config())
+        print("常驻测试环境已就绪，运行 pytest 时设置 ENV_DAEMON=true 即可复用")
+        return 0
+    if command == "stop":
+        if not stop_daemon():
+            print("守护进程未运行")
+        return 0
+    if command == "status":
+        status = send_command("status")
+        print(json.dumps(status, ensure_ascii=False, indent=2) if status else "守护进程未运行")
+        return 0 if status and status["healthy"] else 1
+    print(__doc__)
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
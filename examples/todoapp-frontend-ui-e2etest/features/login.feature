@@ -42,3 +42,8 @@ Feature: 用户登录
     那么 我应该看到验证错误消息 "请输入密码"
     并且 我应该仍然在登录页面
 
+  Scenario: 通过 API 登录后直接进入项目列表
+    假设 数据库中已存在用户 "testuser"，密码为 "password123"
+    并且 我已通过 API 以用户 "testuser" 和密码 "password123" 登录
+    那么 我应该被重定向到项目列表页面
+    并且 页面应该显示 "testuser" 的用户信息
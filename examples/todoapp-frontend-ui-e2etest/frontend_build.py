@@ -0,0 +1,219 @@
+"""
+前端生产构建缓存与静态文件服务
+按前端源码哈希执行一次 npm run build，之后由进程内的轻量静态服务器提供 dist/，
+代替 webpack 开发服务器（HMR），启动更快、占用内存更少，页面加载也与生产包一致。
+
+构建时 API 基础 URL 使用占位符，提供文件时再替换为实际地址，
+因此不同 API 端口（例如并行模式下的各个 worker）共用同一份构建结果。
+"""
+import hashlib
+import http.server
+import os
+import shutil
+import subprocess
+import threading
+import time
+
+FRONTEND_BUILD_CACHE = os.path.abspath(os.path.expanduser(os.getenv(
+    "FRONTEND_BUILD_CACHE", os.path.join("~", ".cache", "todoapp-e2etest", "frontend")
+)))
+# 缓存中保留的构建结果数量（按最近使用时间清理更早的）
+FRONTEND_BUILD_CACHE_KEEP = int(os.getenv("FRONTEND_BUILD_CACHE_KEEP", "3"))
+API_BASE_URL_PLACEHOLDER = "__E2E_API_BASE_URL__"
+
+# 参与哈希计算的输入：源码目录、public 目录、.env* 以及构建配置
+SOURCE_DIRS = ("src", "public")
+CONFIG_FILES = ("package.json", "package-lock.json", "vue.config.js", "babel.config.js")
+COMPLETE_MARKER = ".build-complete"
+
+
+def _lock_exclusive(lock_file):
+    """对锁文件加排他锁（文件关闭时释放）：Linux / macOS 使用 fcntl.flock，Windows 使用 msvcrt.locking"""
+    if os.name == "nt":
+        import msvcrt
+        lock_file.seek(0)
+        # LK_LOCK 重试 10 秒后仍未获得锁会抛出 OSError，继续等待
+        while True:
+            try:
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                continue
+    import fcntl
+    fcntl.flock(lock_file, fcntl.LOCK_EX)
+
+
+def compute_source_hash(frontend_dir):
+    """计算前端构建输入的哈希（相对路径 + 文件内容），输入不变时哈希不变"""
+    paths = []
+    for source_dir in SOURCE_DIRS:
+        for root, dirs, files in os.walk(os.path.join(frontend_dir, source_dir)):
+            dirs.sort()
+            paths.extend(os.path.join(root, name) for name in sorted(files))
+    for name in sorted(os.listdir(frontend_dir)):
+        if name in CONFIG_FILES or name.startswith(".env"):
+            paths.append(os.path.join(frontend_dir, name))
+
+    digest = hashlib.sha256(API_BASE_URL_PLACEHOLDER.encode("utf-8"))
+    for path in paths:
+        digest.update(os.path.relpath(path, frontend_dir).replace(os.sep, "/").encode("utf-8"))
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def _prune_cache(keep_dir, log):
+    """只保留最近使用的 FRONTEND_BUILD_CACHE_KEEP 个构建结果"""
+    entries = [
+        os.path.join(FRONTEND_BUILD_CACHE, name)
+        for name in os.listdir(FRONTEND_BUILD_CACHE)
+        if os.path.exists(os.path.join(FRONTEND_BUILD_CACHE, name, COMPLETE_MARKER))
+    ]
+    entries.sort(key=lambda path: os.path.getmtime(os.path.join(path, COMPLETE_MARKER)), reverse=True)
+    for path in entries[FRONTEND_BUILD_CACHE_KEEP:]:
+        if path != keep_dir:
+            log(f"[前端构建] 清理旧的构建结果: {path}")
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def build_frontend(frontend_dir, log=print):
+    """返回前端生产构建的输出目录；同一份源码只构建一次（多个进程同时调用时通过文件锁串行）"""
+    source_hash = compute_source_hash(frontend_dir)
+    dist_dir = os.path.join(FRONTEND_BUILD_CACHE, source_hash)
+    marker = os.path.join(dist_dir, COMPLETE_MARKER)
+    os.makedirs(FRONTEND_BUILD_CACHE, exist_ok=True)
+
+    with open(os.path.join(FRONTEND_BUILD_CACHE, f"{source_hash}.lock"), "w") as lock_file:
+        _lock_exclusive(lock_file)
+        if os.path.exists(marker):
+            os.utime(marker)
+            log(f"[前端构建] 缓存命中: 源码哈希 {source_hash}，直接使用 {dist_dir}")
+            return dist_dir
+
+        log(f"[前端构建] 缓存未命中: 源码哈希 {source_hash}，执行 npm run build...")
+        start = time.monotonic()
+        staging_dir = f"{dist_dir}.tmp-{os.getpid()}"
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        env = os.environ.copy()
+        env["VUE_APP_USE_MOCK"] = "false"
+        env["VUE_APP_API_BASE_URL"] = API_BASE_URL_PLACEHOLDER
+        try:
+            subprocess.run(
+                ["npm", "run", "build", "--", "--dest", staging_dir],
+                cwd=frontend_dir,
+                check=True,
+                capture_output=True,
+                text=True,
+                env=env
+            )
+        except subprocess.CalledProcessError as e:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            raise RuntimeError(f"npm run build 失败:\n{e.stdout}{e.stderr}") from e
+        open(os.path.join(staging_dir, COMPLETE_MARKER), "w").close()
+        shutil.rmtree(dist_dir, ignore_errors=True)
+        os.replace(staging_dir, dist_dir)
+        log(f"[前端构建] 构建完成（{time.monotonic() - start:.1f} 秒）: {dist_dir}")
+
+    _prune_cache(dist_dir, log)
+    return dist_dir
+
+
+def load_injected_files(dist_dir, api_base_url):
+    """读取包含 API 地址占位符的文件，返回 {相对路径: 替换后的内容}"""
+    placeholder = API_BASE_URL_PLACEHOLDER.encode("utf-8")
+    injected = {}
+    for root, _, files in os.walk(dist_dir):
+        for name in files:
+            if not name.endswith((".js", ".html")):
+                continue
+            path = os.path.join(root, name)
+            with open(path, "rb") as f:
+                content = f.read()
+            if placeholder in content:
+                relative_path = "/" + os.path.relpath(path, dist_dir).replace(os.sep, "/")
+                injected[relative_path] = content.replace(placeholder, api_base_url.encode("utf-8"))
+    return injected
+
+
+class StaticFrontendHandler(http.server.SimpleHTTPRequestHandler):
+    """提供 dist/ 中的文件；注入了 API 地址的文件从内存返回，找不到的路由回退到 index.html（history 模式）"""
+
+    def __init__(self, request, client_address, server):
+        super().__init__(request, client_address, server, directory=server.dist_dir)
+
+    def send_head(self):
+        path = self.path.split("?", 1)[0].split("#", 1)[0]
+        if path == "/":
+            path = "/index.html"
+        if path in self.server.injected:
+            return self._send_bytes(path, self.server.injected[path])
+        if not os.path.isfile(self.translate_path(path)):
+            if "." in os.path.basename(path):
+                self.send_error(404, "File not found")
+                return None
+            return self._send_bytes("/index.html", self.server.index_html)
+        return super().send_head()
+
+    def _send_bytes(self, path, content):
+        self.send_response(200)
+        self.send_header("Content-Type", self.guess_type(path))
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        return _BytesReader(content)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _BytesReader:
+    """SimpleHTTPRequestHandler 通过 copyfile(f, wfile) 输出 send_head 返回的文件对象"""
+
+    def __init__(self, content):
+        self.content = content
+
+    def read(self, size=-1):
+        content, self.content = self.content, b""
+        return content
+
+    def close(self):
+        pass
+
+
+class StaticFrontendServer(http.server.ThreadingHTTPServer):
+    """进程内静态服务器，提供与 subprocess.Popen 相同的 poll/terminate/wait/kill，便于统一停止服务"""
+    daemon_threads = True
+
+    def __init__(self, address, dist_dir, api_base_url):
+        self.dist_dir = dist_dir
+        self.injected = load_injected_files(dist_dir, api_base_url)
+        self.index_html = self.injected.get("/index.html")
+        if self.index_html is None:
+            with open(os.path.join(dist_dir, "index.html"), "rb") as f:
+                self.index_html = f.read()
+        super().__init__(address, StaticFrontendHandler)
+        self.pid = os.getpid()
+        self.thread = threading.Thread(target=self.serve_forever, name="static-frontend", daemon=True)
+        self.thread.start()
+
+    def poll(self):
+        return None if self.thread.is_alive() else 0
+
+    def terminate(self):
+        if self.thread.is_alive():
+            self.shutdown()
+        self.server_close()
+
+    def wait(self, timeout=None):
+        self.thread.join(timeout)
+        return self.poll()
+
+    def kill(self):
+        self.terminate()
+
+
+def serve_frontend(frontend_dir, port, api_base_url, host="127.0.0.1", log=print):
+    """构建（或复用缓存的）前端并在后台线程中提供静态文件，返回 StaticFrontendServer"""
+    dist_dir = build_frontend(frontend_dir, log=log)
+    server = StaticFrontendServer((host, port), dist_dir, api_base_url)
+    log(f"[前端构建] 静态服务器已启动: http://{host}:{port}（API: {api_base_url}）")
+    return server
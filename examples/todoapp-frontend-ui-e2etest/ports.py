@@ -0,0 +1,55 @@
+"""
+测试服务端口分配
+PORT_ALLOCATION=dynamic（默认）时，没有显式配置地址的服务在会话开始时向操作系统申请空闲的临时端口，
+同一台 Agent 上的多条流水线、多个 worker 不再争用固定端口（例如 8080 与 Jenkins master 冲突）；
+PORT_ALLOCATION=fixed 时使用原来的固定端口。显式配置的地址（环境变量）始终优先。
+"""
+import os
+import re
+import socket
+import subprocess
+from urllib.parse import urlparse
+from docker_engine import DOCKER_ENGINE, DOCKER_API_ERRORS, get_docker_engine
+
+PORT_ALLOCATION = os.getenv("PORT_ALLOCATION", "dynamic")
+
+
+def find_free_port(host="127.0.0.1"):
+    """向操作系统申请一个当前空闲的临时端口
+
+    端口在返回前已释放，理论上可能在服务监听前被其他进程占用；临时端口区间很大，实际冲突极少。
+    """
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+
+def replace_port(url, port):
+    """替换 URL 中的端口"""
+    parsed = urlparse(url)
+    return parsed._replace(netloc=f"{parsed.hostname}:{port}").geturl()
+
+
+def get_published_port(container, container_port):
+    """读取已运行容器映射到宿主机的端口（docker port，DOCKER_ENGINE=api 时直接查询 Docker API），
+    容器不存在、未运行或没有 Docker 时返回 None
+    """
+    if DOCKER_ENGINE == "api":
+        try:
+            return get_docker_engine().published_port(container, container_port)
+        except DOCKER_API_ERRORS:
+            return None
+    try:
+        result = subprocess.run(
+            ["docker", "port", container, str(container_port)],
+            capture_output=True, text=True, timeout=5
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    if result.returncode != 0:
+        return None
+    for line in result.stdout.splitlines():
+        match = re.search(r":(\d+)$", line.strip())
+        if match:
+            return int(match.group(1))
+    return None
@@ -0,0 +1,215 @@
+"""
+子进程输出统一采集
+由测试环境启动的服务（后端 dotnet、前端 npm run serve）的 stdout/stderr 全部交给一个后台线程，
+通过 selectors 非阻塞地同时读取，及时排空管道，服务不会因为管道写满而阻塞
+（Windows 的 select 不支持管道，改为每个管道一个读取线程，其余行为相同）：
+- 每行写入按服务划分的滚动日志文件（PROCESS_LOG_DIR/<服务>.log，超过大小后轮转）
+- 每个服务在内存中保留最近 PROCESS_OUTPUT_TAIL_LINES 行，测试失败时附加到报告中
+- 遇到就绪标记（例如 "Now listening on"）时设置对应的事件，唤醒就绪等待
+默认不再把每一行输出到控制台，设置 PROCESS_OUTPUT_ECHO=true 可恢复（回显同样在采集线程中进行）。
+"""
+import logging
+import os
+import selectors
+import threading
+from collections import deque
+from logging.handlers import RotatingFileHandler
+
+PROCESS_LOG_DIR = os.getenv(
+    "PROCESS_LOG_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "test-results", "service-logs")
+)
+PROCESS_LOG_MAX_BYTES = int(os.getenv("PROCESS_LOG_MAX_BYTES", str(5 * 1024 * 1024)))
+PROCESS_LOG_BACKUPS = int(os.getenv("PROCESS_LOG_BACKUPS", "3"))
+PROCESS_OUTPUT_TAIL_LINES = int(os.getenv("PROCESS_OUTPUT_TAIL_LINES", "200"))
+PROCESS_OUTPUT_ECHO = os.getenv("PROCESS_OUTPUT_ECHO", "false").lower() == "true"
+
+READ_CHUNK_SIZE = 64 * 1024
+# selectors 只能在 POSIX 上监听管道
+USE_SELECTOR = os.name != "nt"
+
+
+class ServiceOutput:
+    """单个服务的输出：滚动日志文件 + 最近 N 行的环形缓冲区 + 就绪标记"""
+
+    def __init__(self, name, log_dir=PROCESS_LOG_DIR, tail_lines=PROCESS_OUTPUT_TAIL_LINES, echo=None):
+        self.name = name
+        self.path = os.path.join(log_dir, f"{name}.log")
+        self.lines = deque(maxlen=tail_lines)
+        self.echo = echo
+        self._ready_markers = []
+        self._lock = threading.Lock()
+        os.makedirs(log_dir, exist_ok=True)
+        # 每个服务一个独立的 logger，不向上传播，避免经过 pytest 的日志捕获
+        self.logger = logging.getLogger(f"process_output.{name}.{id(self)}")
+        self.logger.propagate = False
+        self.logger.setLevel(logging.INFO)
+        self.handler = RotatingFileHandler(
+            self.path, maxBytes=PROCESS_LOG_MAX_BYTES, backupCount=PROCESS_LOG_BACKUPS, encoding="utf-8"
+        )
+        self.handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+        self.logger.addHandler(self.handler)
+
+    def add_ready_marker(self, marker, event):
+        """输出中出现 marker 时设置 event"""
+        with self._lock:
+            self._ready_markers.append((marker, event))
+
+    def feed(self, line, stream="stdout"):
+        text = line if stream == "stdout" else f"[{stream}] {line}"
+        self.logger.info(text)
+        with self._lock:
+            self.lines.append(text)
+            markers = [(marker, event) for marker, event in self._ready_markers if marker in line]
+            self._ready_markers = [item for item in self._ready_markers if item not in markers]
+        for _, event in markers:
+            event.set()
+        if self.echo is not None:
+            self.echo(f"[{self.name}] {text}")
+
+    def tail(self, count=None):
+        """返回最近 count 行（默认全部缓冲的行）"""
+        with self._lock:
+            lines = list(self.lines)
+        return lines if count is None else lines[-count:]
+
+    def close(self):
+        self.logger.removeHandler(self.handler)
+        self.handler.close()
+
+
+class OutputCollector:
+    """用一个后台线程和 selector 读取所有已登记的管道（Windows 上每个管道一个读取线程）"""
+
+    def __init__(self, log_dir=PROCESS_LOG_DIR, echo=None):
+        self.log_dir = log_dir
+        self.echo = echo
+        self.services = {}
+        self._lock = threading.Lock()
+        self._closed = False
+        self._readers = []
+        if not USE_SELECTOR:
+            return
+        self.selector = selectors.DefaultSelector()
+        # 登记新管道时通过自管道唤醒 select()
+        self._wakeup_read, self._wakeup_write = os.pipe()
+        os.set_blocking(self._wakeup_read, False)
+        self.selector.register(self._wakeup_read, selectors.EVENT_READ, None)
+        self._thread = threading.Thread(target=self._run, name="process-output", daemon=True)
+        self._thread.start()
+
+    def service(self, name):
+        """返回（必要时创建）服务的输出对象"""
+        with self._lock:
+            if name not in self.services:
+                self.services[name] = ServiceOutput(name, self.log_dir, echo=self.echo)
+            return self.services[name]
+
+    def attach(self, name, pipe, stream="stdout", ready_marker=None, ready_event=None):
+        """登记一个子进程管道（Popen 的 stdout / stderr），返回服务的输出对象"""
+        output = self.service(name)
+        if ready_marker is not None and ready_event is not None:
+            output.add_ready_marker(ready_marker, ready_event)
+        if not USE_SELECTOR:
+            reader = threading.Thread(
+                target=self._read_pipe, args=(pipe, output, stream), name=f"process-output-{name}", daemon=True
+            )
+            self._readers.append(reader)
+            reader.start()
+            return output
+        fd = pipe.fileno()
+        os.set_blocking(fd, False)
+        with self._lock:
+            self.selector.register(fd, selectors.EVENT_READ, {"pipe": pipe, "output": output, "stream": stream, "buffer": b""})
+        os.write(self._wakeup_write, b"\0")
+        return output
+
+    def tail(self, name, count=None):
+        output = self.services.get(name)
+        return output.tail(count) if output else []
+
+    def tails(self, count=None):
+        """所有服务最近的输出：{服务名: [行...]}"""
+        return {name: output.tail(count) for name, output in list(self.services.items())}
+
+    def _run(self):
+        while not self._closed:
+            for key, _ in self.selector.select():
+                if key.data is None:
+                    try:
+                        os.read(self._wakeup_read, 4096)
+                    except BlockingIOError:
+                        pass
+                    continue
+                self._read(key)
+
+    def _read(self, key):
+        data = key.data
+        try:
+            chunk = os.read(key.fd, READ_CHUNK_SIZE)
+        except BlockingIOError:
+            return
+        except OSError:
+            chunk = b""
+        if not chunk:
+            # 管道关闭（进程退出）：输出最后不完整的一行并注销
+            if data["buffer"]:
+                data["output"].feed(data["buffer"].decode("utf-8", errors="replace").rstrip(), data["stream"])
+            with self._lock:
+                self.selector.unregister(key.fd)
+            data["pipe"].close()
+            return
+        lines = (data["buffer"] + chunk).split(b"\n")
+        data["buffer"] = lines.pop()
+        for line in lines:
+            data["output"].feed(line.decode("utf-8", errors="replace").rstrip(), data["stream"])
+
+    def _read_pipe(self, pipe, output, stream):
+        """Windows：阻塞地逐行读取一个管道，直到进程退出关闭管道"""
+        reader = getattr(pipe, "buffer", pipe)  # text=True 时按字节读取，与 selector 方式的解码一致
+        try:
+            for line in iter(reader.readline, b""):
+                output.feed(line.decode("utf-8", errors="replace").rstrip(), stream)
+        except (OSError, ValueError):
+            pass  # 管道已被关闭
+        finally:
+            pipe.close()
+
+    def close(self):
+        """停止采集线程并关闭日志文件（服务进程应已停止）"""
+        self._closed = True
+        if USE_SELECTOR:
+            os.write(self._wakeup_write, b"\0")
+            self._thread.join(timeout=5)
+        for reader in self._readers:
+            reader.join(timeout=5)
+        for output in list(self.services.values()):
+            output.close()
+        if USE_SELECTOR:
+            self.selector.close()
+            os.close(self._wakeup_read)
+            os.close(self._wakeup_write)
+
+
+# 当前进程的输出采集器（首次使用时创建）
+_collector = None
+_collector_lock = threading.Lock()
+
+
+def get_output_collector(echo=None):
+    """获取当前进程的输出采集器，不存在时创建；echo 仅在 PROCESS_OUTPUT_ECHO=true 时生效"""
+    global _collector
+    with _collector_lock:
+        if _collector is None:
+            _collector = OutputCollector(echo=echo if PROCESS_OUTPUT_ECHO else None)
+        return _collector
+
+
+def format_service_tails(count):
+    """把所有服务最近 count 行输出格式化为 [(标题, 内容)]，供失败报告使用"""
+    if _collector is None:
+        return []
+    return [
+        (f"服务输出: {name}（最近 {len(lines)} 行）", "\n".join(lines))
+        for name, lines in _collector.tails(count).items() if lines
+    ]
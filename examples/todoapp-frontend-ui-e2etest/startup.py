@@ -0,0 +1,95 @@
+"""
+测试环境启动编排
+按依赖关系并发执行启动步骤：没有依赖关系的步骤同时开始，只在真正存在依赖的地方等待，
+冷启动耗时从各步骤耗时之和变为关键路径上的耗时
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class StartupStep:
+    """一个启动步骤：action() 的返回值会保存在结果中，depends_on 中的步骤全部成功后才会执行"""
+
+    def __init__(self, name, action, depends_on=()):
+        self.name = name
+        self.action = action
+        self.depends_on = tuple(depends_on)
+
+
+class StartupError(RuntimeError):
+    """启动步骤失败；results 中保存已成功步骤的返回值，供调用方清理已启动的服务"""
+
+    def __init__(self, message, results, errors):
+        super().__init__(message)
+        self.results = results
+        self.errors = errors
+
+
+def _topological_order(steps):
+    """按依赖关系排序，检查依赖是否存在以及是否有循环依赖"""
+    by_name = {step.name: step for step in steps}
+    ordered = []
+    state = {}
+
+    def visit(step, path):
+        if state.get(step.name) == "done":
+            return
+        if state.get(step.name) == "visiting":
+            raise ValueError(f"启动步骤存在循环依赖: {' -> '.join(path + [step.name])}")
+        state[step.name] = "visiting"
+        for dependency in step.depends_on:
+            if dependency not in by_name:
+                raise ValueError(f"启动步骤 {step.name} 依赖的步骤不存在: {dependency}")
+            visit(by_name[dependency], path + [step.name])
+        state[step.name] = "done"
+        ordered.append(step)
+
+    for step in steps:
+        visit(step, [])
+    return ordered
+
+
+def run_startup_graph(steps, log=print):
+    """并发执行启动步骤，返回 {步骤名: 返回值}
+
+    任一步骤失败时，依赖它的步骤不会执行，其余步骤照常完成，
+    最后抛出 StartupError（携带已成功步骤的结果）。
+    """
+    ordered = _topological_order(steps)
+    futures = {}
+    timings = {}
+    overall_start = time.monotonic()
+
+    def run(step):
+        for dependency in step.depends_on:
+            if futures[dependency].exception() is not None:
+                raise RuntimeError(f"依赖的步骤 {dependency} 失败，已跳过")
+        start = time.monotonic() - overall_start
+        log(f"[启动编排] 开始: {step.name}")
+        result = step.action()
+        end = time.monotonic() - overall_start
+        timings[step.name] = (start, end)
+        log(f"[启动编排] 完成: {step.name}（{end - start:.1f} 秒）")
+        return result
+
+    # 每个步骤一个线程，等待依赖的步骤不会占满线程池导致死锁
+    with ThreadPoolExecutor(max_workers=len(ordered), thread_name_prefix="startup") as executor:
+        for step in ordered:
+            futures[step.name] = executor.submit(run, step)
+
+    results = {}
+    errors = {}
+    for step in ordered:
+        try:
+            results[step.name] = futures[step.name].result()
+        except Exception as e:
+            errors[step.name] = e
+
+    total = time.monotonic() - overall_start
+    serial_total = sum(end - start for start, end in timings.values())
+    log(f"[启动编排] 总耗时 {total:.1f} 秒（各步骤耗时之和 {serial_total:.1f} 秒）")
+
+    if errors:
+        summary = "; ".join(f"{name}: {error}" for name, error in errors.items())
+        raise StartupError(f"测试环境启动失败 - {summary}", results, errors)
+    return results
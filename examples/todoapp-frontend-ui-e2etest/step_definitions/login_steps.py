@@ -2,11 +2,7 @@
 用户登录功能的步骤定义（Selenium UI 测试）
 """
 import os
-import time
 import json
-import psycopg2
-from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
-import bcrypt
 import requests
 from pytest_bdd import given, when, then, parsers, scenarios
 from selenium.webdriver.common.by import By
@@ -14,7 +10,9 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException
 import pytest
-from conftest import get_db_connection, API_BASE_URL, FRONTEND_BASE_URL
+from conftest import API_BASE_URL, FRONTEND_BASE_URL, USER_SEED_MODE
+from password_cache import get_password_hash
+from waits import page_activity, wait_for_page_settled, wait_for_url_not_contains, wait_for_visible
 
 # 使用 scenarios() 加载 feature 文件
 # 注意：由于 pytest.ini 中配置了 bdd_features_base_dir = features
@@ -28,75 +26,71 @@ def test_context():
     return {}
 
 
+def upsert_user(cursor, username, email, password):
+    """使用缓存的 bcrypt 哈希直接写入用户（已存在则覆盖邮箱和密码哈希）"""
+    cursor.execute(
+        'INSERT INTO "Users" ("Username", "Email", "PasswordHash", "CreatedAt") VALUES (%s, %s, %s, CURRENT_TIMESTAMP) '
+        'ON CONFLICT ("Username") DO UPDATE SET "Email" = EXCLUDED."Email", "PasswordHash" = EXCLUDED."PasswordHash"',
+        (username, email, get_password_hash(password))
+    )
+
+
 @given(parsers.parse('数据库中已存在用户 "{username}"，密码为 "{password}"'))
-def create_user_in_database(username, password, api_client):
-    """在数据库中创建用户"""
-    # 先检查用户是否已存在，如果存在则删除
-    conn = None
-    try:
-        conn = get_db_connection()
-        conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+def create_user_in_database(username, password, api_client, db_pool):
+    """在数据库中创建用户
+
+    默认（USER_SEED_MODE=direct）使用缓存的 bcrypt 哈希一条语句直接写库；
+    USER_SEED_MODE=api 时使用 API 注册接口，由后端计算密码哈希。
+    """
+    # 整个步骤只从连接池借出一个连接，清理和回退写入都复用它
+    with db_pool.connection() as conn:
         cursor = conn.cursor()
         
-        # 检查表是否存在，如果不存在则创建
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS "Users" (
-                "Id" SERIAL PRIMARY KEY,
-                "Username" VARCHAR(50) NOT NULL UNIQUE,
-                "Email" VARCHAR(100) NOT NULL UNIQUE,
-                "PasswordHash" TEXT NOT NULL,
-                "CreatedAt" TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
+        if USER_SEED_MODE == "direct":
+            upsert_user(cursor, username, f"{username}@example.com", password)
+            cursor.close()
+            return
         
-        # 检查用户是否已存在
-        cursor.execute('SELECT "Id" FROM "Users" WHERE "Username" = %s', (username,))
-        existing_user = cursor.fetchone()
+        # 先检查用户是否已存在，如果存在则删除
+        try:
+            # 检查表是否存在，如果不存在则创建
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS "Users" (
+                    "Id" SERIAL PRIMARY KEY,
+                    "Username" VARCHAR(50) NOT NULL UNIQUE,
+                    "Email" VARCHAR(100) NOT NULL UNIQUE,
+                    "PasswordHash" TEXT NOT NULL,
+                    "CreatedAt" TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            
+            # 检查用户是否已存在
+            cursor.execute('SELECT "Id" FROM "Users" WHERE "Username" = %s', (username,))
+            existing_user = cursor.fetchone()
+            
+            if existing_user:
+                cursor.execute('DELETE FROM "Users" WHERE "Username" = %s', (username,))
+        except Exception as e:
+            print(f"清理用户失败: {e}")
         
-        if existing_user:
-            cursor.execute('DELETE FROM "Users" WHERE "Username" = %s', (username,))
+        # 使用 API 注册接口创建用户
+        email = f"{username}@example.com"
+        register_data = {
+            "username": username,
+            "email": email,
+            "password": password
+        }
+        
+        try:
+            response = api_client.post("/api/auth/register", json=register_data)
+            if response.status_code not in [200, 201]:
+                # 如果注册失败，尝试直接插入数据库（使用缓存的 bcrypt 哈希）
+                upsert_user(cursor, username, email, password)
+        except Exception as e:
+            print(f"通过 API 创建用户失败，尝试直接插入: {e}")
+            upsert_user(cursor, username, email, password)
         
         cursor.close()
-    except Exception as e:
-        print(f"清理用户失败: {e}")
-    finally:
-        if conn:
-            conn.close()
-    
-    # 使用 API 注册接口创建用户
-    email = f"{username}@example.com"
-    register_data = {
-        "username": username,
-        "email": email,
-        "password": password
-    }
-    
-    try:
-        response = api_client.post("/api/auth/register", json=register_data)
-        if response.status_code not in [200, 201]:
-            # 如果注册失败，尝试直接插入数据库
-            conn = get_db_connection()
-            conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
-            cursor = conn.cursor()
-            password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=10)).decode('utf-8')
-            cursor.execute(
-                'INSERT INTO "Users" ("Username", "Email", "PasswordHash", "CreatedAt") VALUES (%s, %s, %s, CURRENT_TIMESTAMP) ON CONFLICT ("Username") DO UPDATE SET "PasswordHash" = EXCLUDED."PasswordHash"',
-                (username, email, password_hash)
-            )
-            cursor.close()
-            conn.close()
-    except Exception as e:
-        print(f"通过 API 创建用户失败，尝试直接插入: {e}")
-        conn = get_db_connection()
-        conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
-        cursor = conn.cursor()
-        password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=10)).decode('utf-8')
-        cursor.execute(
-            'INSERT INTO "Users" ("Username", "Email", "PasswordHash", "CreatedAt") VALUES (%s, %s, %s, CURRENT_TIMESTAMP) ON CONFLICT ("Username") DO UPDATE SET "PasswordHash" = EXCLUDED."PasswordHash"',
-            (username, email, password_hash)
-        )
-        cursor.close()
-        conn.close()
 
 
 @when('我访问登录页面')
@@ -137,10 +131,11 @@ def click_login_button(driver, test_context):
     login_button = WebDriverWait(driver, 10).until(
         EC.element_to_be_clickable((By.CSS_SELECTOR, ".login-button"))
     )
+    before_click = page_activity(driver)
     login_button.click()
     
-    # 等待页面响应（可能是成功跳转或错误消息）
-    time.sleep(2)  # 给前端一些时间处理
+    # 等待页面响应（可能是成功跳转或错误消息）：登录请求完成且页面不再变化
+    wait_for_page_settled(driver, since=before_click)
 
 
 @then('我应该被重定向到项目列表页面')
@@ -148,12 +143,9 @@ def should_be_redirected_to_projects(driver, test_context):
     """验证是否重定向到项目列表页面"""
     # 等待 URL 变化
     try:
-        WebDriverWait(driver, 10).until(
-            lambda d: "/login" not in d.current_url
-        )
-        # 检查是否在项目页面（通过检查页面元素）
-        # 等待页面加载完成
-        time.sleep(1)
+        wait_for_url_not_contains(driver, "/login")
+        # 等待项目页面加载完成（项目列表请求完成且渲染结束）
+        wait_for_page_settled(driver)
         # 检查是否不在登录页面
         current_url = driver.current_url
         assert "/login" not in current_url, f"仍然在登录页面，当前 URL: {current_url}"
@@ -221,9 +213,8 @@ def should_see_validation_error(driver, test_context, error_message):
         try:
             login_button = driver.find_element(By.CSS_SELECTOR, ".login-button")
             login_button.click()
-            time.sleep(1)
             # 再次查找错误消息
-            error_element = driver.find_element(By.CSS_SELECTOR, ".el-form-item__error")
+            error_element = wait_for_visible(driver, ".el-form-item__error", timeout=5)
             error_text = error_element.text
             assert error_message in error_text, \
                 f"验证错误消息不匹配，期望包含: {error_message}, 实际: {error_text}"
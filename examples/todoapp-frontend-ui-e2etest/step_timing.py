@@ -0,0 +1,134 @@
+"""
+步骤与 fixture 耗时统计
+pytest 插件：记录每个 Given/When/Then 步骤的执行时间、每个 fixture 的 setup 和 teardown 时间，
+在整个测试会话中按步骤函数 / fixture 名称汇总，结束时输出最慢的 N 项，
+并写入 test-results/step-timings.json。
+
+- 步骤耗时包含步骤执行时才按需创建的 fixture（例如步骤参数中的 reset_db），这些 fixture 同时单独统计
+- 并行模式（pytest-xdist）下每个 worker 通过 workeroutput 把统计结果交给控制进程合并
+"""
+import json
+import os
+import time
+import pytest
+
+STEP_TIMING_ENABLED = os.getenv("STEP_TIMING_ENABLED", "true").lower() == "true"
+STEP_TIMING_TOP_N = int(os.getenv("STEP_TIMING_TOP_N", "10"))
+STEP_TIMING_OUTPUT = os.getenv(
+    "STEP_TIMING_OUTPUT",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "test-results", "step-timings.json")
+)
+
+KIND_LABELS = {
+    "step": "步骤",
+    "fixture_setup": "fixture setup",
+    "fixture_teardown": "fixture teardown",
+}
+
+
+class StepTimingPlugin:
+    """按 (类型, 名称) 汇总耗时：次数、总耗时、最大耗时"""
+
+    def __init__(self, config, top_n=STEP_TIMING_TOP_N, output_path=STEP_TIMING_OUTPUT):
+        self.config = config
+        self.top_n = top_n
+        self.output_path = output_path
+        self.stats = {}
+        self._step_start = None
+        self._teardown_start = {}
+
+    def record(self, kind, name, elapsed, count=1, maximum=None):
+        entry = self.stats.setdefault((kind, name), {"count": 0, "total": 0.0, "max": 0.0})
+        entry["count"] += count
+        entry["total"] += elapsed
+        entry["max"] = max(entry["max"], elapsed if maximum is None else maximum)
+
+    def entries(self):
+        """按总耗时从高到低排列的统计结果（可序列化为 JSON）"""
+        entries = [
+            {
+                "kind": kind,
+                "name": name,
+                "count": entry["count"],
+                "total_s": round(entry["total"], 4),
+                "mean_s": round(entry["total"] / entry["count"], 4),
+                "max_s": round(entry["max"], 4),
+            }
+            for (kind, name), entry in self.stats.items()
+        ]
+        return sorted(entries, key=lambda item: item["total_s"], reverse=True)
+
+    def merge(self, entries):
+        """合并其他进程（xdist worker）的统计结果"""
+        for item in entries:
+            self.record(item["kind"], item["name"], item["total_s"], count=item["count"], maximum=item["max_s"])
+
+    # pytest-bdd 步骤钩子（未安装 pytest-bdd 的环境中这些钩子不存在，标记为可选）
+    @pytest.hookimpl(optionalhook=True)
+    def pytest_bdd_before_step(self, request, feature, scenario, step, step_func):
+        self._step_start = time.perf_counter()
+
+    @pytest.hookimpl(optionalhook=True)
+    def pytest_bdd_after_step(self, request, feature, scenario, step, step_func, step_func_args):
+        self._finish_step(step, step_func)
+
+    @pytest.hookimpl(optionalhook=True)
+    def pytest_bdd_step_error(self, request, feature, scenario, step, step_func, step_func_args, exception):
+        self._finish_step(step, step_func)
+
+    def _finish_step(self, step, step_func):
+        if self._step_start is None:
+            return
+        self.record("step", f"{step.keyword} {step_func.__name__}", time.perf_counter() - self._step_start)
+        self._step_start = None
+
+    # fixture 钩子
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_fixture_setup(self, fixturedef, request):
+        start = time.perf_counter()
+        yield
+        # pytest-bdd 为步骤定义和步骤参数生成的内部 fixture 不统计
+        if fixturedef.argname.startswith("pytestbdd_"):
+            return
+        self.record("fixture_setup", f"{fixturedef.argname} ({fixturedef.scope})", time.perf_counter() - start)
+        # 最后注册的终结器最先执行：用它标记 teardown 开始，pytest_fixture_post_finalizer 标记结束
+        fixturedef.addfinalizer(lambda: self._teardown_start.__setitem__(fixturedef, time.perf_counter()))
+
+    def pytest_fixture_post_finalizer(self, fixturedef, request):
+        start = self._teardown_start.pop(fixturedef, None)
+        if start is not None:
+            self.record("fixture_teardown", f"{fixturedef.argname} ({fixturedef.scope})", time.perf_counter() - start)
+
+    # 汇总与输出
+    @pytest.hookimpl(optionalhook=True)
+    def pytest_testnodedown(self, node, error):
+        """xdist 控制进程：合并 worker 的统计结果"""
+        self.merge(getattr(node, "workeroutput", {}).get("step_timings", []))
+
+    def pytest_sessionfinish(self, session):
+        if hasattr(self.config, "workerinput"):
+            self.config.workeroutput["step_timings"] = self.entries()
+            return
+        if not self.stats:
+            return
+        os.makedirs(os.path.dirname(self.output_path), exist_ok=True)
+        with open(self.output_path, "w", encoding="utf-8") as f:
+            json.dump(self.entries(), f, ensure_ascii=False, indent=2)
+
+    def pytest_terminal_summary(self, terminalreporter):
+        if hasattr(self.config, "workerinput") or not self.stats:
+            return
+        terminalreporter.section(f"最慢的 {self.top_n} 个步骤 / fixture（按总耗时）")
+        terminalreporter.write_line(f"{'类型':<18}{'次数':>6}{'总耗时(s)':>12}{'平均(s)':>10}{'最大(s)':>10}  名称")
+        for item in self.entries()[:self.top_n]:
+            terminalreporter.write_line(
+                f"{KIND_LABELS[item['kind']]:<18}{item['count']:>6}{item['total_s']:>12.3f}"
+                f"{item['mean_s']:>10.3f}{item['max_s']:>10.3f}  {item['name']}"
+            )
+        terminalreporter.write_line(f"完整结果: {self.output_path}")
+
+
+def register(config):
+    """在 pytest_configure 中调用，STEP_TIMING_ENABLED=false 时不注册"""
+    if STEP_TIMING_ENABLED and not config.pluginmanager.has_plugin("step_timing"):
+        config.pluginmanager.register(StepTimingPlugin(config), "step_timing")
@@ -0,0 +1,76 @@
+"""
+基于条件的页面等待
+代替步骤中固定时长的 time.sleep：
+- 网络空闲：前端 src/services/api.js 在 window.__apiActivity 中记录 axios 实例的请求活动
+- DOM 稳定：注入 MutationObserver 记录最近一次 DOM 变化的时间
+- URL 变化：等待路由跳转完成
+页面真正稳定后立即返回，不再白白等待。
+"""
+from selenium.common.exceptions import JavascriptException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+
+# 页面在没有进行中的请求、且这段时间（秒）内没有网络活动和 DOM 变化时视为已稳定
+SETTLE_QUIET_PERIOD = 0.3
+POLL_INTERVAL = 0.05
+
+# 返回页面活动快照；MutationObserver 在页面首次查询时注入（整页刷新后会重新注入）
+PAGE_ACTIVITY_JS = """
+if (!window.__e2eDomObserver) {
+  window.__e2eLastMutation = Date.now();
+  window.__e2eDomObserver = new MutationObserver(function () {
+    window.__e2eLastMutation = Date.now();
+  });
+  window.__e2eDomObserver.observe(document, {childList: true, subtree: true, attributes: true, characterData: true});
+}
+var api = window.__apiActivity || {pending: 0, started: 0, lastActivity: 0};
+return {
+  now: Date.now(),
+  pending: api.pending,
+  started: api.started,
+  lastActivity: Math.max(api.lastActivity, window.__e2eLastMutation)
+};
+"""
+
+
+def page_activity(driver):
+    """读取页面当前的请求和 DOM 活动：{now, pending, started, lastActivity}（时间为页面内的毫秒时间戳）"""
+    return driver.execute_script(PAGE_ACTIVITY_JS)
+
+
+def wait_for_page_settled(driver, since=None, quiet=SETTLE_QUIET_PERIOD, timeout=10):
+    """等待页面稳定：没有进行中的 API 请求，并且最近 quiet 秒内没有网络活动和 DOM 变化
+
+    since 为操作前通过 page_activity() 取得的快照，安静时间从该操作开始计算，
+    避免在操作触发的请求或渲染开始之前就误判为已稳定。返回稳定时的活动快照。
+    整页跳转（例如 401 时前端设置 window.location.href）期间脚本可能执行失败，视为尚未稳定继续轮询。
+    """
+    start = since["now"] if since else 0
+    quiet_ms = quiet * 1000
+
+    def settled(d):
+        activity = page_activity(d)
+        last = max(activity["lastActivity"], start)
+        if activity["pending"] == 0 and activity["now"] - last >= quiet_ms:
+            return activity
+        return False
+
+    return WebDriverWait(driver, timeout, poll_frequency=POLL_INTERVAL, ignored_exceptions=(JavascriptException,)).until(
+        settled, f"页面在 {timeout} 秒内未稳定（仍有进行中的请求或 DOM 持续变化）"
+    )
+
+
+def wait_for_url_not_contains(driver, fragment, timeout=10):
+    """等待 URL 中不再包含 fragment"""
+    WebDriverWait(driver, timeout, poll_frequency=POLL_INTERVAL).until(
+        lambda d: fragment not in d.current_url
+    )
+    return driver.current_url
+
+
+def wait_for_visible(driver, css_selector, timeout=10):
+    """等待元素出现并可见"""
+    return WebDriverWait(driver, timeout, poll_frequency=POLL_INTERVAL).until(
+        EC.visibility_of_element_located((By.CSS_SELECTOR, css_selector))
+    )
@@ -13,9 +13,28 @@ const api = axios.create({
   }
 })
 
+// 请求活动记录（进行中的请求数、已发起的请求数、最近一次请求开始/结束的时间）
+// E2E 测试通过 window.__apiActivity 判断网络是否空闲，代替固定时长的等待
+const activity = { pending: 0, started: 0, lastActivity: 0 }
+if (typeof window !== 'undefined') {
+  window.__apiActivity = activity
+}
+
+function requestStarted () {
+  activity.pending++
+  activity.started++
+  activity.lastActivity = Date.now()
+}
+
+function requestFinished () {
+  activity.pending = Math.max(activity.pending - 1, 0)
+  activity.lastActivity = Date.now()
+}
+
 // 请求拦截器
 api.interceptors.request.use(
   config => {
+    requestStarted()
     const token = localStorage.getItem('token')
     if (token) {
       config.headers.Authorization = `Bearer ${token}`
@@ -30,9 +49,11 @@ api.interceptors.request.use(
 // 响应拦截器
 api.interceptors.response.use(
   response => {
+    requestFinished()
     return response.data
   },
   error => {
+    requestFinished()
     if (error.response) {
       if (error.response.status === 401) {
         localStorage.removeItem('token')